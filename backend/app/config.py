@@ -21,18 +21,94 @@ class Settings(BaseSettings):
     # OpenAI
     OPENAI_API_KEY: str
     OPENAI_MODEL: str = "gpt-4"
-    OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"  # yeni odalar için; mevcut odalar kendi modelini saklar
+    OPENAI_EMBEDDING_DIMENSIONS: int = 0  # text-embedding-3-* 'dimensions' parametresi (0 = modelin kendi boyutu)
+    EMBEDDING_BATCH_MAX_TOKENS: int = 20000
+    EMBEDDING_BATCH_MAX_INPUTS: int = 2048
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+    EMBEDDING_MAX_RETRIES: int = 6
+    EMBEDDING_RETRY_BASE_SECONDS: float = 1.0
+    EMBEDDING_RETRY_MAX_SECONDS: float = 60.0
     
-    # Pinecone
-    PINECONE_API_KEY: str
-    PINECONE_ENVIRONMENT: str
-    PINECONE_INDEX_NAME: str
+    # Embedding Cache (worker process'ler arasında paylaşılır)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "cache/embeddings.sqlite3"
+    EMBEDDING_CACHE_MAX_BYTES: int = 1073741824  # 1GB
+    
+    # Query Embedding Cache (chat soruları; disk tier EMBEDDING_CACHE_PATH'i paylaşır)
+    QUERY_EMBEDDING_CACHE_MAX_BYTES: int = 32 * 1024 * 1024  # process başına bellek bütçesi (0 = kapalı)
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: float = 86400.0
+    QUERY_EMBEDDING_CACHE_DISK: bool = True
+    QUERY_EMBEDDING_DISK_WORKERS: int = 2  # disk tier okuma/yazmaları için ayrılmış thread sayısı
+    QUERY_EMBEDDING_DISK_MAX_QUEUE: int = 32  # doluysa okuma atlanır (API'ye gidilir), yazma düşürülür
+    QUERY_EMBEDDING_DISK_TIMEOUT_SECONDS: float = 1.0  # okuma bu sürede başlayamazsa cache miss sayılır
+    
+    # Vector Store
+    VECTOR_STORE_BACKEND: str = "pinecone"  # 'pinecone' | 'local'
+    LOCAL_VECTOR_STORE_PATH: str = "vectors"  # local backend: namespace başına memmap + SQLite
+    LOCAL_VECTOR_QUANTIZATION: str = "none"  # 'none' | 'int8' | 'binary' (aday arama kodları)
+    LOCAL_VECTOR_RESCORE_FACTOR: int = 8  # top_k * factor aday float32 ile yeniden skorlanır
+    LOCAL_VECTOR_COMPACT_DEAD_FRACTION: float = 0.3  # silinmiş satır oranı bunu geçince GC dosyaları sıkıştırır
+    VECTOR_INDEX_SHARDS: str = ""  # yeni odaların dağıtıldığı shard'lar (virgüllü; pinecone: index adı[=host], local: klasör adı)
+    VECTOR_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # oda vektörlerinin in-process cache bütçesi (0 = kapalı)
+    VECTOR_QUERY_WORKERS: int = 8  # chat sorguları için ayrılmış thread sayısı (API process başına)
+    VECTOR_QUERY_MAX_QUEUE: int = 64  # bunun üstünde bekleyen sorgu 503 ile reddedilir
+    VECTOR_QUERY_TIMEOUT_SECONDS: float = 10.0  # 0 = süre sınırı yok
+    
+    # Pinecone (VECTOR_STORE_BACKEND=pinecone iken gerekli)
+    PINECONE_API_KEY: str = ""
+    PINECONE_ENVIRONMENT: str = ""
+    PINECONE_INDEX_NAME: str = ""
+    PINECONE_INDEX_HOST: str = ""  # verilirse index host'u için control plane çağrısı yapılmaz
+    PINECONE_MAX_CONCURRENCY: int = 4  # aynı anda uçuşta olan upsert isteği
+    PINECONE_UPSERT_BATCH_SIZE: int = 100
+    PINECONE_MAX_RETRIES: int = 5
+    PINECONE_RETRY_BASE_SECONDS: float = 0.5
+    PINECONE_RETRY_MAX_SECONDS: float = 20.0
+    PINECONE_CONSISTENCY_SECONDS: float = 30.0  # yazmadan sonra okumaların eksik kalabileceği süre (eventual consistency)
     
     # Upload
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 52428800  # 50MB
     ALLOWED_EXTENSIONS: str = "pdf,doc,docx,txt"
     
+    # Chunking (tiktoken token sayısı)
+    CHUNK_SIZE_TOKENS: int = 250
+    CHUNK_OVERLAP_TOKENS: int = 50
+    
+    # Chat
+    CHAT_TOP_K: int = 5  # vector store'dan istenen ve prompt'a giren en fazla chunk sayısı
+    CHAT_CONTEXT_MAX_TOKENS: int = 2000  # birleştirilmiş chunk'ların prompt'taki token bütçesi (0 = sınırsız)
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000  # process başına cache'lenen cevap (0 = kapalı)
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.0  # > 0: soru embedding'i bu kadar benzeyen cevap kullanılır (örn. 0.97)
+    
+    # PDF Extraction
+    PDF_PARALLEL_MIN_PAGES: int = 40  # bu sayfa sayısının altında tek process
+    PDF_EXTRACT_WORKERS: int = 0  # 0 = CPU sayısı
+    PDF_PAGES_PER_TASK: int = 25
+    
+    # Ingestion Worker
+    WORKER_PROCESSES: int = 1
+    WORKER_POLL_INTERVAL_SECONDS: float = 2.0
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_RETRY_BASE_SECONDS: int = 30
+    JOB_RETRY_MAX_SECONDS: int = 1800
+    JOB_STALE_AFTER_SECONDS: int = 900
+    JOB_HEARTBEAT_SECONDS: float = 60.0  # işlenen job'ın locked_at'i bu aralıkla yenilenir (< JOB_STALE_AFTER_SECONDS)
+    INGEST_BATCH_CHUNKS: int = 100  # her batch yüklendiğinde aranabilir olur
+    INGEST_QUEUE_DEPTH: int = 2  # aşamalar arası bekleyen batch sayısı (bellek sınırı)
+    
+    # Embedding Migration (python -m app.migrate_embeddings)
+    MIGRATION_BATCH_CHUNKS: int = 100  # her batch sonrası checkpoint yazılır
+    MIGRATION_MAX_TOKENS_PER_MINUTE: int = 500000  # ingestion'a kota bırakmak için (0 = sınırsız)
+    
+    # Garbage Collection (worker içinde, silinmiş oda/dökümanlar)
+    GC_ENABLED: bool = True
+    GC_INTERVAL_SECONDS: float = 60.0
+    GC_BATCH_SIZE: int = 100
+    GC_RECONCILE_INTERVAL_SECONDS: float = 3600.0  # sahipsiz dosya taraması + vector store sayım kontrolü
+    GC_ORPHAN_FILE_GRACE_SECONDS: int = 3600  # upload sırasında dosya satırdan önce yazılır
+    
     # CORS
     CORS_ORIGINS: str = "http://localhost:8000"
     
@@ -42,6 +118,9 @@ class Settings(BaseSettings):
     # Logging
     LOG_LEVEL: str = "INFO"
     
+    # Metrics (/metrics, X-Metrics-Token header ile; boş = endpoint kapalı)
+    METRICS_TOKEN: str = ""
+    
     @property
     def allowed_extensions_list(self) -> List[str]:
         return [ext.strip() for ext in self.ALLOWED_EXTENSIONS.split(",")]
@@ -1,11 +1,19 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from app.limiter import limiter
 from app.config import settings
 from app.routes import auth, rooms, documents, chat
-from app.database import Base, engine
+from app.database import engine
+from app.utils import UploadSizeLimitMiddleware, require_metrics_token
+from app.services.answer_cache import answer_cache
+from app.services.bounded_executor import query_cache_executor, vector_query_executor
+from app.services.chat_service import chat_service
+from app.services.document_processor import document_processor
+from app.services.query_embedding_cache import query_embedding_cache
+from app.services.schema_migrations import upgrade_schema
+from app.services.vector_cache import vector_cache
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -15,7 +23,19 @@ app = FastAPI(
 
 @app.on_event("startup")
 def startup():
-    Base.metadata.create_all(bind=engine)
+    # create_all mevcut tabloları değiştirmez; eski kurulumlara yeni kolonlar eklenir
+    upgrade_schema(engine)
+
+@app.on_event("shutdown")
+def shutdown():
+    # Upload kontrolü büyük PDF'lerde process pool açmış olabilir
+    document_processor.shutdown()
+
+# Büyük upload'ları gövde tamamen alınmadan reddet
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    path_prefix=f"{settings.API_PREFIX}/documents/upload"
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -46,3 +66,15 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+def metrics():
+    """Process içi cache ve gecikme sayaçları (her API process'i kendi değerlerini döndürür)"""
+    return {
+        "answer_cache": answer_cache.stats(),
+        "chat_stream_time_to_first_token": chat_service.time_to_first_token.stats(),
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "query_embedding_cache_executor": query_cache_executor.stats(),
+        "vector_cache": vector_cache.stats(),
+        "vector_query_executor": vector_query_executor.stats()
+    }
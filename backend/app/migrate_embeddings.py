@@ -0,0 +1,175 @@
+"""
+Embedding model / dimension migration.
+
+    python -m app.migrate_embeddings run --model text-embedding-3-small --dimensions 512 [--room ID ...]
+    python -m app.migrate_embeddings status
+    python -m app.migrate_embeddings finalize [--room ID ...] [--force]
+    python -m app.migrate_embeddings rollback --room ID
+    python -m app.migrate_embeddings pin
+
+`run` re-embeds each room into a shadow namespace, throttled to
+MIGRATION_MAX_TOKENS_PER_MINUTE and checkpointed after every batch (run
+it again to resume), then switches the room to the new namespace and
+model. API and workers keep running; chat uses the old namespace until
+the switch. `finalize` deletes the old namespace once the vector count
+of the new one matches the database; `rollback` switches back.
+
+Rooms created before embedding settings were stored per room follow
+OPENAI_EMBEDDING_*; run `pin` before changing those settings.
+"""
+import argparse
+import logging
+import time
+from app.config import settings
+from app.database import SessionLocal
+from app.models import EmbeddingMigration, Room
+from app.services.embedding_batcher import resolve_embedding
+from app.services.embedding_migration import (
+    ACTIVE_STATUSES,
+    TokenThrottle,
+    copy_room,
+    finalize_migration,
+    rollback_migration,
+    start_migration,
+    switch_room,
+    verify_migration
+)
+from app.services.vector_store import vector_shards
+
+logger = logging.getLogger(__name__)
+
+def _rooms(db, room_ids):
+    query = db.query(Room).filter(Room.deleted_at.is_(None))
+    if room_ids:
+        query = query.filter(Room.id.in_(room_ids))
+    return query.order_by(Room.id).all()
+
+def _active_migrations(db, room_ids, status):
+    query = db.query(EmbeddingMigration).filter(EmbeddingMigration.status == status)
+    if room_ids:
+        query = query.filter(EmbeddingMigration.room_id.in_(room_ids))
+    return query.order_by(EmbeddingMigration.room_id).all()
+
+def run(args) -> None:
+    if settings.VECTOR_STORE_BACKEND == "pinecone" and args.dimensions:
+        # Pinecone index'inin tek bir boyutu var, namespace'ler farklı boyut taşıyamaz
+        for shard in vector_shards.names:
+            dimension = vector_shards.store(shard).stats().get("dimension")
+            if dimension and dimension != args.dimensions:
+                raise SystemExit(f"Pinecone index {shard} {dimension} boyutlu, {args.dimensions} boyutlu vektörler için yeni bir index gerekli")
+
+    throttle = TokenThrottle(args.tokens_per_minute)
+    db = SessionLocal()
+    try:
+        for room in _rooms(db, args.room):
+            if resolve_embedding(room.embedding_model, room.embedding_dimensions) == (args.model, args.dimensions):
+                continue
+            migration = None
+            try:
+                migration = start_migration(db, room, args.model, args.dimensions)
+                logger.info(f"Room {room.id}: {migration.source_namespace} -> {migration.target_namespace}")
+
+                deadline = time.monotonic() + args.wait
+                while True:
+                    if copy_room(db, migration, batch_chunks=args.batch_chunks, throttle=throttle) and switch_room(db, migration):
+                        break
+                    if time.monotonic() >= deadline:
+                        logger.warning(f"Room {room.id}: işlenmekte olan dökümanlar bitmedi, devam etmek için tekrar çalıştırın")
+                        break
+                    time.sleep(settings.WORKER_POLL_INTERVAL_SECONDS)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Room {room.id} migration hatası: {e}", exc_info=True)
+                if migration is not None:
+                    migration.last_error = str(e)[:2000]
+                    db.commit()
+    finally:
+        db.close()
+
+def status(args) -> None:
+    db = SessionLocal()
+    try:
+        migrations = db.query(EmbeddingMigration).order_by(EmbeddingMigration.room_id, EmbeddingMigration.id).all()
+        for migration in migrations:
+            line = (
+                f"room {migration.room_id:>5}  {migration.status:<11} "
+                f"{migration.source_model}@{migration.source_dimensions} -> {migration.target_model}@{migration.target_dimensions}  "
+                f"{migration.chunks_total} chunks"
+            )
+            if migration.status in ACTIVE_STATUSES:
+                expected, actual = verify_migration(db, migration)
+                line += f"  (new namespace {actual}/{expected})"
+            if migration.last_error:
+                line += f"  error: {migration.last_error}"
+            print(line)
+    finally:
+        db.close()
+
+def finalize(args) -> None:
+    db = SessionLocal()
+    try:
+        for migration in _active_migrations(db, args.room, "switched"):
+            try:
+                finalize_migration(db, migration, force=args.force)
+                logger.info(f"Room {migration.room_id}: eski namespace {migration.source_namespace} silindi")
+            except ValueError as e:
+                logger.error(str(e))
+    finally:
+        db.close()
+
+def rollback(args) -> None:
+    db = SessionLocal()
+    try:
+        for migration in db.query(EmbeddingMigration).filter(
+            EmbeddingMigration.room_id == args.room,
+            EmbeddingMigration.status.in_(ACTIVE_STATUSES)
+        ):
+            rollback_migration(db, migration)
+            logger.info(f"Room {migration.room_id}: {migration.source_namespace} namespace'ine geri dönüldü")
+    finally:
+        db.close()
+
+def pin(args) -> None:
+    db = SessionLocal()
+    try:
+        pinned = db.query(Room).filter(Room.embedding_model.is_(None)).update({
+            "embedding_model": settings.OPENAI_EMBEDDING_MODEL,
+            "embedding_dimensions": settings.OPENAI_EMBEDDING_DIMENSIONS
+        }, synchronize_session=False)
+        db.commit()
+        logger.info(f"{pinned} oda {settings.OPENAI_EMBEDDING_MODEL} modeline sabitlendi")
+    finally:
+        db.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Embedding model / dimension migration")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Re-embed rooms into shadow namespaces and switch them")
+    run_parser.add_argument("--model", default=settings.OPENAI_EMBEDDING_MODEL)
+    run_parser.add_argument("--dimensions", type=int, default=settings.OPENAI_EMBEDDING_DIMENSIONS)
+    run_parser.add_argument("--room", type=int, action="append")
+    run_parser.add_argument("--batch-chunks", type=int, default=settings.MIGRATION_BATCH_CHUNKS)
+    run_parser.add_argument("--tokens-per-minute", type=int, default=settings.MIGRATION_MAX_TOKENS_PER_MINUTE)
+    run_parser.add_argument("--wait", type=float, default=600, help="seconds to wait for documents still being ingested")
+    run_parser.set_defaults(handler=run)
+
+    commands.add_parser("status", help="List migrations").set_defaults(handler=status)
+
+    finalize_parser = commands.add_parser("finalize", help="Delete the old namespaces of switched rooms")
+    finalize_parser.add_argument("--room", type=int, action="append")
+    finalize_parser.add_argument("--force", action="store_true", help="finalize even if vector counts differ")
+    finalize_parser.set_defaults(handler=finalize)
+
+    rollback_parser = commands.add_parser("rollback", help="Switch a room back to its old namespace")
+    rollback_parser.add_argument("--room", type=int, required=True)
+    rollback_parser.set_defaults(handler=rollback)
+
+    commands.add_parser("pin", help="Store the current embedding settings on rooms without them").set_defaults(handler=pin)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -2,5 +2,8 @@ from app.models.user import User
 from app.models.room import Room
 from app.models.document import Document
 from app.models.message import Message
+from app.models.ingestion_job import IngestionJob
+from app.models.chunk import Chunk
+from app.models.embedding_migration import EmbeddingMigration
 
-__all__ = ["User", "Room", "Document", "Message"]
+__all__ = ["User", "Room", "Document", "Message", "IngestionJob", "Chunk", "EmbeddingMigration"]
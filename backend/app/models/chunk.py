@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, Text, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class Chunk(Base):
+    __tablename__ = "chunks"
+    __table_args__ = (
+        UniqueConstraint("document_id", "chunk_index", name="uq_chunks_document_chunk"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    chunk_index = Column(Integer, nullable=False)  # vektör ID'si: doc_{document_id}_chunk_{chunk_index}
+    text = Column(Text, nullable=False)
+    start_offset = Column(Integer, nullable=False)  # döküman text'indeki karakter aralığı
+    end_offset = Column(Integer, nullable=False)
+    page_number = Column(Integer)
+    token_count = Column(Integer, nullable=False)
+
+    # Relationships
+    document = relationship("Document", back_populates="chunks")
+
+    def __repr__(self):
+        return f"<Chunk(document_id={self.document_id}, chunk_index={self.chunk_index})>"
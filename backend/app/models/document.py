@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -12,14 +12,20 @@ class Document(Base):
     file_path = Column(String(500), nullable=False)
     file_size = Column(Integer)
     mime_type = Column(String(100))
+    content_hash = Column(String(64), index=True)  # sha256 (hex)
     processed = Column(Boolean, default=False)
+    status = Column(String(20), default='pending')  # 'pending', 'processing', 'completed', 'failed'
     chunk_count = Column(Integer, default=0)
-    pinecone_vector_ids = Column(JSON)
+    chunks_done = Column(Integer, default=0)  # Pinecone'a yüklenmiş (aranabilir) chunk sayısı
+    chunks_total = Column(Integer)  # chunk'lama bitene kadar NULL
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    deleted_at = Column(DateTime(timezone=True), index=True)  # soft delete: vektör/dosya/satır GC ile silinir
     
     # Relationships
     room = relationship("Room", back_populates="documents")
+    jobs = relationship("IngestionJob", back_populates="document", cascade="all, delete-orphan")
+    chunks = relationship("Chunk", back_populates="document", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<Document(id={self.id}, filename='{self.filename}', room_id={self.room_id})>"
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database import Base
+
+class EmbeddingMigration(Base):
+    __tablename__ = "embedding_migrations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    room_id = Column(Integer, ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default='copying', index=True)  # 'copying', 'switched', 'finalized', 'rolled_back'
+    source_namespace = Column(String(100), nullable=False)
+    source_model = Column(String(100), nullable=False)
+    source_dimensions = Column(Integer, nullable=False)  # 0 = modelin kendi boyutu
+    target_namespace = Column(String(100), nullable=False, unique=True)
+    target_model = Column(String(100), nullable=False)
+    target_dimensions = Column(Integer, nullable=False)
+    # Checkpoint: bu ID'ye kadar dökümanlar kopyalandı, sıradakinin ilk copied_chunks chunk'ı yazıldı
+    copied_document_id = Column(Integer, nullable=False, default=0)
+    copied_chunks = Column(Integer, nullable=False, default=0)
+    chunks_total = Column(Integer, nullable=False, default=0)  # tüm dökümanlarda yeniden embed edilen chunk
+    last_error = Column(Text)
+    switched_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    room = relationship("Room", back_populates="embedding_migrations")
+
+    def __repr__(self):
+        return f"<EmbeddingMigration(id={self.id}, room_id={self.room_id}, status='{self.status}')>"
@@ -12,13 +12,24 @@ class Room(Base):
     description = Column(Text)
     emoji = Column(String(10), default='📚')
     pinecone_namespace = Column(String(100), unique=True)
+    vector_shard = Column(String(100))  # namespace'in bulunduğu index shard'ı (NULL = varsayılan shard)
+    # Namespace'teki vektörlerin embedding uzayı (NULL = OPENAI_EMBEDDING_* ayarları)
+    embedding_model = Column(String(100))
+    embedding_dimensions = Column(Integer)  # 0 = modelin kendi boyutu
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    deleted_at = Column(DateTime(timezone=True), index=True)  # soft delete: namespace/dosyalar/satır GC ile silinir
     
     # Relationships
     user = relationship("User", back_populates="rooms")
     documents = relationship("Document", back_populates="room", cascade="all, delete-orphan")
     messages = relationship("Message", back_populates="room", cascade="all, delete-orphan")
+    embedding_migrations = relationship("EmbeddingMigration", back_populates="room", cascade="all, delete-orphan", passive_deletes=True)
+    
+    @property
+    def live_documents(self):
+        """Silinmemiş dökümanlar"""
+        return [document for document in self.documents if document.deleted_at is None]
     
     def __repr__(self):
         return f"<Room(id={self.id}, name='{self.name}', user_id={self.user_id})>"
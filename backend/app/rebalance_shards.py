@@ -0,0 +1,42 @@
+"""
+Vector index shard rebalancing.
+
+    python -m app.rebalance_shards [--dry-run] [--room ID ...]
+
+Moves every room whose namespace hashes to a different shard than the
+one stored on the room (e.g. after adding an index to
+VECTOR_INDEX_SHARDS). Rooms with a document being ingested are skipped
+and picked up by the next run; API and workers keep running.
+"""
+import argparse
+import logging
+from app.config import settings
+from app.database import SessionLocal
+from app.services.shard_rebalancer import plan_rebalance, rebalance
+from app.services.vector_store import vector_shards
+
+logger = logging.getLogger(__name__)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move room namespaces to their consistent-hash shard")
+    parser.add_argument("--dry-run", action="store_true", help="only list the rooms that would move")
+    parser.add_argument("--room", type=int, action="append")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    db = SessionLocal()
+    try:
+        if args.dry_run:
+            for room, target in plan_rebalance(db):
+                if not args.room or room.id in args.room:
+                    print(f"room {room.id:>5}  {room.pinecone_namespace}  {vector_shards.resolve(room.vector_shard)} -> {target}")
+            return
+
+        moved, deferred = rebalance(db, room_ids=args.room)
+        logger.info(f"{moved} oda taşındı, {deferred} oda ertelendi")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
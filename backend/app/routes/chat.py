@@ -1,16 +1,70 @@
+from typing import Any, List, Optional
+import asyncio
+import json
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app.models import Room, Message, User
 from app.schemas import ChatRequest, ChatResponse, MessageSource
 from app.utils import get_current_user_id
+from app.services.bounded_executor import ExecutorBusy
 from app.services.chat_service import chat_service
+from app.services.vector_cache import room_vector_version
+from app.services.vector_store import room_vector_store
 from app.limiter import limiter
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
+def _save_messages(
+    db: Session,
+    room_id: int,
+    user_id: int,
+    question: str,
+    answer: str,
+    sources: List[dict],
+    tokens_used: int,
+    keep_empty: bool = False
+) -> Optional[Message]:
+    """Soruyu ve AI cevabını kaydet (boş cevap sadece keep_empty ise)"""
+    # Kullanıcı mesajını kaydet
+    user_message = Message(
+        room_id=room_id,
+        user_id=user_id,
+        message_type="user",
+        content=question,
+        tokens_used=0
+    )
+    db.add(user_message)
+    
+    # AI cevabını kaydet
+    ai_message = None
+    if answer or keep_empty:
+        ai_message = Message(
+            room_id=room_id,
+            user_id=user_id,
+            message_type="ai",
+            content=answer,
+            sources=sources,
+            tokens_used=tokens_used
+        )
+        db.add(ai_message)
+    db.commit()
+    if ai_message is not None:
+        db.refresh(ai_message)
+    return ai_message
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# Normal ve streaming chat aynı günlük kotadan düşer
+chat_limit = limiter.shared_limit("5/day", scope="chat")
+
 @router.post("/{room_id}", response_model=ChatResponse)
-@limiter.limit("5/day")
+@chat_limit
 async def chat_with_documents(
     request: Request,
     room_id: int,
@@ -24,7 +78,8 @@ async def chat_with_documents(
     # Oda kontrolü
     room = db.query(Room).filter(
         Room.id == room_id,
-        Room.user_id == user_id
+        Room.user_id == user_id,
+        Room.deleted_at.is_(None)
     ).first()
     
     if not room:
@@ -34,33 +89,28 @@ async def chat_with_documents(
         )
     
     # Chat yap
-    result = await chat_service.chat(
-        question=chat_request.question,
-        namespace=room.pinecone_namespace
-    )
-    
-    # Kullanıcı mesajını kaydet
-    user_message = Message(
-        room_id=room_id,
-        user_id=user_id,
-        message_type="user",
-        content=chat_request.question,
-        tokens_used=0
-    )
-    db.add(user_message)
+    try:
+        result = await chat_service.chat(
+            question=chat_request.question,
+            namespace=room.pinecone_namespace,
+            version=room_vector_version(db, room.id),
+            db=db,
+            embedding_model=room.embedding_model,
+            embedding_dimensions=room.embedding_dimensions,
+            store=room_vector_store(room)
+        )
+    except (ExecutorBusy, asyncio.TimeoutError):
+        # Vector store sorgu havuzu dolu ya da sorgu süresi aşıldı
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Arama şu anda yoğun, lütfen tekrar deneyin"
+        )
     
-    # AI cevabını kaydet
-    ai_message = Message(
-        room_id=room_id,
-        user_id=user_id,
-        message_type="ai",
-        content=result['answer'],
-        sources=result['sources'],
-        tokens_used=result['tokens_used']
+    ai_message = _save_messages(
+        db, room_id, user_id, chat_request.question,
+        result['answer'], result['sources'], result['tokens_used'],
+        keep_empty=True  # boş cevabın da message_id'si döner
     )
-    db.add(ai_message)
-    db.commit()
-    db.refresh(ai_message)
     
     return ChatResponse(
         message_id=ai_message.id,
@@ -70,8 +120,88 @@ async def chat_with_documents(
             MessageSource(**source) for source in result['sources']
         ],
         tokens_used=result['tokens_used'],
+        prompt_tokens=result.get('prompt_tokens'),
         created_at=ai_message.created_at
     )
+
+@router.post("/{room_id}/stream")
+@chat_limit
+async def stream_chat_with_documents(
+    request: Request,
+    room_id: int,
+    chat_request: ChatRequest,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Odadaki dökümanlarla chat yap, cevabı Server-Sent Events ile akıt.
+    
+    Olaylar: `sources` (kaynak listesi), her parça için `token` (JSON
+    string), en sonda `done` (message_id, tokens_used, prompt_tokens,
+    ttft_ms). Hata olursa `error`. Mesajlar stream bitince ya da istemci
+    bağlantıyı kapatınca (o ana kadarki cevapla) kaydedilir.
+    """
+    # Oda kontrolü (stream başlamadan, 404 normal cevap olarak dönsün)
+    room = db.query(Room).filter(
+        Room.id == room_id,
+        Room.user_id == user_id,
+        Room.deleted_at.is_(None)
+    ).first()
+    
+    if not room:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Oda bulunamadı"
+        )
+    
+    question = chat_request.question
+    chat_kwargs = dict(
+        namespace=room.pinecone_namespace,
+        version=room_vector_version(db, room.id),
+        embedding_model=room.embedding_model,
+        embedding_dimensions=room.embedding_dimensions,
+        store=room_vector_store(room)
+    )
+    
+    async def events():
+        # İstek session'ı response gönderilmeden kapanır, stream kendi session'ını açar
+        stream_db = SessionLocal()
+        answer, sources, saved = [], [], False
+        try:
+            async for event in chat_service.chat_stream(question, db=stream_db, **chat_kwargs):
+                if event["event"] == "sources":
+                    sources = event["data"]
+                elif event["event"] == "token":
+                    answer.append(event["data"])
+                elif event["event"] == "done":
+                    saved = True
+                    ai_message = _save_messages(
+                        stream_db, room_id, user_id, question,
+                        "".join(answer), sources, event["data"]["tokens_used"]
+                    )
+                    event["data"]["message_id"] = ai_message.id if ai_message is not None else None
+                yield _sse(event["event"], event["data"])
+        except asyncio.CancelledError:
+            logger.info(f"Chat stream cancelled by client (room {room_id})")
+            raise
+        except (ExecutorBusy, asyncio.TimeoutError):
+            yield _sse("error", {"detail": "Arama şu anda yoğun, lütfen tekrar deneyin"})
+        except Exception as e:
+            logger.error(f"Chat stream error (room {room_id}): {e}", exc_info=True)
+            yield _sse("error", {"detail": "Cevap üretilemedi"})
+        finally:
+            if not saved:
+                # İptal / hata: o ana kadar gelen cevap kaydedilir
+                stream_db.rollback()
+                _save_messages(stream_db, room_id, user_id, question, "".join(answer), sources, 0)
+            stream_db.close()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/history/{room_id}")
 def get_chat_history(
     room_id: int,
@@ -82,7 +212,8 @@ def get_chat_history(
     # Room kontrolü
     room = db.query(Room).filter(
         Room.id == room_id,
-        Room.user_id == user_id  # DEĞİŞTİ
+        Room.user_id == user_id,  # DEĞİŞTİ
+        Room.deleted_at.is_(None)
     ).first()
     
     if not room:
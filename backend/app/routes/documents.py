@@ -1,16 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks, Request
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
 from typing import List
 import os
-import shutil
 from pathlib import Path
 from app.database import get_db
 from app.models import Room, Document
-from app.schemas import DocumentResponse, DocumentUploadResponse
-from app.utils import get_current_user_id, validate_upload_file, sanitize_filename
+from app.schemas import DocumentResponse, DocumentUploadResponse, DocumentProcessingStatus
+from app.utils import get_current_user_id, validate_upload_file, sanitize_filename, save_upload_file
 from app.config import settings
-from app.services import process_document_task
-from pinecone import Pinecone
+from app.services import enqueue_document, document_processor
+from app.services.document_processor import MIN_CONTENT_CHARACTERS
+from app.services.text_sidecar import remove_sidecar
+from app.services.answer_cache import answer_cache
+from app.services.vector_cache import vector_cache
+from fastapi.concurrency import run_in_threadpool
 import logging
 from app.limiter import limiter
 
@@ -22,18 +26,18 @@ router = APIRouter(prefix="/documents", tags=["Documents"])
 async def upload_document(
     request: Request,
     room_id: int,
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     user_id: int = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
     """
-    Odaya dosya yükle ve arka planda işle
+    Odaya dosya yükle ve işleme kuyruğuna ekle
     """
     # Oda kontrolü
     room = db.query(Room).filter(
         Room.id == room_id,
-        Room.user_id == user_id
+        Room.user_id == user_id,
+        Room.deleted_at.is_(None)
     ).first()
     
     if not room:
@@ -44,7 +48,8 @@ async def upload_document(
     
     # Kullanıcının toplam dosya sayısı kontrolü (max 5)
     user_document_count = db.query(Document).join(Room).filter(
-        Room.user_id == user_id
+        Room.user_id == user_id,
+        Document.deleted_at.is_(None)
     ).count()
 
     if user_document_count >= 3:
@@ -73,47 +78,49 @@ async def upload_document(
         file_path = upload_path / f"{original_stem}_{counter}{file_path.suffix}"
         counter += 1
     
-    # Dosyayı kaydet
+    # Dosyayı kaydet: parça parça, threadpool'da; boyut limiti ve
+    # içerik hash'i aynı geçişte (limit aşılırsa yazma hemen durur)
     try:
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        file_size, content_hash = await save_upload_file(file, file_path)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Dosya yüklenirken hata oluştu: {str(e)}"
         )
     
-    # Dosya boyutunu al
-    file_size = file_path.stat().st_size
-        
-    # Dosya boyutu kontrolü
-    if file_size > settings.MAX_FILE_SIZE:
-        file_path.unlink()
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"Dosya çok büyük. Maksimum: {settings.MAX_FILE_SIZE / (1024*1024):.1f} MB"
-        )
+    # Aynı içerik daha önce işlendiyse tekrar okumaya gerek yok
+    already_processed = db.query(Document.id).filter(
+        Document.content_hash == content_hash,
+        Document.processed == True,
+        Document.deleted_at.is_(None)
+    ).first() is not None
 
     # Dosya içeriği kontrolü (karakter sayısı)
-    try:
-        from app.services.document_processor import document_processor
-        text = document_processor.extract_text(str(file_path))
-        
-        if not text or len(text.strip()) < 50:
-            file_path.unlink()  # Dosyayı sil
+    if not already_processed:
+        try:
+            # Text bir kez çıkarılır ve sidecar'a yazılır, worker tekrar parse etmez.
+            # Parse CPU-bound olduğu için event loop'u bloklamamak adına threadpool'da çalışır.
+            content_length = await run_in_threadpool(document_processor.content_length, str(file_path))
+            
+            if content_length < MIN_CONTENT_CHARACTERS:
+                remove_sidecar(str(file_path))
+                file_path.unlink()  # Dosyayı sil
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Dosya içeriği yetersiz. {content_length} karakter bulundu, minimum {MIN_CONTENT_CHARACTERS} karakter gerekli."
+                )
+        except HTTPException:
+            raise  # HTTPException'ı tekrar fırlat
+        except Exception as e:
+            remove_sidecar(str(file_path))
+            file_path.unlink()  # Hata varsa dosyayı sil
+            logger.error(f"Dosya okuma hatası: {e}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Dosya içeriği yetersiz. {len(text.strip()) if text else 0} karakter bulundu, minimum 50 karakter gerekli."
+                detail=f"Dosya okunamadı veya formatı desteklenmiyor."
             )
-    except HTTPException:
-        raise  # HTTPException'ı tekrar fırlat
-    except Exception as e:
-        file_path.unlink()  # Hata varsa dosyayı sil
-        logger.error(f"Dosya okuma hatası: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Dosya okunamadı veya formatı desteklenmiyor."
-        )
 
     # Database'e kaydet
     new_document = Document(
@@ -122,16 +129,19 @@ async def upload_document(
         file_path=str(file_path),
         file_size=file_size,
         mime_type=file.content_type,
-        processed=False
+        content_hash=content_hash,
+        processed=False,
+        status="pending"
     )
     
     db.add(new_document)
+    db.flush()
+    
+    # İşleme kuyruğuna ekle (worker process alır)
+    enqueue_document(db, new_document.id)
     db.commit()
     db.refresh(new_document)
     
-    # Background task başlat
-    background_tasks.add_task(process_document_task, new_document.id)
-    
     return {
         "id": new_document.id,
         "filename": new_document.filename,
@@ -151,7 +161,8 @@ async def get_room_documents(
     # Oda kontrolü
     room = db.query(Room).filter(
         Room.id == room_id,
-        Room.user_id == user_id
+        Room.user_id == user_id,
+        Room.deleted_at.is_(None)
     ).first()
     
     if not room:
@@ -160,7 +171,10 @@ async def get_room_documents(
             detail="Oda bulunamadı"
         )
     
-    documents = db.query(Document).filter(Document.room_id == room_id).all()
+    documents = db.query(Document).filter(
+        Document.room_id == room_id,
+        Document.deleted_at.is_(None)
+    ).all()
     return documents
 
 @router.get("/{document_id}", response_model=DocumentResponse)
@@ -174,7 +188,8 @@ async def get_document(
     """
     document = db.query(Document).join(Room).filter(
         Document.id == document_id,
-        Room.user_id == user_id
+        Room.user_id == user_id,
+        Document.deleted_at.is_(None)
     ).first()
     
     if not document:
@@ -185,18 +200,19 @@ async def get_document(
     
     return document
 
-@router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_document(
+@router.get("/{document_id}/status", response_model=DocumentProcessingStatus)
+async def get_document_status(
     document_id: int,
     user_id: int = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
     """
-    Dökümanı sil (fiziksel dosya + Pinecone vektörleri + database)
+    Dökümanın işlenme durumunu getir
     """
     document = db.query(Document).join(Room).filter(
         Document.id == document_id,
-        Room.user_id == user_id
+        Room.user_id == user_id,
+        Document.deleted_at.is_(None)
     ).first()
     
     if not document:
@@ -205,38 +221,44 @@ async def delete_document(
             detail="Döküman bulunamadı"
         )
     
-    # 1. Pinecone'dan vektörleri sil
-    try:
-        if document.pinecone_vector_ids and len(document.pinecone_vector_ids) > 0:
-            pinecone_client = Pinecone(api_key=settings.PINECONE_API_KEY)
-            index = pinecone_client.Index(settings.PINECONE_INDEX_NAME)
-            namespace = document.room.pinecone_namespace
-            
-            # JSON field zaten list olarak gelir, direkt kullan
-            index.delete(
-                ids=document.pinecone_vector_ids,
-                namespace=namespace
-            )
-            logger.info(f"Deleted {len(document.pinecone_vector_ids)} vectors from Pinecone")
-        else:
-            logger.warning(f"No vector IDs found for document {document_id}")
-            
-    except Exception as e:
-        logger.error(f"Pinecone silme hatası: {str(e)}", exc_info=True)
-        # Pinecone hatası olsa bile devam et, dosya ve database silinsin
+    return DocumentProcessingStatus(
+        document_id=document.id,
+        filename=document.filename,
+        processed=document.processed,
+        chunk_count=document.chunk_count,
+        status=document.status or "pending",
+        chunks_done=document.chunks_done or 0,
+        chunks_total=document.chunks_total
+    )
+
+@router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_document(
+    document_id: int,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Dökümanı sil (soft delete). Vektörler, dosya ve satır worker'daki
+    garbage collector tarafından toplu olarak silinir.
+    """
+    document = db.query(Document).join(Room).filter(
+        Document.id == document_id,
+        Room.user_id == user_id,
+        Document.deleted_at.is_(None)
+    ).first()
     
-    # 2. Fiziksel dosyayı sil
-    file_path = Path(document.file_path)
-    if file_path.exists():
-        try:
-            file_path.unlink()
-            logger.info(f"Deleted file: {file_path}")
-        except Exception as e:
-            logger.error(f"Dosya silinirken hata: {e}")
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Döküman bulunamadı"
+        )
     
-    # 3. Database'den sil
-    db.delete(document)
+    document.deleted_at = func.now()
     db.commit()
     
-    logger.info(f"Document {document_id} fully deleted")
+    # Silinen dökümanın chunk'ları cevaplarda hemen görünmez (hydration filtreler)
+    vector_cache.invalidate(document.room.pinecone_namespace)
+    answer_cache.invalidate(document.room.pinecone_namespace)
+    
+    logger.info(f"Document {document_id} marked as deleted")
     return None
\ No newline at end of file
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
 from typing import List
+from app.config import settings
 from app.database import get_db
 from app.models import Room, Document, Message
 from app.schemas import RoomCreate, RoomUpdate, RoomResponse, RoomWithStats
 from app.utils import get_current_user_id
+from app.services.answer_cache import answer_cache
+from app.services.vector_cache import vector_cache, room_vector_version
+from app.services.vector_store import room_vector_store, vector_shards
 
 router = APIRouter(prefix="/rooms", tags=["Rooms"])
 
@@ -18,7 +23,10 @@ async def create_room(
     Yeni oda oluştur
     """
     # Pinecone namespace oluştur (unique)
-    user_room_count = db.query(Room).filter(Room.user_id == user_id).count()
+    user_room_count = db.query(Room).filter(
+        Room.user_id == user_id,
+        Room.deleted_at.is_(None)
+    ).count()
     
     if user_room_count >= 2:
         raise HTTPException(
@@ -34,7 +42,10 @@ async def create_room(
         name=room_data.name,
         description=room_data.description,
         emoji=room_data.emoji,
-        pinecone_namespace=namespace
+        pinecone_namespace=namespace,
+        vector_shard=vector_shards.assign(namespace),
+        embedding_model=settings.OPENAI_EMBEDDING_MODEL,
+        embedding_dimensions=settings.OPENAI_EMBEDDING_DIMENSIONS
     )
     
     db.add(new_room)
@@ -51,7 +62,10 @@ async def get_user_rooms(
     """
     Kullanıcının tüm odalarını listele (istatistiklerle)
     """
-    rooms = db.query(Room).filter(Room.user_id == user_id).all()
+    rooms = db.query(Room).filter(
+        Room.user_id == user_id,
+        Room.deleted_at.is_(None)
+    ).all()
     
     # Her oda için istatistikleri ekle
     rooms_with_stats = []
@@ -63,9 +77,11 @@ async def get_user_rooms(
             "description": room.description,
             "emoji": room.emoji,
             "pinecone_namespace": room.pinecone_namespace,
+            "embedding_model": room.embedding_model,
+            "embedding_dimensions": room.embedding_dimensions,
             "created_at": room.created_at,
             "updated_at": room.updated_at,
-            "document_count": len(room.documents),
+            "document_count": len(room.live_documents),
             "message_count": len(room.messages)
         }
         rooms_with_stats.append(room_dict)
@@ -75,6 +91,7 @@ async def get_user_rooms(
 @router.get("/{room_id}", response_model=RoomWithStats)
 async def get_room(
     room_id: int,
+    background_tasks: BackgroundTasks,
     user_id: int = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
@@ -83,7 +100,8 @@ async def get_room(
     """
     room = db.query(Room).filter(
         Room.id == room_id,
-        Room.user_id == user_id
+        Room.user_id == user_id,
+        Room.deleted_at.is_(None)
     ).first()
     
     if not room:
@@ -92,6 +110,14 @@ async def get_room(
             detail="Oda bulunamadı"
         )
     
+    # Kullanıcı odayı açtı, muhtemelen soru soracak: vektörleri yanıt sonrası cache'e al
+    background_tasks.add_task(
+        vector_cache.prewarm,
+        room.pinecone_namespace,
+        room_vector_version(db, room.id),
+        room_vector_store(room)
+    )
+    
     return {
         "id": room.id,
         "user_id": room.user_id,
@@ -101,7 +127,7 @@ async def get_room(
         "pinecone_namespace": room.pinecone_namespace,
         "created_at": room.created_at,
         "updated_at": room.updated_at,
-        "document_count": len(room.documents),
+        "document_count": len(room.live_documents),
         "message_count": len(room.messages)
     }
 
@@ -117,7 +143,8 @@ async def update_room(
     """
     room = db.query(Room).filter(
         Room.id == room_id,
-        Room.user_id == user_id
+        Room.user_id == user_id,
+        Room.deleted_at.is_(None)
     ).first()
     
     if not room:
@@ -146,11 +173,13 @@ async def delete_room(
     db: Session = Depends(get_db)
 ):
     """
-    Oda sil (cascade: documents ve messages de silinir)
+    Oda sil (soft delete). Namespace, dosyalar ve satırlar worker'daki
+    garbage collector tarafından toplu olarak silinir.
     """
     room = db.query(Room).filter(
         Room.id == room_id,
-        Room.user_id == user_id
+        Room.user_id == user_id,
+        Room.deleted_at.is_(None)
     ).first()
     
     if not room:
@@ -159,7 +188,15 @@ async def delete_room(
             detail="Oda bulunamadı"
         )
     
-    db.delete(room)
+    deleted_at = func.now()
+    room.deleted_at = deleted_at
+    db.query(Document).filter(
+        Document.room_id == room.id,
+        Document.deleted_at.is_(None)
+    ).update({"deleted_at": deleted_at}, synchronize_session=False)
     db.commit()
     
+    vector_cache.invalidate(room.pinecone_namespace)
+    answer_cache.invalidate(room.pinecone_namespace)
+    
     return None
@@ -10,6 +10,7 @@ class DocumentResponse(BaseModel):
     file_size: Optional[int]
     mime_type: Optional[str]
     processed: bool
+    status: Optional[str] = None
     chunk_count: int
     created_at: datetime
     
@@ -30,3 +31,5 @@ class DocumentProcessingStatus(BaseModel):
     processed: bool
     chunk_count: int
     status: str  # 'pending', 'processing', 'completed', 'failed'
+    chunks_done: int = 0  # aranabilir chunk sayısı (işlenirken de artar)
+    chunks_total: Optional[int] = None  # chunk'lama bitene kadar None
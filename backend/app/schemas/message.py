@@ -21,6 +21,7 @@ class ChatResponse(BaseModel):
     answer: str
     sources: List[MessageSource] = []
     tokens_used: int
+    prompt_tokens: Optional[int] = None  # bu cevap için gönderilen prompt token'ları (cache'ten ise 0)
     created_at: datetime
 
 # Message Response (genel)
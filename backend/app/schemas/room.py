@@ -22,6 +22,8 @@ class RoomResponse(BaseModel):
     description: Optional[str]
     emoji: str
     pinecone_namespace: Optional[str]
+    embedding_model: Optional[str] = None
+    embedding_dimensions: Optional[int] = None
     created_at: datetime
     updated_at: datetime
     
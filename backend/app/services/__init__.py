@@ -1,5 +1,6 @@
 from app.services.document_processor import document_processor
 from app.services.background_tasks import process_document_task
 from app.services.chat_service import chat_service
+from app.services.job_queue import enqueue_document
 
-__all__ = ["document_processor", "process_document_task", "chat_service"]
+__all__ = ["document_processor", "process_document_task", "chat_service", "enqueue_document"]
@@ -0,0 +1,160 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, NamedTuple, Optional
+import copy
+import threading
+import numpy as np
+from app.config import settings
+from app.services.query_embedding_cache import normalize_question
+import logging
+
+logger = logging.getLogger(__name__)
+
+class _Answer(NamedTuple):
+    embedding: Optional[np.ndarray]  # birim uzunlukta, near-duplicate eşleşme için
+    result: Dict[str, Any]
+
+class _RoomAnswers:
+    def __init__(self, version: Hashable):
+        self.version = version
+        self.answers: "OrderedDict[str, _Answer]" = OrderedDict()
+
+class AnswerCache:
+    """
+    In-process cache of chat answers per room namespace.
+
+    All answers of a room are tagged with the room's document fingerprint
+    (see `room_vector_version`): ingesting a batch, finishing a document or
+    deleting one changes it, and the room's answers are dropped on the next
+    lookup. This also covers the worker, which runs in another process;
+    deletes through the API additionally call `invalidate`. A question is
+    matched exactly after normalization, or, when `similarity_threshold` is
+    set, by cosine similarity of its embedding to an earlier question of
+    the same room. At most `max_entries` answers are kept, least recently
+    used first out.
+    """
+
+    def __init__(self, max_entries: int = None, similarity_threshold: float = None):
+        self.max_entries = settings.ANSWER_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.similarity_threshold = (
+            settings.ANSWER_CACHE_SIMILARITY_THRESHOLD if similarity_threshold is None else similarity_threshold
+        )
+        self._rooms: "OrderedDict[str, _RoomAnswers]" = OrderedDict()
+        self._count = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def _room(self, namespace: str, version: Hashable) -> Optional[_RoomAnswers]:
+        room = self._rooms.get(namespace)
+        if room is not None and room.version != version:
+            # Dökümanlar değişti: odanın bütün cevapları eskidi
+            self._drop(namespace)
+            room = None
+        if room is not None:
+            self._rooms.move_to_end(namespace)
+        return room
+
+    def get(self, namespace: str, version: Hashable, question: str) -> Optional[Dict[str, Any]]:
+        """Normalize edilmiş sorunun aynısı cevaplandıysa cevabı döndür"""
+        if self.max_entries <= 0 or version is None:
+            return None
+        text = normalize_question(question)
+        with self._lock:
+            room = self._room(namespace, version)
+            answer = room.answers.get(text) if room is not None else None
+            if answer is None:
+                # near-duplicate kontrolü embedding'le yapılır, miss orada sayılır
+                if self.similarity_threshold <= 0:
+                    self.misses += 1
+                return None
+            room.answers.move_to_end(text)
+            self.hits += 1
+            return copy.deepcopy(answer.result)
+
+    def match(self, namespace: str, version: Hashable, embedding: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Embedding'i eşik üstünde benzeyen önceki sorunun cevabı"""
+        if self.max_entries <= 0 or version is None or self.similarity_threshold <= 0:
+            return None
+        query = _unit(embedding)
+        with self._lock:
+            room = self._room(namespace, version)
+            candidates = [
+                (text, answer) for text, answer in (room.answers.items() if room is not None else ())
+                if answer.embedding is not None and answer.embedding.shape == query.shape
+            ]
+            if not candidates:
+                self.misses += 1
+                return None
+            scores = np.stack([answer.embedding for _, answer in candidates]) @ query
+            best = int(np.argmax(scores))
+            if float(scores[best]) < self.similarity_threshold:
+                self.misses += 1
+                return None
+            text, answer = candidates[best]
+            room.answers.move_to_end(text)
+            self.near_hits += 1
+            return copy.deepcopy(answer.result)
+
+    def put(
+        self,
+        namespace: str,
+        version: Hashable,
+        question: str,
+        embedding: Optional[np.ndarray],
+        result: Dict[str, Any]
+    ) -> None:
+        if self.max_entries <= 0 or version is None:
+            return
+        text = normalize_question(question)
+        answer = _Answer(_unit(embedding) if embedding is not None else None, copy.deepcopy(result))
+        with self._lock:
+            room = self._room(namespace, version)
+            if room is None:
+                room = self._rooms[namespace] = _RoomAnswers(version)
+            if text not in room.answers:
+                self._count += 1
+            room.answers[text] = answer
+            room.answers.move_to_end(text)
+            while self._count > self.max_entries:
+                self._evict_one()
+
+    def _evict_one(self) -> None:
+        # En uzun süredir kullanılmayan odanın en eski cevabı
+        namespace, room = next(iter(self._rooms.items()))
+        room.answers.popitem(last=False)
+        self._count -= 1
+        if not room.answers:
+            del self._rooms[namespace]
+
+    def _drop(self, namespace: str) -> None:
+        room = self._rooms.pop(namespace, None)
+        if room is not None:
+            self._count -= len(room.answers)
+
+    def invalidate(self, namespace: str) -> None:
+        with self._lock:
+            self._drop(namespace)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rooms.clear()
+            self._count = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "rooms": len(self._rooms),
+                "entries": self._count,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses
+            }
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+# Singleton (API process'i içinde paylaşılır)
+answer_cache = AnswerCache()
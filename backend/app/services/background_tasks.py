@@ -1,47 +1,127 @@
 from app.services.document_processor import document_processor
+from app.services.chunk_store import copy_chunks, delete_chunks, save_chunks
 from app.database import SessionLocal
-from app.models import Document
+from app.services.embedding_batcher import resolve_embedding
+from app.services.vector_store import room_vector_store
+from app.config import settings
+from app.models import Document, Room
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+def find_processed_duplicate(db: Session, document: Document, room: Room) -> Optional[Document]:
+    """Aynı içerik hash'ine sahip, aynı embedding uzayındaki odada işlenmiş başka bir döküman"""
+    if not document.content_hash:
+        return None
+    
+    model, dimensions = resolve_embedding(room.embedding_model, room.embedding_dimensions)
+    return db.query(Document).join(Room, Room.id == Document.room_id).filter(
+        Document.content_hash == document.content_hash,
+        Document.processed == True,
+        Document.chunk_count > 0,
+        Document.id != document.id,
+        # GC vektörlerini her an silebilir
+        Document.deleted_at.is_(None),
+        # Farklı model/boyuttaki vektörler kopyalanamaz
+        func.coalesce(Room.embedding_model, settings.OPENAI_EMBEDDING_MODEL) == model,
+        func.coalesce(Room.embedding_dimensions, settings.OPENAI_EMBEDDING_DIMENSIONS) == dimensions
+    ).order_by(Document.id.desc()).first()
+
 def process_document_task(document_id: int):
-    """Background task: Dökümanı işle"""
+    """
+    Worker task: Dökümanı işle.
+    Hata durumunda exception fırlatılır, retry kararını job queue verir.
+    """
     db = SessionLocal()
-    
+
     try:
         document = db.query(Document).filter(Document.id == document_id).first()
-        
+
         if not document:
             logger.error(f"Document bulunamadı: {document_id}")
             return
-        
-        namespace = document.room.pinecone_namespace
-        
+
+        if document.deleted_at is not None:
+            logger.info(f"Document {document_id} silinmiş, işlenmeyecek")
+            return
+
+        # FOR SHARE: embedding migration'ın namespace değişimi bu okumayla yarışmaz
+        # (kilit ilk commit'te bırakılır, o zamana kadar döküman 'processing' görünür)
+        room = db.query(Room).filter(Room.id == document.room_id).with_for_update(read=True).one()
+        namespace = room.pinecone_namespace
+        store = room_vector_store(room)
+
         logger.info(f"Processing document {document_id}: {document.filename}")
+
+        result = None
+        source = find_processed_duplicate(db, document, room)
         
-        result = document_processor.process_document(
-            file_path=document.file_path,
-            document_id=document.id,
-            filename=document.filename,
-            namespace=namespace
-        )
+        if source:
+            # Aynı içerik daha önce işlenmiş: vektörleri kopyala
+            try:
+                copied = document_processor.copy_document_vectors(
+                    source_namespace=source.room.pinecone_namespace,
+                    source_document_id=source.id,
+                    chunk_count=source.chunk_count,
+                    namespace=namespace,
+                    document_id=document.id,
+                    filename=document.filename,
+                    source_store=room_vector_store(source.room),
+                    store=store
+                )
+                delete_chunks(db, document.id)
+                copy_chunks(db, source.id, document.id)
+                result = copied
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"Document {source.id} vektörleri kopyalanamadı, baştan işlenecek: {e}")
         
+        if result is None:
+            # Önceki (yarım kalmış) denemenin chunk'ları baştan yazılır
+            delete_chunks(db, document.id)
+            document.chunks_done = 0
+            document.chunks_total = None
+            db.commit()
+            
+            def store_chunks(start_index: int, chunks) -> None:
+                save_chunks(db, document.id, start_index, chunks)
+                db.commit()
+            
+            def report_progress(chunks_done: int, chunks_total: Optional[int]) -> None:
+                # Yüklenen chunk'lar şimdiden aranabilir, kullanıcı ilerlemeyi status'tan görür
+                document.chunks_done = chunks_done
+                document.chunks_total = chunks_total
+                db.commit()
+            
+            result = document_processor.process_document(
+                file_path=document.file_path,
+                document_id=document.id,
+                filename=document.filename,
+                namespace=namespace,
+                on_progress=report_progress,
+                on_chunks=store_chunks,
+                embedding_model=room.embedding_model,
+                embedding_dimensions=room.embedding_dimensions,
+                store=store
+            )
+
         document.processed = True
+        document.status = "completed"
         document.chunk_count = result["chunk_count"]
-        document.pinecone_vector_ids = result["vector_ids"]
-        
+        document.chunks_done = result["chunk_count"]
+        document.chunks_total = result["chunk_count"]
+
         db.commit()
-        
+
         logger.info(f"Document {document_id} başarıyla işlendi!")
-        
+
     except Exception as e:
         logger.error(f"Document processing hatası ({document_id}): {e}")
-        
-        document = db.query(Document).filter(Document.id == document_id).first()
-        if document:
-            document.processed = False
-            db.commit()
-    
+        db.rollback()
+        raise
+
     finally:
         db.close()
@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import threading
+import time
+from app.config import settings
+from app.services.metrics import LatencyStats
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ExecutorBusy(Exception):
+    """Raised when the executor's wait queue is full"""
+
+class BoundedExecutor:
+    """
+    Named thread pool for blocking calls made from the event loop.
+
+    At most `max_workers` calls run at once and at most `max_queue` wait
+    for a thread; past that `run` fails fast with ExecutorBusy instead of
+    queueing without bound. Each call has a timeout: a call still waiting
+    is cancelled, a call already running cannot be interrupted and keeps
+    its thread until it returns. Queue depth, queue wait and run time are
+    kept for /metrics.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, timeout: float):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.queue_wait = LatencyStats()
+        self.run_time = LatencyStats()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=self.name
+                )
+            return self._executor
+
+    async def run(self, fn: Callable[[], Any], timeout: float = None) -> Any:
+        """fn'i havuzda çalıştır; kuyruk doluysa ExecutorBusy, süre aşılırsa asyncio.TimeoutError"""
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise ExecutorBusy(f"{self.name}: {self.queued} çağrı kuyrukta bekliyor")
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        submitted = time.monotonic()
+
+        def call():
+            started = time.monotonic()
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+            self.queue_wait.record(started - submitted)
+            try:
+                return fn()
+            finally:
+                self.run_time.record(time.monotonic() - started)
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+
+        future = self.executor.submit(call)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout if timeout > 0 else None)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            logger.warning(f"{self.name}: çağrı {timeout}s içinde bitmedi")
+            raise
+        finally:
+            # Başlamadan iptal edilen çağrı kuyruktan düşer
+            if future.cancel():
+                with self._lock:
+                    self.queued -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "active": self.active,
+                "max_queued": self.max_queued,
+                "completed": self.completed,
+                "timeouts": self.timeouts,
+                "rejected": self.rejected
+            }
+        return {**counters, "queue_wait": self.queue_wait.stats(), "run_time": self.run_time.stats()}
+
+# Singleton: chat'teki vector store sorguları (default executor'daki diğer işlerin arkasında beklemez)
+vector_query_executor = BoundedExecutor(
+    "vector-query",
+    max_workers=settings.VECTOR_QUERY_WORKERS,
+    max_queue=settings.VECTOR_QUERY_MAX_QUEUE,
+    timeout=settings.VECTOR_QUERY_TIMEOUT_SECONDS
+)
+
+# Singleton: soru embedding cache'inin SQLite disk tier'ı (vector sorgularıyla thread paylaşmaz)
+query_cache_executor = BoundedExecutor(
+    "query-cache-disk",
+    max_workers=settings.QUERY_EMBEDDING_DISK_WORKERS,
+    max_queue=settings.QUERY_EMBEDDING_DISK_MAX_QUEUE,
+    timeout=settings.QUERY_EMBEDDING_DISK_TIMEOUT_SECONDS
+)
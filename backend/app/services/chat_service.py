@@ -1,10 +1,22 @@
-from typing import List, Dict, Any
-from pinecone import Pinecone
+from typing import AsyncIterator, List, Dict, Any, Hashable, Optional, Set, Tuple
+from sqlalchemy.orm import Session
 from app.config import settings
+from app.services.vector_store import VectorMatch, VectorStore, vector_store
+from app.services.vector_cache import unsettled_until, vector_cache
+from app.services.chunk_store import load_chunks
+from app.services.embedding_batcher import decode_embedding, embedding_request, resolve_embedding
+from app.services.embedding_cache import space_key
+from app.services.query_embedding_cache import query_embedding_cache
+from app.services.answer_cache import answer_cache
+from app.services.bounded_executor import ExecutorBusy, query_cache_executor, vector_query_executor
+from app.services.context_packer import pack_context
+from app.services.metrics import LatencyStats
 import logging
 
 import asyncio
+import time
 from functools import partial
+import numpy as np
 from openai import AsyncOpenAI
 
 logger = logging.getLogger(__name__)
@@ -14,63 +26,147 @@ class ChatService:
     
     def __init__(self):
         self.openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-        self.pinecone_client = Pinecone(api_key=settings.PINECONE_API_KEY)
-        self.index = self.pinecone_client.Index(settings.PINECONE_INDEX_NAME)
+        # Backend Settings.VECTOR_STORE_BACKEND ile seçilir; oda başka bir shard'daysa
+        # çağıran o shard'ın store'unu verir
+        self.vector_store = vector_store
+        # Küçük odaların vektörleri process içinde tutulur (bkz. room_vector_version)
+        self.vector_cache = vector_cache
+        # Vector store sorguları ayrı, sınırlı bir thread havuzunda (süre sınırı ve kuyruk metrikleriyle)
+        self.query_executor = vector_query_executor
+        # Aynı soru tekrar sorulduğunda embedding API'sine gidilmez
+        self.query_cache = query_embedding_cache
+        # Disk tier okuma/yazmaları kendi küçük havuzunda; arka plandaki yazmalar referansla tutulur
+        self.query_cache_executor = query_cache_executor
+        self._pending_persists: Set[asyncio.Future] = set()
+        # Odanın dökümanları değişmediyse aynı soru tekrar cevaplanmaz
+        self.answer_cache = answer_cache
+        # Streaming chat'te isteğin başından ilk parçaya kadar geçen süre
+        self.time_to_first_token = LatencyStats()
     
-    async def create_query_embedding(self, question: str) -> List[float]:
-        """Convert question to embedding"""
+    async def create_query_embedding(
+        self,
+        question: str,
+        model: Optional[str] = None,
+        dimensions: Optional[int] = None
+    ) -> np.ndarray:
+        """Convert question to a float32 embedding (in the room's embedding model/dimensions)"""
+        model, dimensions = resolve_embedding(model, dimensions)
+        space = space_key(model, dimensions)
+        
+        embedding = self.query_cache.lookup(space, question)
+        if embedding is None and self.query_cache.disk is not None:
+            try:
+                embedding = await self.query_cache_executor.run(partial(self.query_cache.load, space, question))
+            except (ExecutorBusy, asyncio.TimeoutError) as e:
+                # Disk meşgul: beklemek yerine API'ye gidilir
+                logger.warning(f"Soru embedding cache'i okunamadı: {e!r}")
+        if embedding is not None:
+            return embedding
+        
         response = await self.openai_client.embeddings.create(
             input=question,
-            model=settings.OPENAI_EMBEDDING_MODEL
+            **embedding_request(model, dimensions)
         )
-        return response.data[0].embedding
+        embedding = decode_embedding(response.data[0].embedding)
+        
+        self.query_cache.put(space, question, embedding)
+        if self.query_cache.disk is not None:
+            # Cevabı bekletmeden arka planda yazılır (kuyrukta süre sınırı yok)
+            persist = asyncio.ensure_future(
+                self.query_cache_executor.run(partial(self.query_cache.persist, space, question, embedding), timeout=0)
+            )
+            self._pending_persists.add(persist)
+            persist.add_done_callback(self._persist_done)
+        return embedding
+    
+    def _persist_done(self, persist: asyncio.Future) -> None:
+        self._pending_persists.discard(persist)
+        if not persist.cancelled() and persist.exception() is not None:
+            logger.warning(f"Soru embedding'i diske yazılamadı: {persist.exception()!r}")
     
     async def search_relevant_chunks(
         self, 
-        query_embedding: List[float], 
+        query_embedding: np.ndarray, 
         namespace: str,
-        top_k: int = 10
+        top_k: Optional[int] = None,
+        version: Hashable = None,
+        db: Optional[Session] = None,
+        store: Optional[VectorStore] = None
     ) -> List[Dict[str, Any]]:
-        """Find relevant chunks in Pinecone"""
-        
-        loop = asyncio.get_event_loop()
-        results = await loop.run_in_executor(
-            None,
-            partial(
-                self.index.query,
-                namespace=namespace,
-                vector=query_embedding,
-                top_k=top_k,
-                include_metadata=True
+        """Find relevant chunks (in-process cache for a known room version, else the room's shard via query_executor)"""
+        
+        top_k = top_k or settings.CHAT_TOP_K
+        entry = self.vector_cache.lookup(namespace, version) if version is not None else None
+        if entry is not None:
+            # Cache'te: tek dot product, executor'a gerek yok
+            matches = entry.query(query_embedding, top_k)
+        else:
+            matches = await self.query_executor.run(
+                partial(self.vector_cache.query, namespace, query_embedding, top_k, version, store or self.vector_store)
             )
-        )
         
-        chunks = []
-        for match in results['matches']:
-            if match['score'] > 0.5:
-                chunks.append({
-                    'text': match['metadata'].get('text', ''),
-                    'score': match['score'],
-                    'document_id': match['metadata'].get('document_id'),
-                    'filename': match['metadata'].get('filename')
-                })
+        chunks = self.hydrate_chunks(db, [match for match in matches if match.score > 0.5])
         
         logger.info(f"Found {len(chunks)} relevant chunks (threshold: 0.5)")
         return chunks
     
-    async def generate_answer(
-        self, 
-        question: str, 
-        context_chunks: List[Dict[str, Any]]
-    ) -> Dict[str, Any]:
-        """Generate answer using OpenAI GPT"""
+    def hydrate_chunks(self, db: Optional[Session], matches: List[VectorMatch]) -> List[Dict[str, Any]]:
+        """Seçilen eşleşmelerin text'ini chunks tablosundan tek sorguda oku"""
         
-        sorted_chunks = sorted(context_chunks, key=lambda x: x['score'], reverse=True)
+        def key(match: VectorMatch):
+            # Pinecone sayısal metadata'yı float döndürür
+            meta = match.metadata
+            if 'document_id' not in meta or 'chunk_index' not in meta:
+                return None
+            return (int(meta['document_id']), int(meta['chunk_index']))
         
-        context = "\n\n---\n\n".join([
-            f"Source File: {chunk['filename']}\nContent: {chunk['text']}" 
-            for chunk in sorted_chunks[:5]
-        ])
+        rows = {}
+        if db is not None:
+            rows = load_chunks(db, [k for k in map(key, matches) if k is not None])
+        
+        chunks = []
+        for match in matches:
+            meta = match.metadata
+            row = rows.get(key(match))
+            start_offset = end_offset = None
+            if row is not None:
+                chunk, filename = row
+                text, page_number = chunk.text, chunk.page_number
+                # Context packing örtüşen chunk'ları offset'lerle birleştirir
+                start_offset, end_offset = chunk.start_offset, chunk.end_offset
+            elif 'text' in meta:
+                # Text'i metadata'da taşıyan eski vektörler
+                text, filename, page_number = meta['text'], meta.get('filename'), meta.get('page_number')
+            else:
+                # Dökümanı silinmiş, vektörü henüz silinmemiş chunk
+                continue
+            chunks.append({
+                'text': text,
+                'score': match.score,
+                'document_id': int(meta['document_id']) if 'document_id' in meta else None,
+                'chunk_index': int(meta['chunk_index']) if 'chunk_index' in meta else None,
+                'filename': filename,
+                'page_number': int(page_number) if page_number is not None else None,
+                'start_offset': start_offset,
+                'end_offset': end_offset
+            })
+        return chunks
+    
+    def build_messages(
+        self,
+        question: str,
+        context_chunks: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, str]], List[Dict[str, Any]]]:
+        """
+        GPT mesajları ve cevapla döndürülecek kaynaklar. En yüksek skorlu
+        CHAT_TOP_K chunk birleştirilip CHAT_CONTEXT_MAX_TOKENS bütçesine
+        sığdırılır; kaynaklar prompt'a giren chunk'lardır.
+        """
+        
+        sorted_chunks = sorted(context_chunks, key=lambda x: x['score'], reverse=True)[:settings.CHAT_TOP_K]
+        packed = pack_context(sorted_chunks)
+        context = packed.text
+        logger.info(f"Context: {len(packed.chunks)}/{len(sorted_chunks)} chunks, {packed.tokens} tokens")
         
         system_prompt = """You are a professional AI assistant. You provide accurate and detailed answers based on the provided documents.
 
@@ -93,53 +189,212 @@ RULES:
 === INSTRUCTIONS ===
 Answer the question in detail based on the documents above. Cite which source each piece of information comes from."""
         
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        sources = [
+            {
+                "document_id": chunk['document_id'],
+                "filename": chunk['filename'],
+                "page_number": chunk.get('page_number'),
+                "score": round(chunk['score'], 3),
+                "chunk_text": chunk['text']
+            }
+            for chunk in packed.chunks
+        ]
+        return messages, sources
+    
+    async def generate_answer(
+        self, 
+        question: str, 
+        context_chunks: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Generate answer using OpenAI GPT"""
+        
+        messages, sources = self.build_messages(question, context_chunks)
+        
         response = await self.openai_client.chat.completions.create(
             model=settings.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
+            messages=messages,
             temperature=0.3,
             max_tokens=800
         )
         
-        answer = response.choices[0].message.content
+        # content filter vb. durumlarda content None gelebilir
+        answer = response.choices[0].message.content or ""
         tokens_used = response.usage.total_tokens
         
         return {
             "answer": answer,
             "tokens_used": tokens_used,
-            "sources": [
-                {
-                    "document_id": chunk['document_id'],
-                    "filename": chunk['filename'],
-                    "score": round(chunk['score'], 3),
-                    "chunk_text": chunk['text']
-                }
-                for chunk in sorted_chunks[:5]
-            ]
+            "prompt_tokens": response.usage.prompt_tokens,
+            "sources": sources
         }
-        
-    async def chat(self, question: str, namespace: str) -> Dict[str, Any]:
-        """Main chat function"""
+    
+    async def stream_answer(self, messages: List[Dict[str, str]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Cevabı geldikçe parça parça üret: {"token": str} olayları, en sonda
+        {"tokens_used": int, "prompt_tokens": int}. İptal edilirse OpenAI
+        bağlantısı kapatılır.
+        """
+        response = await self.openai_client.chat.completions.create(
+            model=settings.OPENAI_MODEL,
+            messages=messages,
+            temperature=0.3,
+            max_tokens=800,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        try:
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield {"token": chunk.choices[0].delta.content}
+                if chunk.usage is not None:
+                    yield {"tokens_used": chunk.usage.total_tokens, "prompt_tokens": chunk.usage.prompt_tokens}
+        finally:
+            await response.close()
+    
+    async def _retrieve(
+        self,
+        question: str,
+        namespace: str,
+        version: Hashable,
+        db: Optional[Session],
+        embedding_model: Optional[str],
+        embedding_dimensions: Optional[int],
+        store: Optional[VectorStore]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[np.ndarray], List[Dict[str, Any]]]:
+        """(hazır cevap: cache'ten ya da ilgili chunk yoksa, soru embedding'i, ilgili chunk'lar)"""
         
         logger.info(f"Chat question: {question[:100]}...")
         
-        query_embedding = await self.create_query_embedding(question)
-        relevant_chunks = await self.search_relevant_chunks(query_embedding, namespace)
+        cached = self.answer_cache.get(namespace, version, question)
+        if cached is not None:
+            return self._cached_answer(cached), None, []
+        
+        query_embedding = await self.create_query_embedding(question, embedding_model, embedding_dimensions)
         
+        cached = self.answer_cache.match(namespace, version, query_embedding)
+        if cached is not None:
+            return self._cached_answer(cached), query_embedding, []
+        
+        relevant_chunks = await self.search_relevant_chunks(query_embedding, namespace, version=version, db=db, store=store)
         if not relevant_chunks:
             logger.warning("No relevant chunks found")
-            return {
+            result = {
                 "answer": "I'm sorry, I couldn't find relevant information in the provided documents to answer this question.",
                 "tokens_used": 0,
+                "prompt_tokens": 0,
                 "sources": []
             }
+            self._remember_answer(namespace, version, question, query_embedding, result, store)
+            return result, query_embedding, []
+        return None, query_embedding, relevant_chunks
+        
+    async def chat(
+        self,
+        question: str,
+        namespace: str,
+        version: Hashable = None,
+        db: Optional[Session] = None,
+        embedding_model: Optional[str] = None,
+        embedding_dimensions: Optional[int] = None,
+        store: Optional[VectorStore] = None
+    ) -> Dict[str, Any]:
+        """Main chat function"""
+        
+        result, query_embedding, relevant_chunks = await self._retrieve(
+            question, namespace, version, db, embedding_model, embedding_dimensions, store
+        )
+        if result is not None:
+            return result
         
         result = await self.generate_answer(question, relevant_chunks)
+        logger.info(f"Chat completed: {len(relevant_chunks)} chunks used, {result['tokens_used']} tokens ({result['prompt_tokens']} prompt)")
+        
+        self._remember_answer(namespace, version, question, query_embedding, result, store)
+        return result
+    
+    async def chat_stream(
+        self,
+        question: str,
+        namespace: str,
+        version: Hashable = None,
+        db: Optional[Session] = None,
+        embedding_model: Optional[str] = None,
+        embedding_dimensions: Optional[int] = None,
+        store: Optional[VectorStore] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming chat: önce {"event": "sources"}, sonra her parça için
+        {"event": "token"}, en sonda {"event": "done"} (tokens_used,
+        prompt_tokens, ttft_ms).
+        Time-to-first-token isteğin başından ilk parçaya kadar ölçülür.
+        """
+        started = time.monotonic()
+        first_token_at = None
         
-        logger.info(f"Chat completed: {len(relevant_chunks)} chunks used, {result['tokens_used']} tokens")
+        result, query_embedding, relevant_chunks = await self._retrieve(
+            question, namespace, version, db, embedding_model, embedding_dimensions, store
+        )
+        if result is not None:
+            # Cache'teki ya da boş cevap tek parça halinde gönderilir
+            yield {"event": "sources", "data": result["sources"]}
+            first_token_at = time.monotonic()
+            self.time_to_first_token.record(first_token_at - started)
+            yield {"event": "token", "data": result["answer"]}
+            tokens_used, prompt_tokens = result["tokens_used"], result["prompt_tokens"]
+        else:
+            messages, sources = self.build_messages(question, relevant_chunks)
+            yield {"event": "sources", "data": sources}
+            
+            parts = []
+            tokens_used = prompt_tokens = 0
+            async for part in self.stream_answer(messages):
+                if "token" in part:
+                    if first_token_at is None:
+                        first_token_at = time.monotonic()
+                        self.time_to_first_token.record(first_token_at - started)
+                    parts.append(part["token"])
+                    yield {"event": "token", "data": part["token"]}
+                else:
+                    tokens_used, prompt_tokens = part["tokens_used"], part["prompt_tokens"]
+            
+            # İptal edilen stream buraya gelmez, yarım cevap cache'lenmez
+            result = {"answer": "".join(parts), "tokens_used": tokens_used, "prompt_tokens": prompt_tokens, "sources": sources}
+            self._remember_answer(namespace, version, question, query_embedding, result, store)
+            logger.info(f"Chat stream completed: {len(relevant_chunks)} chunks used, {tokens_used} tokens ({prompt_tokens} prompt)")
         
+        ttft = first_token_at - started if first_token_at is not None else None
+        yield {
+            "event": "done",
+            "data": {
+                "tokens_used": tokens_used,
+                "prompt_tokens": prompt_tokens,
+                "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None
+            }
+        }
+    
+    def _remember_answer(
+        self,
+        namespace: str,
+        version: Hashable,
+        question: str,
+        query_embedding: Optional[np.ndarray],
+        result: Dict[str, Any],
+        store: Optional[VectorStore]
+    ) -> None:
+        # Boş cevap (content filter vb.) ve tutarlılık penceresinde (son yüklenen
+        # batch henüz aranamıyor olabilir) üretilen cevap cache'lenmez
+        if result["answer"] and unsettled_until(version, store or self.vector_store) is None:
+            self.answer_cache.put(namespace, version, question, query_embedding, result)
+    
+    def _cached_answer(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Cache'ten dönen cevap için yeni token harcanmadı"""
+        logger.info("Chat answered from cache")
+        result["tokens_used"] = 0
+        result["prompt_tokens"] = 0
         return result
 
 # Singleton
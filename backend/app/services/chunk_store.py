@@ -0,0 +1,62 @@
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import insert, literal, select, tuple_
+from sqlalchemy.orm import Session
+from app.models import Chunk, Document
+from app.services.chunker import ChunkSpan
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Chunk text'lerinin asıl kaynağı Postgres; vektör metadata'sında sadece
+# document_id / chunk_index tutulur, text sorgu sonrası toplu olarak okunur.
+
+def save_chunks(db: Session, document_id: int, start_index: int, spans: List[ChunkSpan]) -> None:
+    """Bir batch chunk'ı tek INSERT ile yaz (caller commits)"""
+    if not spans:
+        return
+    db.execute(insert(Chunk), [
+        {
+            "document_id": document_id,
+            "chunk_index": i,
+            "text": span.text,
+            "start_offset": span.start,
+            "end_offset": span.end,
+            "page_number": span.page,
+            "token_count": span.token_count
+        }
+        for i, span in enumerate(spans, start=start_index)
+    ])
+
+def delete_chunks(db: Session, document_id: int) -> None:
+    """Dökümanın chunk'larını sil (yeniden işlemeden önce; caller commits)"""
+    db.query(Chunk).filter(Chunk.document_id == document_id).delete(synchronize_session=False)
+
+def copy_chunks(db: Session, source_document_id: int, document_id: int) -> int:
+    """Aynı içerikli dökümanın chunk'larını yeni döküman için kopyala (caller commits)"""
+    columns = [Chunk.chunk_index, Chunk.text, Chunk.start_offset, Chunk.end_offset, Chunk.page_number, Chunk.token_count]
+    result = db.execute(
+        insert(Chunk).from_select(
+            ["document_id"] + [column.key for column in columns],
+            select(literal(document_id), *columns).where(Chunk.document_id == source_document_id)
+        )
+    )
+    return result.rowcount
+
+def load_chunks(db: Session, keys: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], Tuple[Chunk, str]]:
+    """(document_id, chunk_index) -> (chunk, filename), tek sorguda"""
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+    rows = (
+        db.query(Chunk, Document.filename)
+        .join(Document, Document.id == Chunk.document_id)
+        .filter(
+            tuple_(Chunk.document_id, Chunk.chunk_index).in_(keys),
+            # Silinmiş (GC bekleyen) dökümanların chunk'ları cevaplara girmez
+            Document.deleted_at.is_(None),
+            # Kalıcı olarak başarısız olanların yarım kalan chunk'ları da (GC temizler)
+            Document.status.is_distinct_from("failed")
+        )
+        .all()
+    )
+    return {(chunk.document_id, chunk.chunk_index): (chunk, filename) for chunk, filename in rows}
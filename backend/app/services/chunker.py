@@ -0,0 +1,203 @@
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+import re
+import tiktoken
+from app.config import settings
+from app.services.embedding_batcher import get_encoding
+
+# PDF çıkarımında sayfaların başına eklenen ayraç
+PAGE_MARKER = re.compile(r"\n--- Sayfa (\d+) ---\n")
+
+# Chunk sonunu tercihen bu ayraçlardan birinin arkasına denk getir (öncelik sırasıyla)
+BOUNDARY_SEPARATORS = [b"\n\n", b"\n", b". ", b"? ", b"! ", b" "]
+
+# Streaming modda buffer bu boyutu geçince işlenir
+STREAM_WINDOW_CHARS = 64 * 1024
+
+class ChunkSpan(NamedTuple):
+    start: int  # döküman text'i içinde karakter offset'i
+    end: int
+    page: Optional[int]
+    token_count: int
+    text: str
+
+# encoding adı -> token id başına byte uzunluğu
+_token_lengths: Dict[str, List[int]] = {}
+
+def token_byte_lengths(encoding: tiktoken.Encoding) -> List[int]:
+    """Her token'ın byte uzunluğu (encoding başına bir kez hesaplanır)"""
+    lengths = _token_lengths.get(encoding.name)
+    if lengths is None:
+        lengths = []
+        for token in range(encoding.n_vocab):
+            try:
+                lengths.append(len(encoding.decode_single_token_bytes(token)))
+            except KeyError:
+                lengths.append(0)
+        _token_lengths[encoding.name] = lengths
+    return lengths
+
+def _is_continuation(data: bytes, pos: int) -> bool:
+    return pos < len(data) and 0x80 <= data[pos] < 0xC0
+
+class _CharCursor:
+    """Artan byte offset'lerini karakter offset'ine çevirir (text'i baştan saymadan)"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.byte_pos = 0
+        self.char_pos = 0
+
+    def to_char(self, byte_pos: int) -> int:
+        if byte_pos < self.byte_pos:
+            self.byte_pos = self.char_pos = 0
+        self.char_pos += len(self.data[self.byte_pos:byte_pos].decode("utf-8"))
+        self.byte_pos = byte_pos
+        return self.char_pos
+
+class TokenChunker:
+    """
+    Token-budgeted chunker that returns character spans.
+
+    Each page segment is encoded once with tiktoken; chunk windows are cut
+    on token boundaries, preferring paragraph, line, sentence and word
+    breaks, and consecutive chunks overlap by about `overlap_tokens`.
+    Chunks never cross a PDF page marker, so every chunk has one page.
+    Offsets are tracked in UTF-8 bytes (token lengths come from a lookup
+    table) and converted to characters only at chunk edges.
+    """
+
+    def __init__(
+        self,
+        chunk_tokens: int = None,
+        overlap_tokens: int = None,
+        encoding: tiktoken.Encoding = None
+    ):
+        self.chunk_tokens = chunk_tokens or settings.CHUNK_SIZE_TOKENS
+        self.overlap_tokens = settings.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+        if self.overlap_tokens >= self.chunk_tokens:
+            raise ValueError("overlap_tokens chunk_tokens'tan küçük olmalı")
+        self._encoding = encoding
+
+    @property
+    def encoding(self) -> tiktoken.Encoding:
+        if self._encoding is None:
+            self._encoding = get_encoding(settings.OPENAI_EMBEDDING_MODEL)
+        return self._encoding
+
+    def _snap_end(self, data: bytes, offsets: List[int], start_tok: int, end_tok: int) -> int:
+        """Pencere sonunu pencerenin ikinci yarısındaki en iyi ayraca çek"""
+        lo = offsets[start_tok + self.chunk_tokens // 2]
+        hi = offsets[end_tok]
+
+        for separator in BOUNDARY_SEPARATORS:
+            pos = data.rfind(separator, lo, hi)
+            if pos != -1:
+                # tiktoken boşluğu sonraki token'a bağlar: ayracın sonunu içeren token'dan önce kes
+                boundary = bisect_right(offsets, pos + len(separator), start_tok + 1, end_tok + 1) - 1
+                if start_tok < boundary <= end_tok:
+                    return boundary
+        return end_tok
+
+    def _snap_start(self, data: bytes, offsets: List[int], start_tok: int, limit: int) -> int:
+        """Overlap başlangıcını bir kelime başına ilerlet"""
+        for i in range(start_tok, limit):
+            offset = offsets[i]
+            if offset == 0 or data[offset:offset + 1].isspace() or data[offset - 1:offset].isspace():
+                return i
+        return start_tok
+
+    def split(self, text: str, base_offset: int = 0, page: Optional[int] = None) -> List[ChunkSpan]:
+        """Tek bir text parçasını (sayfa) chunk span'lerine böl"""
+        tokens = self.encoding.encode_ordinary(text)
+        if not tokens:
+            return []
+
+        data = text.encode("utf-8")
+        lengths = token_byte_lengths(self.encoding)
+        # offsets[i] = i. token'ın byte başlangıcı, offsets[n] = len(data)
+        offsets = [0, *accumulate(map(lengths.__getitem__, tokens))]
+        ascii_only = len(data) == len(text)
+        starts = _CharCursor(data)
+        ends = _CharCursor(data)
+
+        n = len(tokens)
+        spans: List[ChunkSpan] = []
+        start_tok = 0
+
+        while start_tok < n:
+            end_tok = min(start_tok + self.chunk_tokens, n)
+            if end_tok < n:
+                end_tok = self._snap_end(data, offsets, start_tok, end_tok)
+
+            start_byte = offsets[start_tok]
+            end_byte = offsets[end_tok]
+            # Byte-fallback token'lar bir karakterin ortasında bitebilir: karakter başına çek
+            while _is_continuation(data, start_byte):
+                start_byte -= 1
+            while _is_continuation(data, end_byte):
+                end_byte -= 1
+
+            if ascii_only:
+                start_char, end_char = start_byte, end_byte
+            else:
+                start_char, end_char = starts.to_char(start_byte), ends.to_char(end_byte)
+
+            raw = text[start_char:end_char]
+            chunk = raw.strip()
+
+            if chunk:
+                start_char += len(raw) - len(raw.lstrip())
+                spans.append(ChunkSpan(
+                    start=base_offset + start_char,
+                    end=base_offset + start_char + len(chunk),
+                    page=page,
+                    token_count=end_tok - start_tok,
+                    text=chunk
+                ))
+
+            if end_tok >= n:
+                break
+
+            next_start = max(end_tok - self.overlap_tokens, start_tok + 1)
+            start_tok = self._snap_start(data, offsets, next_start, end_tok)
+
+        return spans
+
+    def iter_spans(self, pieces: Iterable[str]) -> Iterator[ChunkSpan]:
+        """
+        Text parçaları geldikçe chunk üret (streaming).
+        Offset'ler parçaların birleşiminden oluşan döküman text'ine göredir.
+        """
+        buffer = ""
+        buffer_start = 0
+        page: Optional[int] = None
+
+        for piece in pieces:
+            buffer += piece
+
+            # Tamamlanmış sayfaları işle
+            while match := PAGE_MARKER.search(buffer):
+                yield from self.split(buffer[:match.start()], buffer_start, page)
+                page = int(match.group(1))
+                buffer_start += match.end()
+                buffer = buffer[match.end():]
+
+            if len(buffer) < STREAM_WINDOW_CHARS:
+                continue
+
+            # Uzun sayfa/döküman: son chunk hariç hepsini ver, sonuncusu yeni text ile tekrar bölünür
+            spans = self.split(buffer, buffer_start, page)
+            if not spans:
+                # Sadece boşluk
+                buffer_start += len(buffer)
+                buffer = ""
+                continue
+
+            yield from spans[:-1]
+            keep_from = spans[-1].start - buffer_start
+            buffer_start += keep_from
+            buffer = buffer[keep_from:]
+
+        yield from self.split(buffer, buffer_start, page)
@@ -0,0 +1,147 @@
+from typing import Any, Dict, List, NamedTuple, Optional
+import tiktoken
+from app.config import settings
+from app.services.embedding_batcher import get_encoding
+
+# Prompt'ta bloklar arasına giren ayraç
+BLOCK_SEPARATOR = "\n\n---\n\n"
+
+# Offset'i olmayan chunk'larda bundan kısa ortak parça tesadüf sayılır
+_MIN_TEXT_OVERLAP = 20
+
+class ContextBlock(NamedTuple):
+    document_id: Optional[int]
+    filename: Optional[str]
+    page_number: Optional[int]
+    text: str
+    score: float  # bloktaki en yüksek chunk skoru
+    chunks: List[Dict[str, Any]]  # bloğa giren chunk'lar (döküman sırasıyla)
+
+    def render(self, text: str = None) -> str:
+        return (
+            f"Source File: {self.filename}"
+            + (f" (page {self.page_number})" if self.page_number else "")
+            + f"\nContent: {self.text if text is None else text}"
+        )
+
+def _text_overlap(left: str, right: str) -> int:
+    """left'in sonu ile right'ın başı arasındaki en uzun ortak parça (offset'siz eski chunk'lar için)"""
+    for size in range(min(len(left), len(right)), _MIN_TEXT_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+def _new_block(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    return {"text": chunk["text"], "score": chunk["score"], "chunks": [chunk], "end_offset": chunk.get("end_offset")}
+
+def _append(block: Dict[str, Any], chunk: Dict[str, Any]) -> None:
+    """chunk'ı bloğun sonuna, örtüşen kısmı bir kez olacak şekilde ekle"""
+    end = block["end_offset"]
+    if end is not None and chunk.get("start_offset") is not None:
+        # Bloğun içinde kalan chunk metin eklemez, bloğun sonunu da geri çekmez
+        if chunk["end_offset"] > end:
+            if chunk["start_offset"] <= end:
+                block["text"] += chunk["text"][end - chunk["start_offset"]:]
+            else:
+                # Arada sadece chunk'lardan kırpılan boşluk var
+                block["text"] += " " + chunk["text"]
+            block["end_offset"] = chunk["end_offset"]
+    else:
+        overlap = _text_overlap(block["text"], chunk["text"])
+        block["text"] += chunk["text"][overlap:] if overlap else " " + chunk["text"]
+        block["end_offset"] = chunk.get("end_offset")
+    block["chunks"].append(chunk)
+    block["score"] = max(block["score"], chunk["score"])
+
+def _adjacent(block: Dict[str, Any], chunk: Dict[str, Any]) -> bool:
+    last = block["chunks"][-1]
+    if last.get("page_number") != chunk.get("page_number"):
+        return False
+    if block["end_offset"] is not None and chunk.get("start_offset") is not None:
+        if chunk["start_offset"] <= block["end_offset"]:
+            return True
+    return (
+        last.get("chunk_index") is not None
+        and chunk.get("chunk_index") == last["chunk_index"] + 1
+    )
+
+def merge_chunks(chunks: List[Dict[str, Any]]) -> List[ContextBlock]:
+    """Aynı dökümanın bitişik / örtüşen chunk'larını tek bloğa birleştir (skor sırasıyla döner)"""
+    by_document: Dict[Any, List[Dict[str, Any]]] = {}
+    for chunk in chunks:
+        by_document.setdefault(chunk.get("document_id"), []).append(chunk)
+
+    blocks = []
+    for document_id, document_chunks in by_document.items():
+        if document_id is None:
+            # Dökümanı bilinmeyen chunk'lar birleştirilmez
+            blocks.extend(_new_block(chunk) for chunk in document_chunks)
+            continue
+        document_chunks.sort(key=lambda c: (
+            c.get("start_offset") if c.get("start_offset") is not None else -1,
+            c.get("chunk_index") if c.get("chunk_index") is not None else -1
+        ))
+        current = None
+        for chunk in document_chunks:
+            if current is not None and _adjacent(current, chunk):
+                _append(current, chunk)
+                continue
+            current = _new_block(chunk)
+            blocks.append(current)
+
+    blocks.sort(key=lambda block: block["score"], reverse=True)
+    return [
+        ContextBlock(
+            document_id=block["chunks"][0].get("document_id"),
+            filename=block["chunks"][0].get("filename"),
+            page_number=block["chunks"][0].get("page_number"),
+            text=block["text"],
+            score=block["score"],
+            chunks=block["chunks"]
+        )
+        for block in blocks
+    ]
+
+class PackedContext(NamedTuple):
+    text: str
+    tokens: int
+    chunks: List[Dict[str, Any]]  # prompt'a giren chunk'lar (skor sırasıyla)
+
+def pack_context(
+    chunks: List[Dict[str, Any]],
+    max_tokens: int = None,
+    encoding: tiktoken.Encoding = None
+) -> PackedContext:
+    """
+    Chunk'ları bloklara birleştir ve skor sırasıyla max_tokens bütçesine
+    sığdır. Sığmayan blok atlanır (daha küçük bir sonraki sığabilir); hiç
+    blok sığmıyorsa en iyi blok bütçeye kırpılır. max_tokens <= 0 sınırsız.
+    """
+    max_tokens = settings.CHAT_CONTEXT_MAX_TOKENS if max_tokens is None else max_tokens
+    encoding = encoding or get_encoding(settings.OPENAI_MODEL)
+    separator_tokens = len(encoding.encode_ordinary(BLOCK_SEPARATOR))
+
+    parts: List[str] = []
+    used: List[Dict[str, Any]] = []
+    total = 0
+    for block in merge_chunks(chunks):
+        rendered = block.render()
+        tokens = len(encoding.encode_ordinary(rendered)) + (separator_tokens if parts else 0)
+        if max_tokens <= 0 or total + tokens <= max_tokens:
+            parts.append(rendered)
+            used.extend(sorted(block.chunks, key=lambda c: c["score"], reverse=True))
+            total += tokens
+        elif not parts:
+            # Tek başına bile sığmıyor: bloğun başı bütçe kadar alınır
+            header_tokens = len(encoding.encode_ordinary(block.render("")))
+            text_tokens = encoding.encode_ordinary(block.text)[:max(max_tokens - header_tokens, 0)]
+            if not text_tokens:
+                continue
+            rendered = block.render(encoding.decode(text_tokens))
+            parts.append(rendered)
+            used.extend(sorted(block.chunks, key=lambda c: c["score"], reverse=True))
+            total += len(encoding.encode_ordinary(rendered))
+
+    # Parçalar ayrı sayıldı; raporlanan değer birleşik metnin kendisi
+    text = BLOCK_SEPARATOR.join(parts)
+    return PackedContext(text=text, tokens=len(encoding.encode_ordinary(text)), chunks=used)
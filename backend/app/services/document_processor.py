@@ -1,165 +1,637 @@
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable, Deque, Tuple
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from xml.etree import ElementTree
+import codecs
+import mmap
+import multiprocessing
+import os
+import queue
+import threading
+import zipfile
+import numpy as np
 import PyPDF2
-from docx import Document as DocxDocument
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from openai import OpenAI
-from pinecone import Pinecone
 from app.config import settings
+from app.services.embedding_batcher import EmbeddingBatcher, resolve_embedding
+from app.services.chunker import ChunkSpan, TokenChunker
+from app.services.embedding_cache import embedding_cache, space_key, text_hash
+from app.services.job_queue import PermanentJobError
+from app.services.vector_store import VectorStore, vector_id, vector_store
+from app.services import text_sidecar
 import logging
 
 logger = logging.getLogger(__name__)
 
+TXT_BLOCK_SIZE = 64 * 1024
+
+# Pipeline aşamaları arasında taşınan "bitti" işareti
+_PIPELINE_DONE = object()
+
+# Bundan az text'i olan döküman indexlenmez
+MIN_CONTENT_CHARACTERS = 50
+
+class InsufficientTextError(PermanentJobError):
+    """Raised when a document has too little text to index (retrying cannot help)"""
+
+    def __init__(self, content_length: int):
+        super().__init__(
+            f"Yetersiz text. Dosyada {content_length} karakter var, "
+            f"minimum {MIN_CONTENT_CHARACTERS} karakter gerekli."
+        )
+        self.content_length = content_length
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_BODY = f"{_W_NS}body"
+_W_P = f"{_W_NS}p"
+_W_R = f"{_W_NS}r"
+_W_T = f"{_W_NS}t"
+_W_TAB = f"{_W_NS}tab"
+_W_BR = f"{_W_NS}br"
+_W_CR = f"{_W_NS}cr"
+
+def _put(target: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Kuyruğa koy; pipeline durdurulduysa vazgeç"""
+    while not stop.is_set():
+        try:
+            target.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(source: queue.Queue, stop: threading.Event) -> Any:
+    """Kuyruktan al; pipeline durdurulduysa _PIPELINE_DONE döner"""
+    while not stop.is_set():
+        try:
+            return source.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _PIPELINE_DONE
+
+def extract_pdf_page_range(file_path: str, start: int, end: int) -> List[str]:
+    """Sayfa aralığının text'ini çıkar (process pool içinde çalışır)"""
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [pdf_reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+def format_pdf_pages(pages: List[str]) -> str:
+    """Sayfa text'lerini sayfa ayraçlarıyla birleştir"""
+    return "".join(
+        f"\n--- Sayfa {page_num + 1} ---\n{page_text}"
+        for page_num, page_text in enumerate(pages)
+        if page_text
+    )
+
 class DocumentProcessor:
     """Dökümanları işleyen servis"""
     
     def __init__(self):
         self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        self.pinecone_client = Pinecone(api_key=settings.PINECONE_API_KEY)
+        self.embedding_batcher = EmbeddingBatcher(self.openai_client)
+        # Varsayılandan farklı model/boyut kullanan odalar (bkz. app.migrate_embeddings)
+        self._batchers: Dict[Tuple[str, int], EmbeddingBatcher] = {}
+        self._batchers_lock = threading.Lock()
         
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
+        self.chunker = TokenChunker()
+        
+        self._pdf_pool: Optional[ProcessPoolExecutor] = None
+    
+    @property
+    def pdf_workers(self) -> int:
+        return settings.PDF_EXTRACT_WORKERS or os.cpu_count() or 1
     
-    def extract_text_from_pdf(self, file_path: str) -> str:
+    def _get_pdf_pool(self) -> ProcessPoolExecutor:
+        # Pool ilk büyük PDF'te oluşturulur ve sonraki dökümanlar için tekrar kullanılır.
+        # spawn: çok thread'li process'in (pipeline, GC, DB pool) kilitleri fork ile kopyalanmaz
+        if self._pdf_pool is None:
+            self._pdf_pool = ProcessPoolExecutor(
+                max_workers=self.pdf_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pdf_pool
+    
+    def shutdown(self) -> None:
+        """PDF process pool'unu kapat (worker/uygulama çıkışında)"""
+        if self._pdf_pool is not None:
+            self._pdf_pool.shutdown(wait=True, cancel_futures=True)
+            self._pdf_pool = None
+    
+    def iter_pdf_pages(self, file_path: str, parallel: Optional[bool] = None) -> Iterator[str]:
+        """
+        PDF sayfalarının text'ini sırayla üret.
+        Seri yolda her sayfa çıkarılır çıkarılmaz, büyük PDF'lerde ise her
+        sayfa aralığı (process pool) bittikçe submit sırasıyla üretilir;
+        böylece ilk sayfalar chunk'lanıp embed edilirken kalanlar okunur.
+        """
+        with open(file_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            page_count = len(pdf_reader.pages)
+            
+            if parallel is None:
+                parallel = page_count >= settings.PDF_PARALLEL_MIN_PAGES and self.pdf_workers > 1
+            
+            if not parallel:
+                for page in pdf_reader.pages:
+                    yield page.extract_text() or ""
+                return
+        
+        step = max(1, settings.PDF_PAGES_PER_TASK)
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        
+        pool = self._get_pdf_pool()
+        futures = [
+            pool.submit(extract_pdf_page_range, file_path, start, end)
+            for start, end in ranges
+        ]
+        
         try:
-            text = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page_num, page in enumerate(pdf_reader.pages):
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += f"\n--- Sayfa {page_num + 1} ---\n{page_text}"
-            return text
+            # Future'lar submit sırasıyla beklenir, sayfa sırası korunur
+            for future in futures:
+                yield from future.result()
+        finally:
+            # Tüketici erken bıraktıysa (pipeline hatası) kalan aralıklar okunmaz
+            for future in futures:
+                future.cancel()
+        
+        logger.info(f"PDF {page_count} sayfa, {len(ranges)} parça halinde {self.pdf_workers} process ile okundu")
+    
+    def extract_pdf_pages(self, file_path: str, parallel: Optional[bool] = None) -> List[str]:
+        """PDF sayfalarının text'ini sırayla döndür (bkz. iter_pdf_pages)"""
+        return list(self.iter_pdf_pages(file_path, parallel=parallel))
+    
+    def extract_text_from_pdf(self, file_path: str, parallel: Optional[bool] = None) -> str:
+        try:
+            return format_pdf_pages(self.extract_pdf_pages(file_path, parallel=parallel))
         except Exception as e:
             logger.error(f"PDF okuma hatası: {e}")
             raise
     
-    def extract_text_from_docx(self, file_path: str) -> str:
+    def iter_text_from_docx(self, file_path: str) -> Iterator[str]:
+        """
+        DOCX paragraflarını tek tek üret.
+        word/document.xml iterparse ile okunur, tüm DOM belleğe alınmaz.
+        """
         try:
-            doc = DocxDocument(file_path)
-            text = "\n".join([p.text for p in doc.paragraphs])
-            return text
+            with zipfile.ZipFile(file_path) as archive:
+                with archive.open("word/document.xml") as xml_file:
+                    stack: List[str] = []
+                    parts: List[str] = []
+                    open_paragraphs = 0
+                    collecting = False
+                    first = True
+                    
+                    for event, elem in ElementTree.iterparse(xml_file, events=("start", "end")):
+                        tag = elem.tag
+                        
+                        if event == "start":
+                            if tag == _W_P:
+                                open_paragraphs += 1
+                                # Sadece body seviyesindeki paragraflar (python-docx doc.paragraphs ile aynı)
+                                if stack and stack[-1] == _W_BODY:
+                                    collecting = True
+                            stack.append(tag)
+                            continue
+                        
+                        stack.pop()
+                        in_paragraph = collecting and open_paragraphs == 1
+                        
+                        if tag == _W_T and in_paragraph:
+                            parts.append(elem.text or "")
+                        elif tag == _W_TAB and in_paragraph and stack[-1] == _W_R:
+                            parts.append("\t")
+                        elif tag in (_W_BR, _W_CR) and in_paragraph and stack[-1] == _W_R:
+                            parts.append("\n")
+                        elif tag == _W_P:
+                            open_paragraphs -= 1
+                            if collecting and open_paragraphs == 0:
+                                yield ("" if first else "\n") + "".join(parts)
+                                first = False
+                                parts = []
+                                collecting = False
+                        
+                        # Body'nin doğrudan çocukları bitince belleği serbest bırak
+                        if stack and stack[-1] == _W_BODY:
+                            elem.clear()
         except Exception as e:
             logger.error(f"DOCX okuma hatası: {e}")
             raise
     
-    def extract_text_from_txt(self, file_path: str) -> str:
+    def extract_text_from_docx(self, file_path: str) -> str:
+        return "".join(self.iter_text_from_docx(file_path))
+    
+    def iter_text_from_txt(self, file_path: str, block_size: int = TXT_BLOCK_SIZE) -> Iterator[str]:
+        """
+        TXT dosyasını mmap üzerinden blok blok decode ederek üret.
+        Çok byte'lı UTF-8 karakterleri blok sınırında bölünmez (incremental decoder).
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
+            with open(file_path, 'rb') as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return
+                
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    decoder = codecs.getincrementaldecoder('utf-8')()
+                    for offset in range(0, len(mapped), block_size):
+                        text = decoder.decode(mapped[offset:offset + block_size])
+                        if text:
+                            yield text
+                    tail = decoder.decode(b"", final=True)
+                    if tail:
+                        yield tail
         except Exception as e:
             logger.error(f"TXT okuma hatası: {e}")
             raise
     
-    def extract_text(self, file_path: str) -> str:
-        file_path_obj = Path(file_path)
-        extension = file_path_obj.suffix.lower()
+    def extract_text_from_txt(self, file_path: str) -> str:
+        return "".join(self.iter_text_from_txt(file_path))
+    
+    def iter_source_text(self, file_path: str) -> Iterator[str]:
+        """Dosya text'ini kaynaktan parça parça üret (TXT/DOCX streaming, PDF sayfa sayfa)"""
+        extension = Path(file_path).suffix.lower()
         
         if extension == '.pdf':
-            return self.extract_text_from_pdf(file_path)
+            for page_num, page_text in enumerate(self.iter_pdf_pages(file_path)):
+                if page_text:
+                    yield f"\n--- Sayfa {page_num + 1} ---\n{page_text}"
         elif extension in ['.docx', '.doc']:
-            return self.extract_text_from_docx(file_path)
+            yield from self.iter_text_from_docx(file_path)
         elif extension == '.txt':
-            return self.extract_text_from_txt(file_path)
+            yield from self.iter_text_from_txt(file_path)
         else:
             raise ValueError(f"Desteklenmeyen dosya tipi: {extension}")
     
+    def iter_text(self, file_path: str) -> Iterator[str]:
+        """
+        Dosya text'ini parça parça üret.
+        PDF/DOCX için ilk çıkarma sıkıştırılmış sidecar'a yazılır, sonraki
+        okumalar (worker, re-index) dosyayı tekrar parse etmez. Kaynak dosya
+        değişirse sidecar geçersiz sayılır.
+        """
+        if Path(file_path).suffix.lower() == '.txt':
+            yield from self.iter_source_text(file_path)
+        elif text_sidecar.is_fresh(file_path):
+            yield from text_sidecar.read_sidecar(file_path)
+        else:
+            yield from text_sidecar.write_through(file_path, self.iter_source_text(file_path))
+    
+    def extract_text(self, file_path: str) -> str:
+        return "".join(self.iter_text(file_path))
+    
+    def content_length(self, file_path: str) -> int:
+        """len(text.strip()) ile aynı sonuç, text'i belleğe almadan"""
+        total = 0
+        leading = None
+        trailing = 0
+        
+        for piece in self.iter_text(file_path):
+            stripped = piece.rstrip()
+            if leading is None:
+                content = piece.lstrip()
+                if content:
+                    leading = total + len(piece) - len(content)
+            if stripped:
+                trailing = len(piece) - len(stripped)
+            else:
+                trailing += len(piece)
+            total += len(piece)
+        
+        if leading is None:
+            return 0
+        return total - leading - trailing
+    
     def chunk_text(self, text: str) -> List[str]:
-        chunks = self.text_splitter.split_text(text)
+        chunks = [span.text for span in self.chunker.iter_spans([text])]
         logger.info(f"Text {len(chunks)} chunk'a bölündü")
         return chunks
     
-    def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def iter_chunks(self, pieces: Iterable[str]) -> Iterator[ChunkSpan]:
+        """
+        Artımlı chunker: text parçaları geldikçe offset ve sayfa bilgili
+        chunk span'leri üretir.
+        """
+        return self.chunker.iter_spans(pieces)
+    
+    def batcher_for(self, model: Optional[str] = None, dimensions: Optional[int] = None) -> EmbeddingBatcher:
+        space = resolve_embedding(model, dimensions)
+        if space == (self.embedding_batcher.model, self.embedding_batcher.dimensions):
+            return self.embedding_batcher
+        with self._batchers_lock:
+            if space not in self._batchers:
+                self._batchers[space] = EmbeddingBatcher(self.openai_client, model=space[0], dimensions=space[1])
+            return self._batchers[space]
+    
+    def create_embeddings(
+        self,
+        texts: List[str],
+        token_counts: Optional[List[int]] = None,
+        model: Optional[str] = None,
+        dimensions: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Önce embedding cache'e bakılır, sadece bulunamayan (ve tekrarsız)
+        text'ler API'ye gönderilir. Sonuç (len(texts), dims) float32 matris.
+        model/dimensions verilmezse OPENAI_EMBEDDING_* ayarları kullanılır.
+        """
+        batcher = self.batcher_for(model, dimensions)
+        model = space_key(batcher.model, batcher.dimensions)
+        
+        cached: List[Optional[np.ndarray]] = [None] * len(texts)
+        if settings.EMBEDDING_CACHE_ENABLED:
+            try:
+                cached = embedding_cache.get_many(model, texts)
+            except Exception as e:
+                logger.warning(f"Embedding cache okunamadı: {e}")
+        
+        # Aynı text birden fazla kez geçiyorsa (boilerplate sayfalar) tek kez embed et
+        missing: Dict[bytes, str] = {}
+        missing_tokens: Dict[bytes, int] = {}
+        for i, (text, embedding) in enumerate(zip(texts, cached)):
+            if embedding is None:
+                key = text_hash(text)
+                missing.setdefault(key, text)
+                if token_counts is not None:
+                    missing_tokens.setdefault(key, token_counts[i])
+        
         try:
-            response = self.openai_client.embeddings.create(
-                input=texts,
-                model=settings.OPENAI_EMBEDDING_MODEL
+            missing_texts = list(missing.values())
+            new_embeddings = batcher.embed(
+                missing_texts,
+                token_counts=list(missing_tokens.values()) if token_counts is not None else None
             )
-            embeddings = [item.embedding for item in response.data]
-            logger.info(f"{len(embeddings)} embedding oluşturuldu")
-            return embeddings
         except Exception as e:
             logger.error(f"Embedding hatası: {e}")
             raise
+        
+        if settings.EMBEDDING_CACHE_ENABLED and missing_texts:
+            try:
+                embedding_cache.put_many(model, missing_texts, new_embeddings)
+            except Exception as e:
+                logger.warning(f"Embedding cache yazılamadı: {e}")
+        
+        by_hash = dict(zip(missing.keys(), new_embeddings))
+        if not missing_texts:
+            embeddings = np.stack(cached) if texts else np.empty((0, 0), dtype=np.float32)
+        elif len(missing_texts) == len(texts):
+            # Cache'te hiç yok, tekrar da yok: batcher'ın matrisi olduğu gibi kullanılır
+            embeddings = np.asarray(new_embeddings, dtype=np.float32)
+        else:
+            embeddings = np.stack([
+                embedding if embedding is not None else by_hash[text_hash(text)]
+                for text, embedding in zip(texts, cached)
+            ])
+        
+        logger.info(f"{len(embeddings)} embedding oluşturuldu ({len(texts) - len(missing_texts)} cache/tekrar, {len(missing_texts)} API)")
+        return embeddings
     
-    def upsert_to_pinecone(
+    def upsert_vectors(
         self, 
         namespace: str, 
-        chunks: List[str], 
-        embeddings: List[List[float]],
+        chunks: List[ChunkSpan], 
+        embeddings: np.ndarray,
         document_id: int,
-        filename: str
+        start_index: int = 0,
+        store: Optional[VectorStore] = None
     ) -> List[str]:
         try:
-            index = self.pinecone_client.Index(settings.PINECONE_INDEX_NAME)
-            
-            vectors = []
             vector_ids = []
+            metadata = []
             
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                vector_id = f"doc_{document_id}_chunk_{i}"
-                vector_ids.append(vector_id)
-                
-                vectors.append({
-                    "id": vector_id,
-                    "values": embedding,
-                    "metadata": {
-                        "document_id": document_id,
-                        "filename": filename,
-                        "chunk_index": i,
-                        "text": chunk[:1000]
-                    }
-                })
+            # Text, sayfa ve dosya adı chunks tablosunda; vektörde sadece eşleme/filtre alanları
+            for i, chunk in enumerate(chunks, start=start_index):
+                vector_ids.append(vector_id(document_id, i))
+                metadata.append({"document_id": document_id, "chunk_index": i})
             
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                index.upsert(vectors=batch, namespace=namespace)
+            (store or vector_store).upsert(namespace, vector_ids, embeddings, metadata)
             
-            logger.info(f"{len(vectors)} vektör Pinecone'a yüklendi")
+            logger.info(f"{len(vector_ids)} vektör yüklendi")
             return vector_ids
             
         except Exception as e:
-            logger.error(f"Pinecone upsert hatası: {e}")
+            logger.error(f"Vektör upsert hatası: {e}")
             raise
     
+    def copy_document_vectors(
+        self,
+        source_namespace: str,
+        source_document_id: int,
+        chunk_count: int,
+        namespace: str,
+        document_id: int,
+        filename: str,
+        source_store: Optional[VectorStore] = None,
+        store: Optional[VectorStore] = None
+    ) -> Dict[str, Any]:
+        """
+        Aynı içerikli, daha önce işlenmiş dökümanın vektörlerini yeni
+        döküman ID'si ile hedef namespace'e kopyala (embedding API çağrılmaz).
+        Kaynak ve hedef farklı shard'larda olabilir.
+        """
+        source_store = source_store or vector_store
+        store = store or vector_store
+        vector_ids: List[str] = []
+        batch_size = 100
+        
+        for start in range(0, chunk_count, batch_size):
+            indices = range(start, min(start + batch_size, chunk_count))
+            source_ids = [vector_id(source_document_id, i) for i in indices]
+            fetched = source_store.fetch(source_namespace, source_ids)
+            
+            ids = []
+            metadata = []
+            for i, source_id in zip(indices, source_ids):
+                if source_id not in fetched:
+                    raise Exception(f"Kaynak vektör bulunamadı: {source_id}")
+                
+                ids.append(vector_id(document_id, i))
+                meta = {**fetched[source_id].metadata, "document_id": document_id}
+                if "filename" in meta:
+                    # Eski (text'i metadata'da taşıyan) vektörler
+                    meta["filename"] = filename
+                metadata.append(meta)
+            
+            values = np.stack([fetched[source_id].values for source_id in source_ids])
+            store.upsert(namespace, ids, values, metadata)
+            vector_ids.extend(ids)
+        
+        logger.info(f"Döküman {source_document_id} vektörleri {document_id} için kopyalandı ({chunk_count} chunk)")
+        
+        return {
+            "chunk_count": chunk_count,
+            "vector_ids": vector_ids,
+            "reused_from": source_document_id
+        }
+    
     def process_document(
         self, 
         file_path: str, 
         document_id: int,
         filename: str,
-        namespace: str
+        namespace: str,
+        on_progress: Optional[Callable[[int, Optional[int]], None]] = None,
+        on_chunks: Optional[Callable[[int, List[ChunkSpan]], None]] = None,
+        embedding_model: Optional[str] = None,
+        embedding_dimensions: Optional[int] = None,
+        store: Optional[VectorStore] = None
     ) -> Dict[str, Any]:
+        """
+        Text çıkar -> chunk'la -> embedding -> vector store, üç aşamalı pipeline.
+        
+        Aşamalar sınırlı kuyruklarla bağlanır: ilk batch'ler embed edilip
+        yüklenirken sonraki sayfalar hâlâ okunur. Her batch yüklendiğinde o
+        chunk'lar aranabilir olur ve on_progress(chunks_done, chunks_total)
+        çağrılır (chunks_total, chunk'lama bitene kadar None). Batch'in
+        vektörleri gönderilmeden önce on_chunks(start_index, chunks) ile
+        chunk'lar kaydedilir (arama sonucu her zaman text'ine ulaşabilsin).
+        Callback'ler çağıran thread'de çalışır. Embedding'ler odanın
+        modeli/boyutuyla (embedding_model/embedding_dimensions) oluşturulur,
+        vektörler odanın shard'ına (store) yazılır.
+        """
         logger.info(f"Döküman işleniyor: {filename}")
         
-        # 1. Text çıkar
-        text = self.extract_text(file_path)
-        if not text or len(text.strip()) < 50:
-            raise Exception(f"Yetersiz text. Dosyada {len(text.strip()) if text else 0} karakter var, minimum 50 karakter gerekli.")            
+        batch_size = max(1, settings.INGEST_BATCH_CHUNKS)
+        chunk_queue: queue.Queue = queue.Queue(maxsize=settings.INGEST_QUEUE_DEPTH)
+        embedded_queue: queue.Queue = queue.Queue(maxsize=settings.INGEST_QUEUE_DEPTH)
+        stop = threading.Event()
+        errors: List[BaseException] = []
+        stats: Dict[str, Any] = {"characters": 0, "chunks": None}
         
-        # 2. Chunk'lara böl
-        chunks = self.chunk_text(text)
+        def counted(pieces: Iterable[str]) -> Iterator[str]:
+            for piece in pieces:
+                stats["characters"] += len(piece)
+                yield piece
         
-        # 3. Embedding oluştur
-        embeddings = self.create_embeddings(chunks)
+        def produce() -> None:
+            # 1-2. Text çıkar ve chunk'lara böl (streaming)
+            try:
+                batch: List[ChunkSpan] = []
+                total = 0
+                content_length = 0
+                
+                for chunk in self.iter_chunks(counted(self.iter_text(file_path))):
+                    batch.append(chunk)
+                    total += 1
+                    content_length += len(chunk.text)
+                    if len(batch) >= batch_size:
+                        if not _put(chunk_queue, batch, stop):
+                            return
+                        batch = []
+                
+                # Çıkarma bittikten sonra, batch boyutundan bağımsız; chunk text'leri
+                # sayılır (sayfa ayraçları ve boşluklar değil)
+                if content_length < MIN_CONTENT_CHARACTERS:
+                    raise InsufficientTextError(content_length)
+                
+                stats["chunks"] = total
+                if batch:
+                    _put(chunk_queue, batch, stop)
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                _put(chunk_queue, _PIPELINE_DONE, stop)
         
-        # 4. Pinecone'a kaydet
-        vector_ids = self.upsert_to_pinecone(
-            namespace=namespace,
-            chunks=chunks,
-            embeddings=embeddings,
-            document_id=document_id,
-            filename=filename
+        # Bir pipeline batch'i genelde tek embedding isteğine sığar; paralellik için
+        # batcher'ın eşzamanlılığı kadar batch aynı anda uçuşta tutulur
+        max_embedding = max(1, self.batcher_for(embedding_model, embedding_dimensions).max_concurrency)
+        embed_pool = ThreadPoolExecutor(
+            max_workers=max_embedding,
+            thread_name_prefix=f"ingest-embed-{document_id}"
         )
         
+        def embed() -> None:
+            # 3. Embedding oluştur, sonuçları batch sırasıyla upsert aşamasına aktar
+            pending: Deque[Tuple[List[ChunkSpan], Future]] = deque()
+            
+            def forward_oldest() -> bool:
+                batch, future = pending.popleft()
+                return _put(embedded_queue, (batch, future.result()), stop)
+            
+            try:
+                while (batch := _get(chunk_queue, stop)) is not _PIPELINE_DONE:
+                    pending.append((batch, embed_pool.submit(
+                        self.create_embeddings,
+                        [chunk.text for chunk in batch],
+                        token_counts=[chunk.token_count for chunk in batch],
+                        model=embedding_model,
+                        dimensions=embedding_dimensions
+                    )))
+                    while len(pending) >= max_embedding:
+                        if not forward_oldest():
+                            return
+                
+                while pending:
+                    if not forward_oldest():
+                        return
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                _put(embedded_queue, _PIPELINE_DONE, stop)
+        
+        stages = [
+            threading.Thread(target=produce, name=f"ingest-extract-{document_id}", daemon=True),
+            threading.Thread(target=embed, name=f"ingest-embed-{document_id}", daemon=True)
+        ]
+        for stage in stages:
+            stage.start()
+        
+        # 4. Vector store'a kaydet: en fazla PINECONE_MAX_CONCURRENCY batch aynı anda uçuşta,
+        # ilerleme sırayla (tamamlanan ön ek) çağıran thread'de raporlanır
+        vector_ids: List[str] = []
+        submitted = 0
+        in_flight: Deque[Future] = deque()
+        max_in_flight = max(1, settings.PINECONE_MAX_CONCURRENCY)
+        upsert_pool = ThreadPoolExecutor(
+            max_workers=max_in_flight,
+            thread_name_prefix=f"ingest-upsert-{document_id}"
+        )
+        
+        def complete_oldest() -> None:
+            vector_ids.extend(in_flight.popleft().result())
+            if on_progress:
+                on_progress(len(vector_ids), stats["chunks"])
+        
+        try:
+            while (item := _get(embedded_queue, stop)) is not _PIPELINE_DONE:
+                batch, embeddings = item
+                if on_chunks:
+                    on_chunks(submitted, batch)
+                in_flight.append(upsert_pool.submit(
+                    self.upsert_vectors,
+                    namespace=namespace,
+                    chunks=batch,
+                    embeddings=embeddings,
+                    document_id=document_id,
+                    start_index=submitted,
+                    store=store
+                ))
+                submitted += len(batch)
+                while len(in_flight) >= max_in_flight:
+                    complete_oldest()
+            
+            if not errors:
+                while in_flight:
+                    complete_oldest()
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            stop.set()
+            for stage in stages:
+                stage.join()
+            embed_pool.shutdown(wait=True, cancel_futures=True)
+            upsert_pool.shutdown(wait=True, cancel_futures=True)
+        
+        if errors:
+            raise errors[0]
+        
+        logger.info(f"Döküman işlendi: {filename}, {len(vector_ids)} chunk")
+        
         return {
-            "chunk_count": len(chunks),
+            "chunk_count": len(vector_ids),
             "vector_ids": vector_ids,
-            "total_characters": len(text)
+            "total_characters": stats["characters"]
         }
 
 document_processor = DocumentProcessor()
@@ -0,0 +1,187 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import random
+import threading
+import time
+import numpy as np
+import openai
+import tiktoken
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# text-embedding-3-* tek input limiti
+MAX_INPUT_TOKENS = 8191
+
+def get_encoding(model: str) -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+def resolve_embedding(model: Optional[str] = None, dimensions: Optional[int] = None) -> Tuple[str, int]:
+    """Odanın (NULL olabilen) embedding ayarı -> (model, boyut); boyut 0 = modelin kendi boyutu"""
+    return (
+        model or settings.OPENAI_EMBEDDING_MODEL,
+        settings.OPENAI_EMBEDDING_DIMENSIONS if dimensions is None else dimensions
+    )
+
+def embedding_request(model: str, dimensions: int) -> Dict[str, Any]:
+    """embeddings.create parametreleri ('dimensions' sadece verilirse gönderilir)"""
+    request: Dict[str, Any] = {"model": model, "encoding_format": "base64"}
+    if dimensions:
+        request["dimensions"] = dimensions
+    return request
+
+def decode_embedding(data: Any) -> np.ndarray:
+    """API'den gelen embedding'i float32 array'e çevir (base64 ya da float listesi)"""
+    if isinstance(data, str):
+        return np.frombuffer(base64.b64decode(data), dtype=np.float32)
+    return np.asarray(data, dtype=np.float32)
+
+def is_retryable(error: Exception) -> bool:
+    """429, 5xx ve bağlantı hataları tekrar denenir"""
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class EmbeddingBatcher:
+    """
+    Splits embedding inputs into token-bounded batches, sends them
+    concurrently and retries transient failures with jittered backoff.
+    Embeddings are requested base64-encoded and returned as one float32
+    matrix, one row per input in input order.
+    """
+
+    def __init__(
+        self,
+        client: openai.OpenAI,
+        model: str = None,
+        dimensions: int = None,
+        max_batch_tokens: int = None,
+        max_batch_inputs: int = None,
+        max_concurrency: int = None,
+        max_retries: int = None,
+        encoding: tiktoken.Encoding = None
+    ):
+        # Retry'ı burada yönetiyoruz, SDK'nın kendi retry'ı kapalı
+        self.client = client.with_options(max_retries=0)
+        self.model, self.dimensions = resolve_embedding(model, dimensions)
+        self.max_batch_tokens = max_batch_tokens or settings.EMBEDDING_BATCH_MAX_TOKENS
+        self.max_batch_inputs = max_batch_inputs or settings.EMBEDDING_BATCH_MAX_INPUTS
+        self.max_concurrency = max_concurrency or settings.EMBEDDING_MAX_CONCURRENCY
+        self.max_retries = settings.EMBEDDING_MAX_RETRIES if max_retries is None else max_retries
+        self._encoding = encoding
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def encoding(self) -> tiktoken.Encoding:
+        if self._encoding is None:
+            self._encoding = get_encoding(self.model)
+        return self._encoding
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency,
+                    thread_name_prefix="embedding"
+                )
+            return self._executor
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        return [len(tokens) for tokens in self.encoding.encode_ordinary_batch(texts)]
+
+    def truncate(self, text: str, token_count: int) -> str:
+        if token_count <= MAX_INPUT_TOKENS:
+            return text
+        logger.warning(f"Embedding input {token_count} token, {MAX_INPUT_TOKENS} tokene kısaltıldı")
+        return self.encoding.decode(self.encoding.encode_ordinary(text)[:MAX_INPUT_TOKENS])
+
+    def plan_batches(self, token_counts: List[int]) -> List[List[int]]:
+        """Input index'lerini token ve adet limitine göre batch'lere ayır"""
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+
+        for i, tokens in enumerate(token_counts):
+            tokens = min(tokens, MAX_INPUT_TOKENS)
+            if current and (
+                current_tokens + tokens > self.max_batch_tokens
+                or len(current) >= self.max_batch_inputs
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+        return batches
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        ceiling = min(
+            settings.EMBEDDING_RETRY_MAX_SECONDS,
+            settings.EMBEDDING_RETRY_BASE_SECONDS * (2 ** attempt)
+        )
+        delay = random.uniform(0, ceiling)
+        hinted = retry_after_seconds(error)
+        return max(delay, hinted) if hinted else delay
+
+    def _embed_batch(self, inputs: List[str]) -> np.ndarray:
+        attempt = 0
+        while True:
+            try:
+                # base64: float listesi JSON'u parse edilmez, doğrudan float32 buffer
+                response = self.client.embeddings.create(input=inputs, **embedding_request(self.model, self.dimensions))
+                return np.stack([
+                    decode_embedding(item.embedding)
+                    for item in sorted(response.data, key=lambda item: item.index)
+                ])
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self._backoff(attempt, e)
+                attempt += 1
+                logger.warning(f"Embedding batch hatası ({e.__class__.__name__}), {attempt}. deneme {delay:.1f}s sonra")
+                time.sleep(delay)
+
+    def embed(self, texts: List[str], token_counts: Optional[List[int]] = None) -> np.ndarray:
+        """token_counts verilirse (chunker zaten saydıysa) text'ler tekrar encode edilmez"""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        if token_counts is None:
+            token_counts = self.count_tokens(texts)
+        inputs = [self.truncate(text, tokens) for text, tokens in zip(texts, token_counts)]
+        batches = self.plan_batches(token_counts)
+
+        futures = [
+            self.executor.submit(self._embed_batch, [inputs[i] for i in batch])
+            for batch in batches
+        ]
+
+        results: Optional[np.ndarray] = None
+        for batch, future in zip(batches, futures):
+            embeddings = future.result()
+            if results is None:
+                results = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+            results[batch] = embeddings
+
+        logger.info(f"{len(texts)} input, {len(batches)} batch ile embed edildi")
+        return results
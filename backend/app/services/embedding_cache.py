@@ -0,0 +1,186 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# SQLite tek sorguda en fazla 999 parametre kabul eder (eski sürümler)
+_QUERY_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text_hash BLOB NOT NULL,
+    vector BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_embeddings_key ON embeddings(model, text_hash);
+CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+def space_key(model: str, dimensions: int = 0) -> str:
+    """Cache'in model anahtarı: kısaltılmış boyutlar ayrı bir embedding uzayıdır"""
+    return f"{model}@{dimensions}" if dimensions else model
+
+def pack_vector(values: Sequence[float]) -> bytes:
+    return np.asarray(values, dtype=np.float32).tobytes()
+
+def unpack_vector(blob: bytes) -> np.ndarray:
+    # Kopyasız, salt okunur float32 görünümü
+    return np.frombuffer(blob, dtype=np.float32)
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by (model, sha256(text)).
+
+    Vectors are stored as float32 blobs in a SQLite database in WAL mode,
+    so several worker processes can read and write the same file. Least
+    recently used entries are evicted once the total size passes max_bytes.
+    Hit/miss counters are persisted so every process reports the same stats.
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = None):
+        self.path = Path(path or settings.EMBEDDING_CACHE_PATH)
+        self.max_bytes = max_bytes or settings.EMBEDDING_CACHE_MAX_BYTES
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Thread ve process başına ayrı bağlantı (fork sonrası paylaşılmamalı)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _increment(self, conn: sqlite3.Connection, counters: Dict[str, int]) -> None:
+        conn.executemany(
+            "INSERT INTO counters(name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            [(name, value) for name, value in counters.items() if value]
+        )
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Her text için cache'teki embedding'i ya da None döndür"""
+        hashes = [text_hash(text) for text in texts]
+        found: Dict[bytes, bytes] = {}
+
+        conn = self._connection()
+        unique_hashes = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique_hashes), _QUERY_BATCH):
+            batch = unique_hashes[start:start + _QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                [model, *batch]
+            ).fetchall()
+            found.update(rows)
+
+        hits = sum(1 for h in hashes if h in found)
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, h) for h in found]
+                )
+            self._increment(conn, {"hits": hits, "misses": len(hashes) - hits})
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return [unpack_vector(found[h]) if h in found else None for h in hashes]
+
+    def put_many(self, model: str, texts: List[str], embeddings: List[Sequence[float]]) -> None:
+        now = time.time()
+        rows = []
+        for text, embedding in zip(texts, embeddings):
+            blob = pack_vector(embedding)
+            rows.append((model, text_hash(text), blob, len(blob), now))
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            added = 0
+            for row in rows:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO embeddings(model, text_hash, vector, size, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    row
+                )
+                if cursor.rowcount:
+                    added += row[3]
+            self._increment(conn, {"bytes": added})
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Boyut limiti aşıldıysa en eski kullanılanları sil (%90'a inene kadar)"""
+        total = self._counter(conn, "bytes")
+        if total <= self.max_bytes:
+            return
+
+        to_free = total - int(self.max_bytes * 0.9)
+        freed = 0
+        rowids = []
+        for rowid, size in conn.execute("SELECT rowid, size FROM embeddings ORDER BY last_used"):
+            rowids.append((rowid,))
+            freed += size
+            if freed >= to_free:
+                break
+
+        conn.executemany("DELETE FROM embeddings WHERE rowid = ?", rowids)
+        self._increment(conn, {"bytes": -freed, "evictions": len(rowids)})
+        logger.info(f"Embedding cache: {len(rowids)} kayıt silindi ({freed} byte)")
+
+    def _counter(self, conn: sqlite3.Connection, name: str) -> int:
+        row = conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def stats(self) -> Dict[str, float]:
+        conn = self._connection()
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        lookups = hits + misses
+        return {
+            "entries": entries,
+            "bytes": counters.get("bytes", 0),
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+# Singleton
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,261 @@
+"""
+Re-embedding rooms with a different embedding model or dimension.
+
+Each room is copied blue/green into a shadow namespace. Chunk text is
+read from the `chunks` table (legacy vectors: from their metadata),
+embedded with the target model and upserted under the same vector IDs.
+The checkpoint in `embedding_migrations` is committed after every batch,
+so an interrupted run resumes where it stopped. When every document is
+copied, the room's namespace and embedding settings are switched in one
+transaction; the old namespace is kept until `finalize_migration`, and
+`rollback_migration` can switch back until then.
+"""
+from typing import Iterator, List, Optional, Tuple
+import time
+import uuid
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Chunk, Document, EmbeddingMigration, Room
+from app.services.document_processor import document_processor
+from app.services.embedding_batcher import resolve_embedding
+from app.services.vector_store import VectorStore, room_vector_store, vector_id
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bu durumlardaki migration'ların ek namespace'i (hedef / eski) hâlâ tutuluyor
+ACTIVE_STATUSES = ("copying", "switched")
+
+class TokenThrottle:
+    """Paces embedding calls to a tokens-per-minute budget (0 = unlimited)"""
+
+    def __init__(self, tokens_per_minute: int = None, sleep=time.sleep, clock=time.monotonic):
+        self.tokens_per_minute = settings.MIGRATION_MAX_TOKENS_PER_MINUTE if tokens_per_minute is None else tokens_per_minute
+        self._sleep = sleep
+        self._clock = clock
+        self._available_at = 0.0
+
+    def wait(self, tokens: int) -> None:
+        if self.tokens_per_minute <= 0:
+            return
+        now = self._clock()
+        if self._available_at > now:
+            self._sleep(self._available_at - now)
+            now = self._available_at
+        self._available_at = now + tokens * 60.0 / self.tokens_per_minute
+
+def migration_namespaces(db: Session, room_id: int) -> List[str]:
+    """Odanın güncel namespace'i dışında, aktif migration'ın tuttuğu namespace'ler"""
+    namespaces = []
+    for migration in db.query(EmbeddingMigration).filter(
+        EmbeddingMigration.room_id == room_id,
+        EmbeddingMigration.status.in_(ACTIVE_STATUSES)
+    ):
+        namespaces.append(migration.target_namespace if migration.status == "copying" else migration.source_namespace)
+    return namespaces
+
+def start_migration(db: Session, room: Room, model: str, dimensions: int) -> EmbeddingMigration:
+    """Oda için migration başlat ya da aynı hedefe giden yarım kalmış olanı döndür"""
+    active = db.query(EmbeddingMigration).filter(
+        EmbeddingMigration.room_id == room.id,
+        EmbeddingMigration.status.in_(ACTIVE_STATUSES)
+    ).first()
+    if active is not None:
+        if active.status == "copying" and (active.target_model, active.target_dimensions) == (model, dimensions):
+            return active
+        raise ValueError(f"Room {room.id} için migration {active.id} zaten '{active.status}' durumunda")
+
+    source_model, source_dimensions = resolve_embedding(room.embedding_model, room.embedding_dimensions)
+    if (source_model, source_dimensions) == (model, dimensions):
+        raise ValueError(f"Room {room.id} zaten {model} ({dimensions or 'varsayılan'} boyut) kullanıyor")
+
+    migration = EmbeddingMigration(
+        room_id=room.id,
+        status="copying",
+        source_namespace=room.pinecone_namespace,
+        source_model=source_model,
+        source_dimensions=source_dimensions,
+        target_namespace=f"room_{uuid.uuid4().hex[:8]}",
+        target_model=model,
+        target_dimensions=dimensions,
+        copied_document_id=0,
+        copied_chunks=0,
+        chunks_total=0
+    )
+    db.add(migration)
+    db.commit()
+    return migration
+
+def _document_batches(
+    db: Session,
+    store: VectorStore,
+    migration: EmbeddingMigration,
+    document: Document,
+    batch_chunks: int
+) -> Iterator[Tuple[int, List[str], List[str], Optional[List[int]], List[dict]]]:
+    """(sonraki chunk_index, id'ler, text'ler, token sayıları, metadata), checkpoint'ten itibaren"""
+    start = migration.copied_chunks
+    if db.query(Chunk.id).filter(Chunk.document_id == document.id).first() is not None:
+        while True:
+            rows = (
+                db.query(Chunk)
+                .filter(Chunk.document_id == document.id, Chunk.chunk_index >= start)
+                .order_by(Chunk.chunk_index)
+                .limit(batch_chunks)
+                .all()
+            )
+            if not rows:
+                return
+            start = rows[-1].chunk_index + 1
+            yield (
+                start,
+                [vector_id(document.id, row.chunk_index) for row in rows],
+                [row.text for row in rows],
+                [row.token_count for row in rows],
+                [{"document_id": document.id, "chunk_index": row.chunk_index} for row in rows]
+            )
+        return
+
+    # Chunks tablosundan önce işlenmiş döküman: text eski vektörlerin metadata'sında
+    chunk_count = document.chunk_count or 0
+    for batch_start in range(start, chunk_count, batch_chunks):
+        ids = [vector_id(document.id, i) for i in range(batch_start, min(batch_start + batch_chunks, chunk_count))]
+        fetched = store.fetch(migration.source_namespace, ids)
+        missing = [i for i in ids if i not in fetched or "text" not in fetched[i].metadata]
+        if missing:
+            raise ValueError(f"Document {document.id}: {len(missing)} chunk'ın text'i bulunamadı (örn. {missing[0]})")
+        yield (
+            batch_start + len(ids),
+            ids,
+            [fetched[i].metadata["text"] for i in ids],
+            None,
+            [fetched[i].metadata for i in ids]
+        )
+
+def copy_room(
+    db: Session,
+    migration: EmbeddingMigration,
+    store: VectorStore = None,
+    batch_chunks: int = None,
+    throttle: TokenThrottle = None
+) -> bool:
+    """
+    Checkpoint'ten devam ederek odanın dökümanlarını hedef namespace'e
+    yeniden embed et. False: sıradaki döküman henüz işleniyor (bekle ve
+    tekrar çağır); True: kopyalanacak döküman kalmadı.
+    """
+    store = store or room_vector_store(migration.room)
+    batch_chunks = batch_chunks or settings.MIGRATION_BATCH_CHUNKS
+    batcher = document_processor.batcher_for(migration.target_model, migration.target_dimensions)
+
+    while True:
+        document = (
+            db.query(Document)
+            .filter(
+                Document.room_id == migration.room_id,
+                Document.deleted_at.is_(None),
+                Document.id > migration.copied_document_id
+            )
+            .order_by(Document.id)
+            .first()
+        )
+        if document is None:
+            return True
+        if document.status in ("pending", "processing"):
+            # Sıra korunur: checkpoint'ten önceki her döküman kopyalanmış olmalı
+            return False
+
+        for next_index, ids, texts, token_counts, metadata in _document_batches(db, store, migration, document, batch_chunks):
+            if throttle:
+                throttle.wait(sum(token_counts) if token_counts else sum(batcher.count_tokens(texts)))
+            embeddings = document_processor.create_embeddings(
+                texts,
+                token_counts=token_counts,
+                model=migration.target_model,
+                dimensions=migration.target_dimensions
+            )
+            store.upsert(migration.target_namespace, ids, embeddings, metadata)
+            migration.copied_chunks = next_index
+            migration.chunks_total += len(ids)
+            db.commit()
+
+        migration.copied_document_id = document.id
+        migration.copied_chunks = 0
+        db.commit()
+        logger.info(f"Migration {migration.id}: document {document.id} kopyalandı")
+
+def switch_room(db: Session, migration: EmbeddingMigration) -> bool:
+    """
+    Odanın namespace'ini ve embedding ayarını tek transaction'da hedefe
+    çevir. Oda satırı kilitlenir; worker namespace'i FOR SHARE ile okuduğu
+    için değişim sırasında yeni işleme başlayamaz. Checkpoint'ten sonra
+    henüz işlenmeye başlamamış (pending) dökümanlar dışında kopyalanmamış
+    döküman kalmışsa değişim yapılmaz (False).
+    """
+    room = db.query(Room).filter(Room.id == migration.room_id).with_for_update().one()
+    not_copied = db.query(Document.id).filter(
+        Document.room_id == room.id,
+        Document.deleted_at.is_(None),
+        Document.id > migration.copied_document_id,
+        Document.status != "pending"
+    ).first()
+    if not_copied is not None:
+        db.rollback()
+        return False
+
+    room.pinecone_namespace = migration.target_namespace
+    room.embedding_model = migration.target_model
+    room.embedding_dimensions = migration.target_dimensions
+    migration.status = "switched"
+    migration.switched_at = func.now()
+    migration.last_error = None
+    db.commit()
+    logger.info(f"Room {room.id} {migration.target_namespace} namespace'ine geçti ({migration.target_model})")
+    return True
+
+def verify_migration(db: Session, migration: EmbeddingMigration, store: VectorStore = None) -> Tuple[int, int]:
+    """(veritabanındaki chunk sayısı, yeni namespace'teki vektör sayısı)"""
+    store = store or room_vector_store(migration.room)
+    expected = db.query(func.coalesce(func.sum(Document.chunks_done), 0)).filter(
+        Document.room_id == migration.room_id,
+        Document.deleted_at.is_(None)
+    ).scalar()
+    actual = store.stats().get("namespaces", {}).get(migration.target_namespace, 0)
+    return int(expected), int(actual)
+
+def finalize_migration(db: Session, migration: EmbeddingMigration, store: VectorStore = None, force: bool = False) -> None:
+    """Doğrulanan migration'ın eski namespace'ini sil"""
+    store = store or room_vector_store(migration.room)
+    if migration.status != "switched":
+        raise ValueError(f"Migration {migration.id} '{migration.status}' durumunda, sadece 'switched' tamamlanabilir")
+    expected, actual = verify_migration(db, migration, store)
+    if expected != actual and not force:
+        raise ValueError(f"Migration {migration.id}: veritabanında {expected} chunk, yeni namespace'te {actual} vektör var")
+
+    store.delete_namespace(migration.source_namespace)
+    migration.status = "finalized"
+    db.commit()
+
+def rollback_migration(db: Session, migration: EmbeddingMigration, store: VectorStore = None) -> None:
+    """Odayı eski namespace'e/modele geri al ve hedef namespace'i sil"""
+    store = store or room_vector_store(migration.room)
+    if migration.status == "switched":
+        room = db.query(Room).filter(Room.id == migration.room_id).with_for_update().one()
+        newer = db.query(Document.id).filter(
+            Document.room_id == room.id,
+            Document.deleted_at.is_(None),
+            Document.id > migration.copied_document_id
+        ).first()
+        if newer is not None:
+            db.rollback()
+            raise ValueError(f"Room {room.id}: değişimden sonra eklenen dökümanlar sadece yeni namespace'te var")
+        room.pinecone_namespace = migration.source_namespace
+        room.embedding_model = migration.source_model
+        room.embedding_dimensions = migration.source_dimensions
+    elif migration.status != "copying":
+        raise ValueError(f"Migration {migration.id} '{migration.status}' durumunda, geri alınamaz")
+
+    migration.status = "rolled_back"
+    db.commit()
+    store.delete_namespace(migration.target_namespace)
@@ -0,0 +1,308 @@
+"""
+Deferred cleanup for soft-deleted rooms and documents.
+
+Delete requests only set `deleted_at`; this module removes what is
+left behind (vectors, uploaded files and text sidecars, then the rows)
+in batches, off the request path. Documents whose ingestion failed
+permanently lose the chunks and vectors of their partial upload. It runs as a sweeper thread inside
+the ingestion worker (see app/worker.py).
+"""
+from pathlib import Path
+from typing import Dict, List, Set
+import os
+import threading
+import time
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Chunk, Document, EmbeddingMigration, IngestionJob, Room
+from app.services.chunk_store import delete_chunks
+from app.services.embedding_migration import ACTIVE_STATUSES, migration_namespaces
+from app.services.text_sidecar import SIDECAR_SUFFIX, remove_sidecar
+from app.services.vector_store import VectorStore, document_vector_prefix, room_vector_store, vector_shards
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _remove_file(file_path: str) -> None:
+    remove_sidecar(file_path)
+    Path(file_path).unlink(missing_ok=True)
+
+def _delete_document_vectors(db: Session, document: Document, store: VectorStore = None) -> None:
+    # FOR SHARE: shard rebalance'ı ile yarışmaz (taşıma bitene kadar bekler)
+    room = db.query(Room).filter(Room.id == document.room_id).with_for_update(read=True).one()
+    room_store = store or room_vector_store(room)
+    # Embedding migration sürüyorsa diğer namespace'te de kopyası var
+    for namespace in [room.pinecone_namespace, *migration_namespaces(db, room.id)]:
+        room_store.delete_prefix(
+            namespace,
+            document_vector_prefix(document.id),
+            {"document_id": document.id}
+        )
+
+def purge_deleted_documents(db: Session, store: VectorStore = None, limit: int = None) -> int:
+    """
+    Silinmiş dökümanların vektörlerini, dosyalarını ve satırlarını temizle.
+    Satırlar SKIP LOCKED ile alınır, birden fazla sweeper çakışmaz.
+    İşlenmekte olan (job'u 'processing') dökümanlar bir sonraki tura kalır,
+    yoksa worker silinen önekin altına yeni batch yazabilir.
+    store verilmezse her döküman odasının shard'ından silinir.
+    """
+    in_flight = db.query(IngestionJob.document_id).filter(IngestionJob.status == "processing")
+    documents = (
+        db.query(Document)
+        .filter(Document.deleted_at.isnot(None), Document.id.notin_(in_flight))
+        .order_by(Document.deleted_at, Document.id)
+        .with_for_update(skip_locked=True)
+        .limit(limit or settings.GC_BATCH_SIZE)
+        .all()
+    )
+
+    purged = 0
+    for document in documents:
+        try:
+            _delete_document_vectors(db, document, store)
+            _remove_file(document.file_path)
+        except Exception as e:
+            # Satır kalır, bir sonraki turda tekrar denenir
+            logger.error(f"Document {document.id} temizlenemedi: {e}")
+            continue
+        # Chunk'lar ve job'lar cascade ile silinir
+        db.delete(document)
+        purged += 1
+
+    db.commit()
+    return purged
+
+def purge_failed_documents(db: Session, store: VectorStore = None, limit: int = None) -> int:
+    """
+    Kalıcı olarak başarısız olan dökümanların yarım kalan yüklemesini
+    (vektörler ve chunk'lar) sil. Satır ve dosya kalır, kullanıcı dökümanı
+    'failed' olarak görmeye devam eder. Chunk'ı kalmayanlar tekrar seçilmez.
+    """
+    in_flight = db.query(IngestionJob.document_id).filter(IngestionJob.status == "processing")
+    has_chunks = db.query(Chunk.id).filter(Chunk.document_id == Document.id).exists()
+    documents = (
+        db.query(Document)
+        .filter(
+            Document.status == "failed",
+            Document.deleted_at.is_(None),
+            Document.id.notin_(in_flight),
+            has_chunks
+        )
+        .order_by(Document.id)
+        .with_for_update(skip_locked=True)
+        .limit(limit or settings.GC_BATCH_SIZE)
+        .all()
+    )
+
+    purged = 0
+    for document in documents:
+        try:
+            _delete_document_vectors(db, document, store)
+        except Exception as e:
+            logger.error(f"Document {document.id} yarım vektörleri silinemedi: {e}")
+            continue
+        # Chunk'lar vektörlerden sonra silinir: yarıda kalırsa bir sonraki tur yine seçer
+        delete_chunks(db, document.id)
+        document.chunks_done = 0
+        document.chunks_total = None
+        purged += 1
+
+    db.commit()
+    return purged
+
+def purge_deleted_rooms(db: Session, store: VectorStore = None, limit: int = None) -> int:
+    """
+    Dökümanları temizlenmiş silinmiş odaların namespace'ini ve satırını sil.
+    Dökümanı kalan odalar (örn. işlenmekte olan) bekletilir.
+    """
+    remaining = db.query(Document.room_id).distinct()
+    rooms = (
+        db.query(Room)
+        .filter(Room.deleted_at.isnot(None), Room.id.notin_(remaining))
+        .order_by(Room.deleted_at, Room.id)
+        .with_for_update(skip_locked=True)
+        .limit(limit or settings.GC_BATCH_SIZE)
+        .all()
+    )
+
+    purged = 0
+    for room in rooms:
+        try:
+            # Döküman silmelerinden kalan (örn. yarım batch) vektörler dahil
+            room_store = store or room_vector_store(room)
+            for namespace in [room.pinecone_namespace, *migration_namespaces(db, room.id)]:
+                room_store.delete_namespace(namespace)
+        except Exception as e:
+            logger.error(f"Room {room.id} namespace'i silinemedi: {e}")
+            continue
+        upload_path = Path(settings.UPLOAD_DIR) / f"user_{room.user_id}" / f"room_{room.id}"
+        try:
+            upload_path.rmdir()
+        except OSError:
+            # Yok ya da boş değil (sahipsiz dosyaları purge_orphan_files toplar)
+            pass
+        # Mesajlar cascade ile silinir
+        db.delete(room)
+        purged += 1
+
+    db.commit()
+    return purged
+
+def purge_orphan_files(db: Session, grace_seconds: int = None) -> int:
+    """
+    Upload klasöründe hiçbir Document satırına ait olmayan dosyaları sil.
+    Upload sırasında dosya satırdan önce yazıldığı için sadece grace
+    süresinden eski dosyalara dokunulur.
+    """
+    if grace_seconds is None:
+        grace_seconds = settings.GC_ORPHAN_FILE_GRACE_SECONDS
+    upload_dir = Path(settings.UPLOAD_DIR)
+    if not upload_dir.is_dir():
+        return 0
+
+    referenced: Set[str] = {
+        os.path.abspath(file_path) for (file_path,) in db.query(Document.file_path)
+    }
+    cutoff = time.time() - grace_seconds
+
+    removed = 0
+    for path in upload_dir.rglob("*"):
+        if not path.is_file():
+            continue
+        # Sidecar, kaynak dosyasıyla aynı kaderi paylaşır
+        source = str(path)[:-len(SIDECAR_SUFFIX)] if path.name.endswith(SIDECAR_SUFFIX) else str(path)
+        if os.path.abspath(source) in referenced:
+            continue
+        try:
+            if path.stat().st_mtime > cutoff:
+                continue
+            path.unlink()
+            removed += 1
+            logger.info(f"Sahipsiz dosya silindi: {path}")
+        except OSError as e:
+            logger.error(f"Sahipsiz dosya silinemedi ({path}): {e}")
+    return removed
+
+def compact_vector_stores(store: VectorStore = None) -> int:
+    """
+    Silmelerden kalan ölü satırların yerini geri kazan (local backend'de
+    ölü oranı LOCAL_VECTOR_COMPACT_DEAD_FRACTION'ı geçen namespace'ler
+    yeniden yazılır). Geri kazanılan toplam satır sayısını döndürür.
+    """
+    stores = [store] if store else [vector_shards.store(name) for name in vector_shards.names]
+    reclaimed = 0
+    for shard_store in stores:
+        try:
+            reclaimed += sum(shard_store.compact().values())
+        except Exception as e:
+            logger.error(f"Vector store sıkıştırılamadı: {e}")
+    return reclaimed
+
+def reconcile(db: Session, store: VectorStore = None) -> Dict[str, List[str]]:
+    """
+    Her shard'daki namespace sayılarını veritabanıyla karşılaştır.
+    Sadece raporlar: index başka uygulamalarla paylaşılıyor olabilir ve
+    sayılar (özellikle Pinecone'da) kısa süre geride kalabilir, bu yüzden
+    burada hiçbir şey silinmez. store verilirse tüm odalar onda aranır.
+    """
+    shards = {None: store} if store else {name: vector_shards.store(name) for name in vector_shards.names}
+
+    # Henüz temizlenmemiş (silinmiş) dökümanların vektörleri de hâlâ index'te
+    rooms = (
+        db.query(Room.pinecone_namespace, Room.vector_shard, func.coalesce(func.sum(Document.chunks_done), 0))
+        .outerjoin(Document, Document.room_id == Room.id)
+        .group_by(Room.pinecone_namespace, Room.vector_shard)
+        .all()
+    )
+    busy = {
+        namespace for (namespace,) in
+        db.query(Room.pinecone_namespace)
+        .join(Document, Document.room_id == Room.id)
+        .filter(Document.status.in_(["pending", "processing"]))
+        .distinct()
+    }
+
+    # Embedding migration'ın hedef / eski namespace'leri beklenen namespace'lerdir
+    retained = {
+        namespace
+        for migration in db.query(EmbeddingMigration).filter(EmbeddingMigration.status.in_(ACTIVE_STATUSES))
+        for namespace in (migration.source_namespace, migration.target_namespace)
+    }
+
+    report = {"unknown": [], "drift": []}
+    for shard, shard_store in shards.items():
+        expected = {
+            namespace: int(count)
+            for namespace, room_shard, count in rooms
+            if shard is None or vector_shards.resolve(room_shard) == shard
+        }
+        namespaces = shard_store.stats().get("namespaces", {})
+        where = f" (shard {shard})" if shard else ""
+        for namespace, count in sorted(namespaces.items()):
+            if namespace in retained and namespace not in expected:
+                continue
+            if namespace not in expected:
+                # Rebalance'ın yarıda kalmış bir kopyası da olabilir
+                report["unknown"].append(namespace)
+                logger.warning(f"Reconcile: namespace {namespace}{where} ({count} vektör) hiçbir odaya ait değil")
+            elif namespace not in busy and count != expected[namespace]:
+                report["drift"].append(namespace)
+                logger.warning(
+                    f"Reconcile: namespace {namespace}{where} {count} vektör içeriyor, "
+                    f"veritabanında {expected[namespace]} chunk var"
+                )
+    return report
+
+class GarbageCollector:
+    """
+    Periodically purges soft-deleted documents and rooms and the partial
+    uploads of failed documents, compacts the local vector files they
+    leave sparse, removes orphaned upload files
+    and reports vector store drift.
+    """
+
+    def __init__(self, interval: float = None, reconcile_interval: float = None, store: VectorStore = None):
+        self.interval = interval or settings.GC_INTERVAL_SECONDS
+        self.reconcile_interval = reconcile_interval or settings.GC_RECONCILE_INTERVAL_SECONDS
+        self.store = store  # None: her oda kendi shard'ında
+        self._stopping = threading.Event()
+        self._last_reconcile = None
+
+    def stop(self, *_):
+        self._stopping.set()
+
+    def run_once(self) -> Dict[str, int]:
+        """Tek tur: önce dökümanlar, sonra boşalan odalar"""
+        db = SessionLocal()
+        try:
+            result = {
+                "documents": purge_deleted_documents(db, self.store),
+                "failed_documents": purge_failed_documents(db, self.store),
+                "rooms": purge_deleted_rooms(db, self.store)
+            }
+            periodic = self._last_reconcile is None or time.monotonic() - self._last_reconcile >= self.reconcile_interval
+            # Sıkıştırma silme olan turlarda, ayrıca (diğer silmeler için) periyodik olarak
+            if result["documents"] or result["failed_documents"] or result["rooms"] or periodic:
+                result["compacted_vectors"] = compact_vector_stores(self.store)
+            if periodic:
+                self._last_reconcile = time.monotonic()
+                result["orphan_files"] = purge_orphan_files(db)
+                reconcile(db, self.store)
+            return result
+        finally:
+            db.close()
+
+    def run(self) -> None:
+        logger.info("Garbage collector started")
+        while not self._stopping.is_set():
+            try:
+                result = self.run_once()
+                if any(result.values()):
+                    logger.info(f"Garbage collector: {result}")
+            except Exception as e:
+                logger.error(f"Garbage collector hatası: {e}", exc_info=True)
+            self._stopping.wait(self.interval)
+        logger.info("Garbage collector stopped")
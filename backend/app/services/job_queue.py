@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import random
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Document, IngestionJob
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PermanentJobError(Exception):
+    """Raised by a job that retrying cannot fix; the job fails on this attempt"""
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def retry_delay_seconds(attempts: int) -> float:
+    """Exponential backoff with full jitter"""
+    ceiling = min(
+        settings.JOB_RETRY_MAX_SECONDS,
+        settings.JOB_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0))
+    )
+    return random.uniform(ceiling / 2, ceiling)
+
+def enqueue_document(db: Session, document_id: int) -> IngestionJob:
+    """Add an ingestion job for the document (caller commits)"""
+    job = IngestionJob(
+        document_id=document_id,
+        status="pending",
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        run_after=_utcnow()
+    )
+    db.add(job)
+    return job
+
+def claim_next_job(db: Session, worker_id: str) -> Optional[IngestionJob]:
+    """
+    Lock the next runnable job with SELECT ... FOR UPDATE SKIP LOCKED
+    so concurrent workers never pick up the same row.
+    """
+    job = (
+        db.query(IngestionJob)
+        .filter(
+            IngestionJob.status == "pending",
+            IngestionJob.run_after <= _utcnow()
+        )
+        .order_by(IngestionJob.run_after, IngestionJob.id)
+        .with_for_update(skip_locked=True)
+        .limit(1)
+        .first()
+    )
+
+    if not job:
+        db.rollback()
+        return None
+
+    job.status = "processing"
+    job.attempts += 1
+    job.locked_by = worker_id
+    job.locked_at = _utcnow()
+
+    db.query(Document).filter(Document.id == job.document_id).update(
+        {"status": "processing"}, synchronize_session=False
+    )
+    db.commit()
+    db.refresh(job)
+
+    return job
+
+def renew_job_lock(db: Session, job_id: int, worker_id: str) -> bool:
+    """
+    Heartbeat: refresh locked_at of a job this worker is still processing,
+    so long-running jobs are not recovered as stale. Returns False if the
+    job is no longer locked by this worker.
+    """
+    renewed = (
+        db.query(IngestionJob)
+        .filter(
+            IngestionJob.id == job_id,
+            IngestionJob.status == "processing",
+            IngestionJob.locked_by == worker_id
+        )
+        .update({"locked_at": _utcnow()}, synchronize_session=False)
+    )
+    db.commit()
+    return renewed > 0
+
+def complete_job(db: Session, job: IngestionJob) -> None:
+    job.status = "completed"
+    job.last_error = None
+    job.locked_by = None
+    job.locked_at = None
+    db.commit()
+
+def _reschedule_or_fail(db: Session, job: IngestionJob, error: str, retry: bool = True) -> None:
+    job.last_error = error[:2000]
+    job.locked_by = None
+    job.locked_at = None
+
+    if not retry or job.attempts >= job.max_attempts:
+        job.status = "failed"
+        document_status = "failed"
+        if retry:
+            logger.error(f"Job {job.id} failed permanently after {job.attempts} attempts")
+        else:
+            logger.error(f"Job {job.id} failed permanently (not retryable): {error[:200]}")
+    else:
+        delay = retry_delay_seconds(job.attempts)
+        job.status = "pending"
+        job.run_after = _utcnow() + timedelta(seconds=delay)
+        document_status = "pending"
+        logger.warning(f"Job {job.id} retry {job.attempts}/{job.max_attempts} in {delay:.0f}s")
+
+    db.query(Document).filter(Document.id == job.document_id).update(
+        {"status": document_status}, synchronize_session=False
+    )
+
+def fail_job(db: Session, job: IngestionJob, error: str, retry: bool = True) -> None:
+    """
+    Reschedule with backoff, or mark the job and document as failed
+    (attempts exhausted, or retry=False for a PermanentJobError)
+    """
+    _reschedule_or_fail(db, job, error, retry)
+    db.commit()
+
+def recover_stale_jobs(db: Session, stale_after_seconds: Optional[int] = None) -> int:
+    """
+    Put jobs left in 'processing' by a crashed worker back in the queue.
+    Live workers renew locked_at (renew_job_lock), so only jobs whose
+    worker stopped heartbeating go stale. The attempt that was
+    interrupted still counts towards max_attempts.
+    """
+    if stale_after_seconds is None:
+        stale_after_seconds = settings.JOB_STALE_AFTER_SECONDS
+
+    cutoff = _utcnow() - timedelta(seconds=stale_after_seconds)
+    stale_jobs = (
+        db.query(IngestionJob)
+        .filter(
+            IngestionJob.status == "processing",
+            IngestionJob.locked_at < cutoff
+        )
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    for job in stale_jobs:
+        logger.warning(f"Recovering stale job {job.id} (locked by {job.locked_by})")
+        _reschedule_or_fail(db, job, "Worker did not finish the job (stale lock recovered)")
+
+    db.commit()
+    return len(stale_jobs)
@@ -0,0 +1,592 @@
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+import json
+import os
+import re
+import sqlite3
+import threading
+import numpy as np
+from app.config import settings
+from app.services.vector_store import VectorMatch, VectorRecord, VectorStore
+import logging
+
+logger = logging.getLogger(__name__)
+
+# SQLite tek sorguda en fazla 999 parametre kabul eder (eski sürümler)
+_QUERY_BATCH = 500
+_MIN_CAPACITY = 1024
+_NAMESPACE_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+# Kod taraması blok blok yapılır (float32'ye açılan geçici dizi sınırlı kalsın)
+_SCAN_BLOCK_ROWS = 2048
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vectors (
+    row INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    metadata TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS info (
+    key TEXT PRIMARY KEY,
+    value INTEGER
+);
+"""
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Satırları birim uzunluğa getir (cosine = dot product)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def int8_dtype(dim: int) -> np.dtype:
+    """Satır başına ölçek + int8 kodlar"""
+    return np.dtype([("scale", "<f4"), ("code", "i1", (dim,))])
+
+def binary_width(dim: int) -> int:
+    """İşaret bitlerinin bayt genişliği (uint16 olarak okunabilsin diye çift)"""
+    return (dim + 15) // 16 * 2
+
+def quantize_int8(vectors: np.ndarray) -> np.ndarray:
+    """Satır başına simetrik scalar quantization: x ≈ scale * code"""
+    vectors = np.atleast_2d(vectors)
+    codes = np.empty(len(vectors), dtype=int8_dtype(vectors.shape[1]))
+    scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+    codes["scale"] = scales
+    codes["code"] = np.rint(vectors / scales[:, None])
+    return codes
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """Boyut başına işaret biti (1 bit/boyut)"""
+    vectors = np.atleast_2d(vectors)
+    bits = np.packbits(vectors > 0, axis=1)
+    padding = binary_width(vectors.shape[1]) - bits.shape[1]
+    return np.pad(bits, ((0, 0), (0, padding)))
+
+# 16 bitlik değerlerin popcount tablosu (numpy 1.x'te bitwise_count yok)
+_POPCOUNT16 = np.unpackbits(
+    np.arange(2 ** 16, dtype=">u2").view(np.uint8).reshape(-1, 2), axis=1
+).sum(axis=1).astype(np.uint16)
+
+def _top_k(scores: np.ndarray, alive: np.ndarray, k: int) -> np.ndarray:
+    """Canlı satırlar arasından en yüksek k skorun indeksleri, azalan sırada"""
+    scores[~alive] = -np.inf
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+class _Snapshot(NamedTuple):
+    version: int
+    generation: int  # compaction/clear satır numaralarını değiştirir
+    matrix: Optional[np.ndarray]  # (capacity, dim) memmap, salt okunur
+    int8: Optional[np.ndarray]  # (capacity,) int8_dtype memmap
+    bits: Optional[np.ndarray]  # (capacity, binary_width) uint8 memmap
+    alive: np.ndarray  # bool, satır başına (next_row uzunluğunda)
+    count: int
+
+class _Namespace:
+    """
+    Tek namespace: ID/metadata SQLite'ta, vektörler float32 memmap dosyasında.
+
+    Yazma işlemleri SQLite write lock'u altında yapılır ve `version`
+    sayacını artırır; okuyucular (başka process'ler dahil) sayaç değişince
+    memmap'i ve canlı satır maskesini yeniler. Dosya yerinde hiç
+    küçültülmez (açık memmap'ler SIGBUS almasın): silinen satırlar maskelenir,
+    namespace silinince ya da ölü satırlar çoğalınca (compact) canlı satırlar
+    yeni bir dosya nesline yazılır. Satır numarası nesle bağlıdır; satır ->
+    ID okumaları snapshot'ın nesli hâlâ geçerliyse yapılır.
+    """
+
+    # Dosya türü -> uzantı; hepsi aynı kapasiteyle birlikte büyür
+    _KINDS = ("f32", "i8", "bin")
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.db_path = directory / "meta.sqlite3"
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Thread ve process başına ayrı bağlantı (fork sonrası paylaşılmamalı)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _info(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        # codes: bu nesildeki tüm satırların int8/binary kodları yazılı mı
+        info = {"version": 0, "dim": 0, "capacity": 0, "next_row": 0, "generation": 0, "codes": 0}
+        info.update(conn.execute("SELECT key, value FROM info").fetchall())
+        return info
+
+    def _set_info(self, conn: sqlite3.Connection, info: Dict[str, int]) -> None:
+        conn.executemany("INSERT OR REPLACE INTO info(key, value) VALUES (?, ?)", list(info.items()))
+
+    def _data_path(self, generation: int, kind: str = "f32") -> Path:
+        return self.directory / f"vectors.{generation}.{kind}"
+
+    def _row_bytes(self, kind: str, dim: int) -> int:
+        if kind == "f32":
+            return dim * 4
+        if kind == "i8":
+            return int8_dtype(dim).itemsize
+        return binary_width(dim)
+
+    def _open(self, kind: str, info: Dict[str, int], mode: str) -> np.ndarray:
+        path = self._data_path(info["generation"], kind)
+        capacity, dim = info["capacity"], info["dim"]
+        if kind == "f32":
+            return np.memmap(path, dtype=np.float32, mode=mode, shape=(capacity, dim))
+        if kind == "i8":
+            return np.memmap(path, dtype=int8_dtype(dim), mode=mode, shape=(capacity,))
+        return np.memmap(path, dtype=np.uint8, mode=mode, shape=(capacity, binary_width(dim)))
+
+    def _ensure_files(self, info: Dict[str, int]) -> None:
+        # Dosyalar büyütülür (küçültülmez), açık memmap'ler geçerli kalır
+        for kind in self._KINDS:
+            size = info["capacity"] * self._row_bytes(kind, info["dim"])
+            with open(self._data_path(info["generation"], kind), "ab") as data_file:
+                if data_file.tell() < size:
+                    data_file.truncate(size)
+
+    def _write(self, fn) -> Any:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            info = self._info(conn)
+            result = fn(conn, info)
+            info["version"] += 1
+            self._set_info(conn, info)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def snapshot(self) -> _Snapshot:
+        conn = self._connection()
+        row = conn.execute("SELECT value FROM info WHERE key = 'version'").fetchone()
+        version = row[0] if row else 0
+
+        with self._lock:
+            if self._snapshot is not None and self._snapshot.version == version:
+                return self._snapshot
+
+            while True:
+                conn.execute("BEGIN")
+                try:
+                    info = self._info(conn)
+                    rows = np.fromiter(
+                        (r for (r,) in conn.execute("SELECT row FROM vectors")),
+                        dtype=np.int64
+                    )
+                finally:
+                    conn.execute("COMMIT")
+
+                matrix = int8 = bits = None
+                try:
+                    if info["capacity"] and info["dim"]:
+                        matrix = self._open("f32", info, "r")
+                        if info["codes"]:
+                            int8 = self._open("i8", info, "r")
+                            bits = self._open("bin", info, "r")
+                except FileNotFoundError:
+                    # Okuma ile açma arasında yeni nesle geçildi, eski dosyalar silindi
+                    continue
+                break
+            alive = np.zeros(info["next_row"], dtype=bool)
+            alive[rows] = True
+
+            self._snapshot = _Snapshot(info["version"], info["generation"], matrix, int8, bits, alive, len(rows))
+            return self._snapshot
+    
+    def _read(self, snapshot: _Snapshot, fn) -> Any:
+        """fn(conn)'u snapshot'ın nesli hâlâ geçerliyse tek okuma transaction'ında çalıştır, değilse None"""
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            row = conn.execute("SELECT value FROM info WHERE key = 'generation'").fetchone()
+            if (row[0] if row else 0) != snapshot.generation:
+                return None
+            return fn(conn)
+        finally:
+            conn.execute("COMMIT")
+
+    def upsert(self, ids: List[str], vectors: np.ndarray, metadata: List[Dict[str, Any]]) -> int:
+        vectors = normalize(np.atleast_2d(vectors))
+
+        def write(conn: sqlite3.Connection, info: Dict[str, int]) -> int:
+            dim = vectors.shape[1]
+            if info["dim"] and info["dim"] != dim:
+                raise ValueError(f"Namespace boyutu {info['dim']}, gelen vektör {dim}")
+            info["dim"] = dim
+            if info["next_row"] == 0:
+                info["codes"] = 1
+
+            existing = self._rows_for(conn, ids)
+            rows = []
+            for vector_id in ids:
+                if vector_id not in existing:
+                    existing[vector_id] = info["next_row"]
+                    info["next_row"] += 1
+                rows.append(existing[vector_id])
+
+            if info["next_row"] > info["capacity"]:
+                info["capacity"] = max(info["next_row"], info["capacity"] * 2, _MIN_CAPACITY)
+            self._ensure_files(info)
+
+            self._write_rows(info, rows, vectors)
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO vectors(row, id, metadata) VALUES (?, ?, ?)",
+                [(row, vector_id, json.dumps(meta)) for row, vector_id, meta in zip(rows, ids, metadata)]
+            )
+            return len(ids)
+
+        return self._write(write)
+
+    def _write_rows(self, info: Dict[str, int], rows: List[int], vectors: np.ndarray) -> None:
+        columns = {"f32": vectors}
+        if info["codes"]:
+            columns.update(i8=quantize_int8(vectors), bin=quantize_binary(vectors))
+        for kind, values in columns.items():
+            data = self._open(kind, info, "r+")
+            data[rows] = values
+            data.flush()
+            del data
+
+    def build_codes(self) -> None:
+        """Kodları olmayan (eski) bir nesil için int8/binary kodları float32'den üret"""
+        def write(conn: sqlite3.Connection, info: Dict[str, int]) -> None:
+            if not info["codes"] and info["next_row"]:
+                info["codes"] = 1
+                self._ensure_files(info)
+                matrix = self._open("f32", info, "r")
+                for start in range(0, info["next_row"], _SCAN_BLOCK_ROWS):
+                    rows = list(range(start, min(start + _SCAN_BLOCK_ROWS, info["next_row"])))
+                    self._write_rows(info, rows, np.asarray(matrix[rows]))
+                del matrix
+            else:
+                info["codes"] = 1
+
+        self._write(write)
+
+    def _approximate_scores(self, snapshot: _Snapshot, query: np.ndarray, quantization: str) -> np.ndarray:
+        """Kodlar üzerinden yaklaşık skor (büyük olan daha benzer)"""
+        rows = len(snapshot.alive)
+        scores = np.empty(rows, dtype=np.float32)
+        if quantization == "int8":
+            for start in range(0, rows, _SCAN_BLOCK_ROWS):
+                end = min(start + _SCAN_BLOCK_ROWS, rows)
+                block = snapshot.int8[start:end]
+                scores[start:end] = (block["code"].astype(np.float32) @ query) * block["scale"]
+        else:
+            # Hamming mesafesi: XOR + popcount (16 bitlik tablo ile)
+            query_bits = quantize_binary(query)[0].view(np.uint16)
+            for start in range(0, rows, _SCAN_BLOCK_ROWS):
+                end = min(start + _SCAN_BLOCK_ROWS, rows)
+                block = np.asarray(snapshot.bits[start:end]).view(np.uint16)
+                scores[start:end] = -_POPCOUNT16[block ^ query_bits].sum(axis=1, dtype=np.int32)
+        return scores
+
+    def _rows_for(self, conn: sqlite3.Connection, ids: List[str]) -> Dict[str, int]:
+        found: Dict[str, int] = {}
+        for start in range(0, len(ids), _QUERY_BATCH):
+            batch = ids[start:start + _QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            found.update(conn.execute(
+                f"SELECT id, row FROM vectors WHERE id IN ({placeholders})", batch
+            ).fetchall())
+        return found
+
+    def _records(self, conn: sqlite3.Connection, column: str, keys: List[Any]) -> List[tuple]:
+        records = []
+        for start in range(0, len(keys), _QUERY_BATCH):
+            batch = keys[start:start + _QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            records.extend(conn.execute(
+                f"SELECT row, id, metadata FROM vectors WHERE {column} IN ({placeholders})", batch
+            ).fetchall())
+        return records
+
+    def query(
+        self,
+        vector: np.ndarray,
+        top_k: int,
+        quantization: str = "none",
+        rescore_factor: int = 1
+    ) -> List[VectorMatch]:
+        while True:
+            snapshot = self.snapshot()
+            if snapshot.matrix is None or snapshot.count == 0:
+                return []
+            if quantization != "none" and snapshot.int8 is None:
+                self.build_codes()
+                snapshot = self.snapshot()
+
+            query = normalize(vector)
+            k = min(top_k, snapshot.count)
+            if quantization == "none":
+                # Exact top-k: tek matris-vektör çarpımı
+                scores = np.asarray(snapshot.matrix[:len(snapshot.alive)] @ query)
+                top = _top_k(scores, snapshot.alive, k)
+                top_scores = scores[top]
+            else:
+                # Kodlarla aday seç, adayları diskteki float32 vektörlerle yeniden skorla
+                approximate = self._approximate_scores(snapshot, query, quantization)
+                candidates = np.sort(_top_k(approximate, snapshot.alive, min(k * rescore_factor, snapshot.count)))
+                exact = np.asarray(snapshot.matrix[candidates] @ query)
+                order = np.argsort(-exact)[:k]
+                top, top_scores = candidates[order], exact[order]
+
+            records = self._read(snapshot, lambda conn: self._records(conn, "row", top.tolist()))
+            if records is not None:
+                break
+            # Arada compact edildi: satır numaraları değişti, yeni snapshot ile tekrar
+
+        records = {row: (vector_id, metadata) for row, vector_id, metadata in records}
+        # Snapshot alındıktan sonra silinmiş olanlar atlanır
+        return [
+            VectorMatch(records[row][0], score, json.loads(records[row][1]))
+            for row, score in zip(top.tolist(), top_scores.tolist())
+            if row in records
+        ]
+
+    def fetch(self, ids: List[str]) -> Dict[str, VectorRecord]:
+        while True:
+            snapshot = self.snapshot()
+            records = self._read(snapshot, lambda conn: self._records(conn, "id", ids))
+            if records is not None:
+                break
+        return {
+            vector_id: VectorRecord(vector_id, np.array(snapshot.matrix[row]), json.loads(metadata))
+            for row, vector_id, metadata in records
+            if snapshot.matrix is not None and row < len(snapshot.alive)
+        }
+
+    def delete(self, ids: List[str]) -> None:
+        def write(conn: sqlite3.Connection, info: Dict[str, int]) -> None:
+            for start in range(0, len(ids), _QUERY_BATCH):
+                batch = ids[start:start + _QUERY_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                conn.execute(f"DELETE FROM vectors WHERE id IN ({placeholders})", batch)
+
+        self._write(write)
+
+    def delete_prefix(self, prefix: str) -> None:
+        # UNIQUE(id) index'i üzerinden aralık sorgusu (LIKE'ta '_' joker karakter)
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+        def write(conn: sqlite3.Connection, info: Dict[str, int]) -> None:
+            conn.execute("DELETE FROM vectors WHERE id >= ? AND id < ?", (prefix, upper))
+
+        self._write(write)
+
+    def dead_rows(self) -> Tuple[int, int]:
+        """(silinmiş ama dosyada yer tutan satır, toplam satır)"""
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            next_row = self._info(conn)["next_row"]
+            live = conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        finally:
+            conn.execute("COMMIT")
+        return next_row - live, next_row
+
+    def compact(self, min_dead_fraction: float) -> int:
+        """
+        Ölü satır oranı min_dead_fraction'ı geçtiyse canlı satırları yeni
+        bir dosya nesline sıkıştırarak yaz. Geri kazanılan satır sayısını döndürür.
+        """
+        # Ucuz ön kontrol: eşik aşılmadıysa yazma kilidi alınmaz (version değişmez)
+        dead, total = self.dead_rows()
+        if dead <= 0 or dead < total * min_dead_fraction:
+            return 0
+
+        def write(conn: sqlite3.Connection, info: Dict[str, int]) -> Optional[Tuple[int, int]]:
+            # Başka bir process arada sıkıştırmış olabilir
+            rows = [r for (r,) in conn.execute("SELECT row FROM vectors ORDER BY row")]
+            dead = info["next_row"] - len(rows)
+            if dead <= 0 or dead < info["next_row"] * min_dead_fraction:
+                return None
+
+            old_info = dict(info)
+            info["generation"] += 1
+            info["next_row"] = len(rows)
+            if not rows:
+                info.update(dim=0, capacity=0, codes=0)
+                return old_info["generation"], dead
+            info["capacity"] = max(len(rows), _MIN_CAPACITY)
+            self._ensure_files(info)
+
+            kinds = self._KINDS if info["codes"] else ("f32",)
+            for kind in kinds:
+                source = self._open(kind, old_info, "r")
+                target = self._open(kind, info, "r+")
+                for start in range(0, len(rows), _SCAN_BLOCK_ROWS):
+                    block = rows[start:start + _SCAN_BLOCK_ROWS]
+                    target[start:start + len(block)] = source[block]
+                target.flush()
+                del source, target
+
+            # Artan sırayla numaralanır: yeni numara eskisinden büyük olamaz, çakışma olmaz
+            conn.executemany(
+                "UPDATE vectors SET row = ? WHERE row = ?",
+                [(new_row, old_row) for new_row, old_row in enumerate(rows) if new_row != old_row]
+            )
+            return old_info["generation"], dead
+
+        result = self._write(write)
+        if result is None:
+            return 0
+        old_generation, reclaimed = result
+        # Açık memmap'ler unlink edilmiş dosyayı okumaya devam edebilir
+        for kind in self._KINDS:
+            self._data_path(old_generation, kind).unlink(missing_ok=True)
+        logger.info(f"Namespace {self.directory.name} sıkıştırıldı: {reclaimed} ölü satır geri kazanıldı")
+        return reclaimed
+
+    def clear(self) -> None:
+        def write(conn: sqlite3.Connection, info: Dict[str, int]) -> int:
+            conn.execute("DELETE FROM vectors")
+            old_generation = info["generation"]
+            info.update(dim=0, capacity=0, next_row=0, generation=old_generation + 1, codes=0)
+            return old_generation
+
+        old_generation = self._write(write)
+        # Açık memmap'ler unlink edilmiş dosyayı okumaya devam edebilir
+        for kind in self._KINDS:
+            self._data_path(old_generation, kind).unlink(missing_ok=True)
+
+    def iter_records(self, batch_size: int) -> Iterator[List[VectorRecord]]:
+        # ID sırasıyla sayfalanır: satır numaraları compaction'da değişebilir
+        last_id = ""
+        while True:
+            snapshot = self.snapshot()
+            rows = self._read(snapshot, lambda conn: conn.execute(
+                "SELECT row, id, metadata FROM vectors WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size)
+            ).fetchall())
+            if rows is None:
+                continue
+            if not rows:
+                return
+            yield [
+                VectorRecord(vector_id, np.array(snapshot.matrix[row]), json.loads(metadata))
+                for row, vector_id, metadata in rows
+                if snapshot.matrix is not None and row < len(snapshot.alive)
+            ]
+            last_id = rows[-1][1]
+
+class LocalVectorStore(VectorStore):
+    """
+    Local backend: one directory per namespace under LOCAL_VECTOR_STORE_PATH.
+
+    Vectors are L2-normalized and kept in a float32 memory-mapped file, so
+    a query is an exact cosine top-k over the page cache with no network
+    round trip. The files can be shared by the API and worker processes
+    (same volume); readers pick up committed writes on their next query.
+
+    With `quantization` set to "int8" (4x smaller than float32) or "binary"
+    (32x smaller), the candidate scan reads only the compact codes; the
+    top `top_k * rescore_factor` candidates are then rescored exactly
+    against their float32 rows, so returned scores are true cosines.
+    """
+
+    def __init__(self, path: str = None, quantization: str = None, rescore_factor: int = None):
+        self.path = Path(path or settings.LOCAL_VECTOR_STORE_PATH)
+        self.quantization = (quantization or settings.LOCAL_VECTOR_QUANTIZATION).lower()
+        if self.quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Bilinmeyen quantization modu: {self.quantization}")
+        self.rescore_factor = max(1, rescore_factor or settings.LOCAL_VECTOR_RESCORE_FACTOR)
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._lock = threading.Lock()
+
+    def _namespace(self, namespace: str) -> _Namespace:
+        if not _NAMESPACE_PATTERN.match(namespace):
+            raise ValueError(f"Geçersiz namespace: {namespace}")
+        with self._lock:
+            if namespace not in self._namespaces:
+                self._namespaces[namespace] = _Namespace(self.path / namespace)
+            return self._namespaces[namespace]
+
+    def _existing_namespace(self, namespace: str) -> Optional[_Namespace]:
+        if not (self.path / namespace / "meta.sqlite3").exists():
+            return None
+        return self._namespace(namespace)
+
+    def upsert(self, namespace, ids, vectors, metadata) -> int:
+        if not ids:
+            return 0
+        return self._namespace(namespace).upsert(ids, vectors, metadata)
+
+    def query(self, namespace, vector, top_k) -> List[VectorMatch]:
+        store = self._existing_namespace(namespace)
+        if store is None:
+            return []
+        return store.query(vector, top_k, self.quantization, self.rescore_factor)
+
+    def fetch(self, namespace, ids) -> Dict[str, VectorRecord]:
+        store = self._existing_namespace(namespace)
+        return store.fetch(ids) if store and ids else {}
+
+    def delete(self, namespace, ids) -> None:
+        store = self._existing_namespace(namespace)
+        if store and ids:
+            store.delete(ids)
+
+    def delete_prefix(self, namespace, prefix, metadata_filter=None) -> None:
+        store = self._existing_namespace(namespace)
+        if store and prefix:
+            store.delete_prefix(prefix)
+
+    def delete_namespace(self, namespace) -> None:
+        store = self._existing_namespace(namespace)
+        if store:
+            store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        namespaces: Dict[str, int] = {}
+        dimension = 0
+        if self.path.exists():
+            for directory in sorted(self.path.iterdir()):
+                store = self._existing_namespace(directory.name)
+                if store is None:
+                    continue
+                snapshot = store.snapshot()
+                if snapshot.count:
+                    namespaces[directory.name] = snapshot.count
+                    dimension = dimension or snapshot.matrix.shape[1]
+        return {
+            "dimension": dimension,
+            "total_vector_count": sum(namespaces.values()),
+            "namespaces": namespaces
+        }
+
+    def iter_vectors(self, namespace, batch_size=100) -> Iterator[List[VectorRecord]]:
+        store = self._existing_namespace(namespace)
+        if store:
+            yield from store.iter_records(batch_size)
+
+    def compact(self, min_dead_fraction: float = None) -> Dict[str, int]:
+        if min_dead_fraction is None:
+            min_dead_fraction = settings.LOCAL_VECTOR_COMPACT_DEAD_FRACTION
+        reclaimed: Dict[str, int] = {}
+        if self.path.exists():
+            for directory in sorted(self.path.iterdir()):
+                store = self._existing_namespace(directory.name)
+                if store is None:
+                    continue
+                rows = store.compact(min_dead_fraction)
+                if rows:
+                    reclaimed[directory.name] = rows
+        return reclaimed
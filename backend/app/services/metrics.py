@@ -0,0 +1,41 @@
+from collections import deque
+from typing import Dict
+import threading
+
+class LatencyStats:
+    """
+    Count, mean and recent percentiles of a latency, per process.
+
+    Only the last `window` samples are kept for the percentiles, so a
+    long-running API process reports current behaviour in bounded memory.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._samples: "deque[float]" = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total = self.count, self.total
+
+        def percentile(p: float) -> float:
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+
+        return {
+            "count": count,
+            "avg_ms": round(total / count * 1000, 1) if count else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(samples[-1] * 1000, 1) if samples else 0.0
+        }
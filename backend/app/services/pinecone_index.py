@@ -0,0 +1,150 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+import random
+import threading
+import time
+import urllib3
+from pinecone import Pinecone
+from pinecone.core.openapi.shared.exceptions import PineconeApiException
+from pinecone.exceptions import PineconeProtocolError
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Pinecone delete isteği başına en fazla 1000 ID kabul eder
+DELETE_BATCH_SIZE = 1000
+
+def is_retryable(error: Exception) -> bool:
+    """429, 5xx ve bağlantı hataları tekrar denenir"""
+    if isinstance(error, PineconeApiException):
+        return error.status == 429 or (error.status or 0) >= 500
+    return isinstance(error, (urllib3.exceptions.HTTPError, PineconeProtocolError, ConnectionError, TimeoutError))
+
+class PineconeIndexPool:
+    """
+    Process-wide Pinecone index handle.
+
+    The client and index are created on first use (no control-plane call at
+    import time) and then reused, so every caller shares one urllib3
+    connection pool. Upserts are split into batches that are sent in
+    parallel with at most `max_concurrency` requests in flight; each
+    request is retried on transient failures with jittered backoff.
+    """
+
+    def __init__(
+        self,
+        api_key: str = None,
+        index_name: str = None,
+        host: str = None,
+        max_concurrency: int = None,
+        max_retries: int = None
+    ):
+        self.api_key = api_key or settings.PINECONE_API_KEY
+        self.index_name = index_name or settings.PINECONE_INDEX_NAME
+        self.host = settings.PINECONE_INDEX_HOST if host is None else host
+        self.max_concurrency = max_concurrency or settings.PINECONE_MAX_CONCURRENCY
+        self.max_retries = settings.PINECONE_MAX_RETRIES if max_retries is None else max_retries
+        self._index = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        with self._lock:
+            if self._index is None:
+                client = Pinecone(api_key=self.api_key, pool_threads=self.max_concurrency)
+                # Host biliniyorsa describe_index çağrısı atlanır
+                self._index = client.Index(name=self.index_name, host=self.host)
+            return self._index
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency,
+                    thread_name_prefix="pinecone"
+                )
+            return self._executor
+
+    def _backoff(self, attempt: int) -> float:
+        ceiling = min(
+            settings.PINECONE_RETRY_MAX_SECONDS,
+            settings.PINECONE_RETRY_BASE_SECONDS * (2 ** attempt)
+        )
+        return random.uniform(0, ceiling)
+
+    def _call(self, operation: str, *args, **kwargs) -> Any:
+        attempt = 0
+        while True:
+            try:
+                return getattr(self.index, operation)(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self._backoff(attempt)
+                attempt += 1
+                logger.warning(f"Pinecone {operation} hatası ({e.__class__.__name__}), {attempt}. deneme {delay:.1f}s sonra")
+                time.sleep(delay)
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str, batch_size: int = None) -> int:
+        """Vektörleri batch'ler halinde paralel yükle, yüklenen vektör sayısını döndür"""
+        batch_size = batch_size or settings.PINECONE_UPSERT_BATCH_SIZE
+        batches = [vectors[i:i + batch_size] for i in range(0, len(vectors), batch_size)]
+        if len(batches) <= 1:
+            for batch in batches:
+                self._call("upsert", vectors=batch, namespace=namespace, show_progress=False)
+            return len(vectors)
+
+        futures = [
+            self.executor.submit(self._call, "upsert", vectors=batch, namespace=namespace, show_progress=False)
+            for batch in batches
+        ]
+        # Hepsi bitsin, sonra ilk hatayı fırlat (yarım kalan istek bırakma)
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+        return len(vectors)
+
+    def query(self, **kwargs) -> Any:
+        return self._call("query", **kwargs)
+
+    def fetch(self, ids: List[str], namespace: str) -> Any:
+        return self._call("fetch", ids=ids, namespace=namespace)
+
+    def delete(self, ids: List[str], namespace: str) -> None:
+        for start in range(0, len(ids), DELETE_BATCH_SIZE):
+            self._call("delete", ids=ids[start:start + DELETE_BATCH_SIZE], namespace=namespace)
+
+    def delete_by_filter(self, metadata_filter: Dict[str, Any], namespace: str) -> None:
+        """Metadata filtresiyle sil (sadece pod tabanlı index'ler)"""
+        self._call("delete", filter=metadata_filter, namespace=namespace)
+
+    def delete_all(self, namespace: str) -> None:
+        self._call("delete", delete_all=True, namespace=namespace)
+
+    def describe_index_stats(self) -> Any:
+        return self._call("describe_index_stats")
+
+    def list_ids(self, namespace: str, prefix: str = None, limit: int = 100) -> Iterator[List[str]]:
+        """Namespace'teki ID'leri sayfa sayfa üret (sadece serverless index'lerde)"""
+        token = None
+        while True:
+            page = self._call(
+                "list_paginated",
+                namespace=namespace,
+                prefix=prefix,
+                limit=limit,
+                pagination_token=token
+            )
+            ids = [vector.id for vector in page.vectors or []]
+            if ids:
+                yield ids
+            token = page.pagination.next if page.pagination else None
+            if not token:
+                return
+
+# Singleton (processor, chat service ve route'lar paylaşır)
+pinecone_index = PineconeIndexPool()
@@ -0,0 +1,144 @@
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+import threading
+import time
+import unicodedata
+import numpy as np
+from app.config import settings
+from app.services.embedding_cache import EmbeddingCache, embedding_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Disk tier'da döküman chunk'larıyla karışmasın diye model anahtarının önüne eklenir
+_DISK_PREFIX = "query:"
+
+def normalize_question(question: str) -> str:
+    """Aynı soru farklı boşluk / büyük-küçük harfle de aynı anahtarı versin"""
+    return " ".join(unicodedata.normalize("NFKC", question).split()).casefold()
+
+class _Entry(NamedTuple):
+    vector: np.ndarray
+    expires_at: float
+
+class QueryEmbeddingCache:
+    """
+    In-process LRU cache of question embeddings, with an optional shared disk tier.
+
+    Keys are (embedding space, normalized question), so rooms on different
+    models or dimensions never share a vector. Entries are float32, expire
+    after `ttl_seconds` and are evicted least-recently-used once the total
+    size exceeds `max_bytes`. Misses fall through to `disk` (the SQLite
+    embedding cache shared by all processes) before the caller calls the
+    API; `lookup` never touches the disk and is safe on the event loop.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = None,
+        ttl_seconds: float = None,
+        disk: Optional[EmbeddingCache] = None,
+        clock=time.monotonic
+    ):
+        self.max_bytes = settings.QUERY_EMBEDDING_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.ttl_seconds = settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.disk = disk
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, space: str, question: str) -> Optional[np.ndarray]:
+        """Bellekteki geçerli embedding'i döndür (bloklamaz)"""
+        key = (space, normalize_question(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= self._clock():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                if self.disk is None:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.vector
+
+    def load(self, space: str, question: str) -> Optional[np.ndarray]:
+        """Disk tier'dan oku ve belleğe al (bloklar, lookup'tan sonra çağrılır)"""
+        if self.disk is None:
+            return None
+        text = normalize_question(question)
+        try:
+            [vector] = self.disk.get_many(_DISK_PREFIX + space, [text])
+        except Exception as e:
+            # Cache hatası chat'i düşürmesin, API'ye gidilir
+            logger.warning(f"Query embedding disk cache okunamadı: {e}")
+            vector = None
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._remember(space, text, vector)
+        return vector
+
+    def put(self, space: str, question: str, vector: np.ndarray) -> None:
+        """Belleğe yaz (bloklamaz)"""
+        self._remember(space, normalize_question(question), np.asarray(vector, dtype=np.float32))
+
+    def persist(self, space: str, question: str, vector: np.ndarray) -> None:
+        """Disk tier'a yaz, diğer process'ler de görsün (bloklar)"""
+        if self.disk is None:
+            return
+        try:
+            self.disk.put_many(_DISK_PREFIX + space, [normalize_question(question)], [vector])
+        except Exception as e:
+            logger.warning(f"Query embedding disk cache yazılamadı: {e}")
+
+    def _remember(self, space: str, text: str, vector: np.ndarray) -> None:
+        if self.max_bytes <= 0 or self.ttl_seconds <= 0 or vector.nbytes > self.max_bytes:
+            return
+        vector = vector.copy()
+        vector.setflags(write=False)
+        key = (space, text)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(vector, self._clock() + self.ttl_seconds)
+            self._bytes += vector.nbytes
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.vector.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+            }
+
+# Singleton
+query_embedding_cache = QueryEmbeddingCache(
+    disk=embedding_cache if settings.EMBEDDING_CACHE_ENABLED and settings.QUERY_EMBEDDING_CACHE_DISK else None
+)
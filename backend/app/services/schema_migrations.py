@@ -0,0 +1,71 @@
+"""
+Idempotent schema upgrade for databases created before the ingestion
+queue, chunk store, soft delete, sharding and embedding migration work.
+
+`Base.metadata.create_all` creates missing tables but never alters an
+existing one, so the columns added to `documents` and `rooms` are added
+here with `ADD COLUMN IF NOT EXISTS` and backfilled for the rows that
+predate them. Safe to run on every start, from any number of processes.
+"""
+from typing import Dict, List
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from app.config import settings
+from app.database import Base
+from app.services.vector_store import vector_shards
+import app.models  # noqa: F401  (tabloların metadata'ya kaydı)
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Aynı anda başlayan API/worker process'leri upgrade'i sırayla yapar
+_UPGRADE_LOCK_ID = 0x5C4E3A01
+
+# Mevcut tablolara sonradan eklenen kolonlar (tip ve index modelden alınır)
+ADDED_COLUMNS: Dict[str, List[str]] = {
+    "documents": ["content_hash", "status", "chunks_done", "chunks_total", "deleted_at"],
+    "rooms": ["vector_shard", "embedding_model", "embedding_dimensions", "deleted_at"],
+}
+
+def _add_columns(connection) -> None:
+    for table_name, column_names in ADDED_COLUMNS.items():
+        table = Base.metadata.tables[table_name]
+        for name in column_names:
+            column = table.columns[name]
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {name} {column_type}"))
+            if column.index:
+                connection.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table_name}_{name} ON {table_name} ({name})"))
+
+def _backfill(connection) -> None:
+    # status'u olmayan dökümanlar eski akıştan: processed olanlar aranabilir durumda,
+    # olmayanların kuyrukta işi yok (yeniden yüklenmeli)
+    documents = connection.execute(text(
+        "UPDATE documents SET "
+        "status = CASE WHEN processed THEN 'completed' ELSE 'failed' END, "
+        "chunks_done = CASE WHEN processed THEN COALESCE(chunk_count, 0) ELSE 0 END, "
+        "chunks_total = CASE WHEN processed THEN COALESCE(chunk_count, 0) END "
+        "WHERE status IS NULL"
+    )).rowcount
+
+    # Eski odalar varsayılan shard'da; vektörleri 'dimensions' gönderilmeden
+    # (modelin kendi boyutu) OPENAI_EMBEDDING_MODEL ile oluşturuldu
+    shards = connection.execute(
+        text("UPDATE rooms SET vector_shard = :shard WHERE vector_shard IS NULL"),
+        {"shard": vector_shards.default}
+    ).rowcount
+    models = connection.execute(
+        text("UPDATE rooms SET embedding_model = :model, embedding_dimensions = 0 WHERE embedding_model IS NULL"),
+        {"model": settings.OPENAI_EMBEDDING_MODEL}
+    ).rowcount
+
+    if documents or shards or models:
+        logger.info(f"Schema backfill: {documents} döküman, {shards} oda shard'ı, {models} oda embedding modeli")
+
+def upgrade_schema(engine: Engine) -> None:
+    """Eksik tabloları oluştur, eksik kolonları ekle ve eski satırları doldur"""
+    with engine.begin() as connection:
+        connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _UPGRADE_LOCK_ID})
+        Base.metadata.create_all(bind=connection)
+        _add_columns(connection)
+        _backfill(connection)
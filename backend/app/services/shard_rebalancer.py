@@ -0,0 +1,118 @@
+"""
+Moving room namespaces between vector index shards.
+
+After a shard is added to (or removed from) VECTOR_INDEX_SHARDS, the
+consistent-hash owner of some namespaces changes. `plan_rebalance` lists
+those rooms and `move_room` copies a namespace to its new shard, switches
+`Room.vector_shard` and deletes the old copy.
+"""
+from typing import List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from app.models import Document, EmbeddingMigration, Room
+from app.services.embedding_migration import ACTIVE_STATUSES
+from app.services.vector_cache import vector_cache
+from app.services.vector_store import ShardMap, VectorStore, vector_shards
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _has_active_migration(db: Session, room_id: int) -> bool:
+    return db.query(EmbeddingMigration.id).filter(
+        EmbeddingMigration.room_id == room_id,
+        EmbeddingMigration.status.in_(ACTIVE_STATUSES)
+    ).first() is not None
+
+def plan_rebalance(db: Session, shard_map: ShardMap = None) -> List[Tuple[Room, str]]:
+    """Ring'e göre başka bir shard'a ait olan odalar: (oda, hedef shard)"""
+    shard_map = shard_map or vector_shards
+    moves = []
+    for room in db.query(Room).filter(Room.deleted_at.is_(None)).order_by(Room.id):
+        target = shard_map.assign(room.pinecone_namespace)
+        if shard_map.resolve(room.vector_shard) == target:
+            continue
+        if _has_active_migration(db, room.id):
+            # Migration'ın ikinci namespace'i de bu shard'da, önce o bitmeli
+            logger.info(f"Room {room.id} embedding migration bitene kadar taşınmayacak")
+            continue
+        moves.append((room, target))
+    return moves
+
+def copy_namespace(source: VectorStore, target: VectorStore, namespace: str, batch_size: int = 100) -> int:
+    """Namespace'i ID, vektör ve metadata ile başka bir store'a kopyala"""
+    copied = 0
+    for batch in source.iter_vectors(namespace, batch_size=batch_size):
+        if not batch:
+            continue
+        target.upsert(
+            namespace,
+            [record.id for record in batch],
+            np.stack([record.values for record in batch]),
+            [record.metadata for record in batch]
+        )
+        copied += len(batch)
+    return copied
+
+def move_room(db: Session, room: Room, target_shard: str, shard_map: ShardMap = None) -> bool:
+    """
+    Odanın namespace'ini target_shard'a taşı. Kopyalama oda satırı
+    kilitliyken yapılır: worker ve GC odayı FOR SHARE ile okuduğu için
+    taşıma sırasında yeni yazma / silme başlamaz (chat okumaları
+    etkilenmez, eski shard'dan devam eder). İşlenmekte olan döküman varsa
+    taşınmaz (False), daha sonra tekrar denenir.
+    """
+    shard_map = shard_map or vector_shards
+    room = db.query(Room).filter(Room.id == room.id).with_for_update().one()
+    source_name = shard_map.resolve(room.vector_shard)
+    target_name = shard_map.resolve(target_shard)
+    if source_name == target_name:
+        db.rollback()
+        return True
+    if _has_active_migration(db, room.id):
+        db.rollback()
+        raise ValueError(f"Room {room.id} için embedding migration sürüyor")
+
+    processing = db.query(Document.id).filter(
+        Document.room_id == room.id,
+        Document.status == "processing"
+    ).first()
+    if processing is not None:
+        db.rollback()
+        return False
+
+    source = shard_map.store(source_name)
+    target = shard_map.store(target_name)
+    namespace = room.pinecone_namespace
+    try:
+        # Yarıda kalmış önceki bir denemenin kopyası temizlenir
+        target.delete_namespace(namespace)
+        copied = copy_namespace(source, target, namespace)
+    except Exception:
+        db.rollback()
+        raise
+
+    room.vector_shard = target_name
+    db.commit()
+    vector_cache.invalidate(namespace)
+
+    try:
+        source.delete_namespace(namespace)
+    except Exception as e:
+        # Oda yeni shard'da; eski kopya reconcile'da sahipsiz namespace olarak görünür
+        logger.error(f"Room {room.id}: {source_name} shard'ındaki eski kopya silinemedi: {e}")
+
+    logger.info(f"Room {room.id} ({namespace}) {source_name} -> {target_name} taşındı ({copied} vektör)")
+    return True
+
+def rebalance(db: Session, shard_map: ShardMap = None, room_ids: Optional[List[int]] = None) -> Tuple[int, int]:
+    """Planı uygula: (taşınan, ertelenen) oda sayısı"""
+    moved = deferred = 0
+    for room, target in plan_rebalance(db, shard_map):
+        if room_ids and room.id not in room_ids:
+            continue
+        if move_room(db, room, target, shard_map):
+            moved += 1
+        else:
+            deferred += 1
+            logger.info(f"Room {room.id} işlenmekte olan döküman yüzünden ertelendi")
+    return moved, deferred
@@ -0,0 +1,75 @@
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+import gzip
+import json
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Çıkarma mantığı değişirse artırılır, eski sidecar'lar geçersiz sayılır
+SIDECAR_VERSION = 1
+SIDECAR_SUFFIX = ".text.gz"
+READ_BLOCK_SIZE = 64 * 1024
+
+def sidecar_path(file_path: str) -> Path:
+    return Path(f"{file_path}{SIDECAR_SUFFIX}")
+
+def _source_fingerprint(file_path: str) -> dict:
+    stat = os.stat(file_path)
+    return {
+        "version": SIDECAR_VERSION,
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns
+    }
+
+def _read_header(path: Path) -> Optional[dict]:
+    try:
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as sidecar:
+            return json.loads(sidecar.readline())
+    except (OSError, EOFError, ValueError):
+        return None
+
+def is_fresh(file_path: str) -> bool:
+    """Sidecar var ve kaynak dosya o zamandan beri değişmemiş mi"""
+    path = sidecar_path(file_path)
+    if not path.exists():
+        return False
+    return _read_header(path) == _source_fingerprint(file_path)
+
+def read_sidecar(file_path: str) -> Iterator[str]:
+    """Kaydedilmiş text'i blok blok üret"""
+    with gzip.open(sidecar_path(file_path), "rt", encoding="utf-8", newline="") as sidecar:
+        sidecar.readline()  # header
+        while block := sidecar.read(READ_BLOCK_SIZE):
+            yield block
+
+def write_through(file_path: str, pieces: Iterable[str]) -> Iterator[str]:
+    """
+    Text parçalarını üretirken sıkıştırılmış sidecar'a da yaz.
+    Dosya geçici isimle yazılır, sadece tüm parçalar tüketilince yerine taşınır.
+    """
+    path = sidecar_path(file_path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    fingerprint = _source_fingerprint(file_path)
+    completed = False
+
+    try:
+        with gzip.open(tmp_path, "wt", encoding="utf-8", newline="", compresslevel=5) as sidecar:
+            sidecar.write(json.dumps(fingerprint) + "\n")
+            for piece in pieces:
+                sidecar.write(piece)
+                yield piece
+        completed = True
+    finally:
+        if completed:
+            os.replace(tmp_path, path)
+        else:
+            tmp_path.unlink(missing_ok=True)
+
+def remove_sidecar(file_path: str) -> None:
+    path = sidecar_path(file_path)
+    try:
+        path.unlink(missing_ok=True)
+    except OSError as e:
+        logger.error(f"Sidecar silinemedi ({path}): {e}")
@@ -0,0 +1,222 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional
+import json
+import threading
+import time
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Document
+from app.services.vector_store import VectorMatch, VectorStore, vector_store
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Namespace yüklenirken vektörler bu boyutta batch'lerle çekilir
+_LOAD_BATCH_SIZE = 100
+
+class RoomVectorVersion(NamedTuple):
+    count: int
+    chunks_done: int
+    updated_at: Optional[datetime]  # odadaki son döküman değişikliği
+
+def room_vector_version(db: Session, room_id: int) -> RoomVectorVersion:
+    """
+    Odanın vektör içeriğinin ucuz bir parmak izi.
+    Worker ayrı process'te çalıştığı için cache invalidation buna dayanır:
+    her yüklenen batch chunks_done'ı, silme döküman sayısını değiştirir.
+    """
+    count, chunks_done, updated_at = db.query(
+        func.count(Document.id),
+        func.coalesce(func.sum(Document.chunks_done), 0),
+        func.max(Document.updated_at)
+    ).filter(Document.room_id == room_id, Document.deleted_at.is_(None)).one()
+    return RoomVectorVersion(count, int(chunks_done), updated_at)
+
+def unsettled_until(version: Hashable, store: VectorStore) -> Optional[float]:
+    """
+    Store eventual consistent ise (Pinecone) son yazmadan sonraki pencere
+    bitmeden okunan sonuç eksik olabilir. Pencere sürüyorsa bitiş anı
+    (epoch saniye), yoksa None.
+    """
+    updated_at = getattr(version, "updated_at", None)
+    if store.consistency_window <= 0 or updated_at is None:
+        return None
+    settles_at = updated_at.timestamp() + store.consistency_window
+    return settles_at if settles_at > time.time() else None
+
+class _Entry(NamedTuple):
+    version: Hashable
+    ids: List[str]
+    matrix: np.ndarray  # (n, dim) float32, satırlar birim uzunlukta
+    metadata: List[Dict[str, Any]]
+    nbytes: int
+    expires_at: Optional[float]  # tutarlılık penceresinde yüklendiyse pencere sonu (epoch)
+
+    def query(self, vector: np.ndarray, top_k: int) -> List[VectorMatch]:
+        if not self.ids:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        scores = self.matrix @ query
+        k = min(top_k, len(self.ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [VectorMatch(self.ids[i], float(scores[i]), self.metadata[i]) for i in top.tolist()]
+
+class NamespaceVectorCache:
+    """
+    Read-through, in-process cache of whole namespaces.
+
+    A room is small (a few hundred chunks), so its vectors fit in one
+    float32 matrix and top-k is a single dot product instead of a remote
+    query. Entries are tagged with a caller-supplied version (see
+    `room_vector_version`) and reloaded when it changes; they are evicted
+    least-recently-used once the total size exceeds `max_bytes`. With an
+    eventually consistent store, a snapshot loaded within the store's
+    `consistency_window` of the room's last change may miss the latest
+    writes, so it is only used until that window has passed.
+    Namespaces that do not fit, or cannot be listed, fall back to the
+    vector store. Namespace names are unique across shards, so callers
+    pass the room's shard store with each miss and entries are keyed by
+    namespace alone.
+    """
+
+    def __init__(self, store: VectorStore = None, max_bytes: int = None):
+        self.store = store or vector_store
+        self.max_bytes = settings.VECTOR_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        # Bu versiyonda cache'lenemeyen namespace'ler (çok büyük / listelenemiyor)
+        self._uncacheable: Dict[str, Hashable] = {}
+        # invalidate() yükleme sürerken çağrılırsa yüklenen sonuç atılır
+        self._generations: Dict[str, int] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, namespace: str, version: Hashable) -> Optional[_Entry]:
+        """Güncel entry varsa döndür (bloklamaz, event loop'tan çağrılabilir)"""
+        with self._lock:
+            entry = self._entries.get(namespace)
+            if entry is None or entry.version != version:
+                return None
+            if entry.expires_at is not None and time.time() >= entry.expires_at:
+                # Tutarlılık penceresinde yüklenmişti: pencere bitti, yeniden yüklenir
+                return None
+            self._entries.move_to_end(namespace)
+            self.hits += 1
+            return entry
+
+    def load(self, namespace: str, version: Hashable, store: VectorStore = None) -> Optional[_Entry]:
+        """Namespace'i vector store'dan yükle (bloklar); sığmıyorsa None"""
+        if self.max_bytes <= 0:
+            return None
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(namespace, threading.Lock())
+
+        # Aynı namespace'i aynı anda tek istek yüklesin
+        with load_lock:
+            entry = self.lookup(namespace, version)
+            if entry is not None:
+                return entry
+            with self._lock:
+                if self._uncacheable.get(namespace) == version:
+                    return None
+                generation = self._generations.get(namespace, 0)
+                self.misses += 1
+
+            store = store or self.store
+            # Okumadan önce: pencere okuma sırasında biterse yine kısa ömürlü sayılır
+            expires_at = unsettled_until(version, store)
+            entry = self._read(namespace, version, store, expires_at)
+
+            with self._lock:
+                if self._generations.get(namespace, 0) != generation:
+                    # Yükleme sırasında silme oldu: silinmiş vektörler dönmesin
+                    return None
+                if entry is None:
+                    self._uncacheable[namespace] = version
+                    return None
+                self._store(namespace, entry)
+            return entry
+
+    def _read(self, namespace: str, version: Hashable, store: VectorStore, expires_at: Optional[float] = None) -> Optional[_Entry]:
+        ids: List[str] = []
+        rows: List[np.ndarray] = []
+        metadata: List[Dict[str, Any]] = []
+        nbytes = 0
+        try:
+            for batch in store.iter_vectors(namespace, batch_size=_LOAD_BATCH_SIZE):
+                for record in batch:
+                    ids.append(record.id)
+                    rows.append(record.values)
+                    metadata.append(record.metadata)
+                    nbytes += record.values.nbytes + len(json.dumps(record.metadata))
+                if nbytes > self.max_bytes:
+                    logger.info(f"Namespace {namespace} cache bütçesine sığmıyor, vector store kullanılacak")
+                    return None
+        except Exception as e:
+            logger.warning(f"Namespace {namespace} cache'e yüklenemedi: {e}")
+            return None
+
+        matrix = np.stack(rows) if rows else np.empty((0, 0), dtype=np.float32)
+        if len(matrix):
+            matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        return _Entry(version, ids, matrix, metadata, nbytes, expires_at)
+
+    def _store(self, namespace: str, entry: _Entry) -> None:
+        old = self._entries.pop(namespace, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._entries[namespace] = entry
+        self._bytes += entry.nbytes
+        self._uncacheable.pop(namespace, None)
+        # LRU: bütçe aşılırsa en eski namespace'ler çıkarılır
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+    def query(
+        self,
+        namespace: str,
+        vector: np.ndarray,
+        top_k: int,
+        version: Hashable = None,
+        store: VectorStore = None
+    ) -> List[VectorMatch]:
+        """Cache'ten (gerekirse yükleyerek) veya vector store'dan top-k"""
+        if version is not None:
+            entry = self.lookup(namespace, version) or self.load(namespace, version, store)
+            if entry is not None:
+                return entry.query(vector, top_k)
+        return (store or self.store).query(namespace, vector, top_k)
+
+    def prewarm(self, namespace: str, version: Hashable, store: VectorStore = None) -> None:
+        if self.lookup(namespace, version) is None:
+            self.load(namespace, version, store)
+
+    def invalidate(self, namespace: str) -> None:
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            self._uncacheable.pop(namespace, None)
+            entry = self._entries.pop(namespace, None)
+            if entry is not None:
+                self._bytes -= entry.nbytes
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "namespaces": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+# Singleton (API process'i içinde paylaşılır)
+vector_cache = NamespaceVectorCache()
@@ -0,0 +1,261 @@
+from abc import ABC, abstractmethod
+from bisect import bisect
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+import hashlib
+import numpy as np
+from pinecone.core.openapi.shared.exceptions import PineconeApiException
+from pinecone.exceptions import NotFoundException
+from app.config import settings
+from app.services.pinecone_index import DELETE_BATCH_SIZE, pinecone_index, PineconeIndexPool
+import logging
+
+logger = logging.getLogger(__name__)
+
+def vector_id(document_id: int, chunk_index: int) -> str:
+    """Vektör ID'si (document_id, chunk_index)'ten türetilir, ayrıca saklanmaz"""
+    return f"doc_{document_id}_chunk_{chunk_index}"
+
+def document_vector_prefix(document_id: int) -> str:
+    # Sondaki "_chunk_" sayesinde doc_1 öneki doc_11'i kapsamaz
+    return f"doc_{document_id}_chunk_"
+
+class VectorMatch(NamedTuple):
+    id: str
+    score: float
+    metadata: Dict[str, Any]
+
+class VectorRecord(NamedTuple):
+    id: str
+    values: np.ndarray  # float32
+    metadata: Dict[str, Any]
+
+class VectorStore(ABC):
+    """
+    Namespace'li vektör deposu arayüzü.
+    Vektörler float32 array olarak girer/çıkar; backend kendi formatına çevirir.
+    """
+
+    # Yazmadan sonra okumaların eksik kalabileceği süre (saniye); 0 = hemen tutarlı
+    consistency_window: float = 0.0
+
+    @abstractmethod
+    def upsert(
+        self,
+        namespace: str,
+        ids: List[str],
+        vectors: np.ndarray,
+        metadata: List[Dict[str, Any]]
+    ) -> int:
+        """Vektörleri ekle/güncelle, yazılan vektör sayısını döndür"""
+
+    @abstractmethod
+    def query(self, namespace: str, vector: np.ndarray, top_k: int) -> List[VectorMatch]:
+        """En benzer top_k vektör (cosine), skora göre azalan"""
+
+    @abstractmethod
+    def fetch(self, namespace: str, ids: List[str]) -> Dict[str, VectorRecord]:
+        """Bulunan ID'ler -> kayıt (bulunamayanlar sonuçta yer almaz)"""
+
+    @abstractmethod
+    def delete(self, namespace: str, ids: List[str]) -> None:
+        pass
+
+    @abstractmethod
+    def delete_prefix(self, namespace: str, prefix: str, metadata_filter: Optional[Dict[str, Any]] = None) -> None:
+        """
+        ID'si prefix ile başlayan tüm vektörleri sil. Prefix listelemesini
+        desteklemeyen backend'ler metadata_filter ile silebilir.
+        """
+
+    @abstractmethod
+    def delete_namespace(self, namespace: str) -> None:
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """{"dimension", "total_vector_count", "namespaces": {namespace: vector_count}}"""
+
+    @abstractmethod
+    def iter_vectors(self, namespace: str, batch_size: int = 100) -> Iterator[List[VectorRecord]]:
+        """Namespace'teki tüm vektörleri batch batch üret"""
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Silinmiş vektörlerin yerini geri kazan, namespace -> geri kazanılan
+        satır döndür. Pinecone depolamayı kendisi yönetir (no-op).
+        """
+        return {}
+
+class PineconeVectorStore(VectorStore):
+    """Pinecone backend (paylaşılan, havuzlu index handle üzerinden)"""
+
+    def __init__(self, index: PineconeIndexPool = None):
+        self.index = index or pinecone_index
+        # Serverless index'te upsert'ler sorgulara birkaç saniye gecikmeyle yansır
+        self.consistency_window = settings.PINECONE_CONSISTENCY_SECONDS
+
+    def upsert(self, namespace, ids, vectors, metadata) -> int:
+        # float32 -> JSON listesi sadece gönderirken
+        payload = [
+            {"id": vector_id, "values": values.tolist(), "metadata": meta}
+            for vector_id, values, meta in zip(ids, vectors, metadata)
+        ]
+        return self.index.upsert(payload, namespace=namespace)
+
+    def query(self, namespace, vector, top_k) -> List[VectorMatch]:
+        results = self.index.query(
+            namespace=namespace,
+            vector=np.asarray(vector, dtype=np.float32).tolist(),
+            top_k=top_k,
+            include_metadata=True
+        )
+        return [
+            VectorMatch(match['id'], match['score'], match.get('metadata') or {})
+            for match in results['matches']
+        ]
+
+    def fetch(self, namespace, ids) -> Dict[str, VectorRecord]:
+        fetched = self.index.fetch(ids=ids, namespace=namespace).vectors
+        return {
+            vector_id: VectorRecord(vector_id, np.asarray(vector.values, dtype=np.float32), vector.metadata or {})
+            for vector_id, vector in fetched.items()
+        }
+
+    def delete(self, namespace, ids) -> None:
+        self.index.delete(ids=ids, namespace=namespace)
+
+    def delete_prefix(self, namespace, prefix, metadata_filter=None) -> None:
+        try:
+            # list_ids sayfaları 100'lük, delete istekleri 1000'lik gönderilir
+            batch: List[str] = []
+            for ids in self.index.list_ids(namespace, prefix=prefix):
+                batch.extend(ids)
+                if len(batch) >= DELETE_BATCH_SIZE:
+                    self.index.delete(ids=batch, namespace=namespace)
+                    batch = []
+            if batch:
+                self.index.delete(ids=batch, namespace=namespace)
+        except PineconeApiException as e:
+            # Pod tabanlı index'ler ID listelemeyi desteklemez, metadata filtresiyle silinir
+            if metadata_filter is None or not 400 <= (e.status or 0) < 500:
+                raise
+            logger.info(f"Prefix listeleme desteklenmiyor ({e.status}), metadata filtresiyle siliniyor")
+            self.index.delete_by_filter(metadata_filter, namespace=namespace)
+
+    def delete_namespace(self, namespace) -> None:
+        try:
+            self.index.delete_all(namespace)
+        except NotFoundException:
+            # Hiç vektör yazılmamış namespace
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.index.describe_index_stats()
+        return {
+            "dimension": stats.dimension,
+            "total_vector_count": stats.total_vector_count,
+            "namespaces": {
+                namespace: summary.vector_count
+                for namespace, summary in (stats.namespaces or {}).items()
+            }
+        }
+
+    def iter_vectors(self, namespace, batch_size=100) -> Iterator[List[VectorRecord]]:
+        for ids in self.index.list_ids(namespace, limit=batch_size):
+            records = self.fetch(namespace, ids)
+            yield [records[i] for i in ids if i in records]
+
+def create_vector_store(backend: str = None) -> VectorStore:
+    """Settings.VECTOR_STORE_BACKEND'e göre backend seç"""
+    backend = (backend or settings.VECTOR_STORE_BACKEND).lower()
+    if backend == "pinecone":
+        return PineconeVectorStore()
+    if backend == "local":
+        from app.services.local_vector_store import LocalVectorStore
+        return LocalVectorStore()
+    raise ValueError(f"Bilinmeyen vector store backend: {backend}")
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+class ShardMap:
+    """
+    Named vector store shards plus a consistent-hash ring over the shards
+    that take new rooms.
+
+    A room's shard is chosen once, when the room is created, and stored on
+    `Room.vector_shard` (NULL = the default shard, where rooms created
+    before sharding live); every read and write goes to that shard. Adding
+    or removing a shard from the ring only changes the hash owner of about
+    1/n of the namespaces, which the rebalancer (app.rebalance_shards)
+    moves.
+    """
+
+    def __init__(self, shards: Dict[str, VectorStore], default: str, ring: List[str] = None, virtual_nodes: int = 64):
+        if default not in shards:
+            raise ValueError(f"Varsayılan shard tanımlı değil: {default}")
+        self.shards = shards
+        self.default = default
+        self.ring_shards = list(ring or [default])
+        unknown = set(self.ring_shards) - set(shards)
+        if unknown:
+            raise ValueError(f"Tanımsız shard: {', '.join(sorted(unknown))}")
+        points = sorted(
+            (_ring_hash(f"{name}#{i}"), name)
+            for name in self.ring_shards
+            for i in range(virtual_nodes)
+        )
+        self._points = [point for point, _ in points]
+        self._owners = [name for _, name in points]
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.shards)
+
+    def assign(self, namespace: str) -> str:
+        """Namespace'in ring üzerindeki sahibi (yeni oda / rebalance hedefi)"""
+        index = bisect(self._points, _ring_hash(namespace)) % len(self._points)
+        return self._owners[index]
+
+    def resolve(self, shard: Optional[str]) -> str:
+        name = shard or self.default
+        if name not in self.shards:
+            raise ValueError(f"Tanımsız shard: {name}")
+        return name
+
+    def store(self, shard: Optional[str] = None) -> VectorStore:
+        return self.shards[self.resolve(shard)]
+
+def create_shard_map(backend: str = None) -> ShardMap:
+    """
+    VECTOR_INDEX_SHARDS'tan shard'ları kur. Pinecone'da her shard bir index
+    ("isim" ya da "isim=host"), local backend'de LOCAL_VECTOR_STORE_PATH/shards
+    altında bir klasör. Varsayılan shard (mevcut index / klasör) her zaman tanımlı.
+    """
+    backend = (backend or settings.VECTOR_STORE_BACKEND).lower()
+    entries = [entry.strip() for entry in settings.VECTOR_INDEX_SHARDS.split(",") if entry.strip()]
+    default = (settings.PINECONE_INDEX_NAME or "default") if backend == "pinecone" else "default"
+
+    shards: Dict[str, VectorStore] = {default: create_vector_store(backend)}
+    ring: List[str] = []
+    for entry in entries:
+        name, _, host = entry.partition("=")
+        ring.append(name)
+        if name in shards:
+            continue
+        if backend == "pinecone":
+            # host boş: index host'u control plane'den bulunur
+            shards[name] = PineconeVectorStore(PineconeIndexPool(index_name=name, host=host))
+        else:
+            from app.services.local_vector_store import LocalVectorStore
+            shards[name] = LocalVectorStore(path=str(Path(settings.LOCAL_VECTOR_STORE_PATH) / "shards" / name))
+    return ShardMap(shards, default, ring or None)
+
+def room_vector_store(room) -> VectorStore:
+    """Odanın shard'ındaki vector store"""
+    return vector_shards.store(room.vector_shard)
+
+# Singleton'lar: vector_store varsayılan shard (sharding kapalıyken tek index)
+vector_shards = create_shard_map()
+vector_store = vector_shards.store()
@@ -10,7 +10,8 @@ from app.utils.validators import (
     validate_upload_file,
     sanitize_filename
 )
-from app.utils.dependencies import get_current_user_id
+from app.utils.dependencies import get_current_user_id, require_metrics_token
+from app.utils.uploads import save_upload_file, UploadSizeLimitMiddleware
 
 __all__ = [
     # Password
@@ -27,4 +28,8 @@ __all__ = [
     "sanitize_filename",
     # Dependencies
     "get_current_user_id",
+    "require_metrics_token",
+    # Uploads
+    "save_upload_file",
+    "UploadSizeLimitMiddleware",
 ]
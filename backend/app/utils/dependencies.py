@@ -1,5 +1,8 @@
-from fastapi import Depends, HTTPException, status
+import secrets
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.config import settings
 from app.utils.auth import verify_token
 
 # Bearer token scheme
@@ -30,3 +33,17 @@ def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(secu
         )
     
     return int(user_id)
+
+def require_metrics_token(x_metrics_token: Optional[str] = Header(default=None)) -> None:
+    """
+    /metrics için operasyon token'ı (METRICS_TOKEN) kontrolü.
+    Token ayarlanmamışsa endpoint yokmuş gibi davranır.
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    
+    if not x_metrics_token or not secrets.compare_digest(x_metrics_token, settings.METRICS_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Geçersiz metrics token'ı"
+        )
@@ -0,0 +1,99 @@
+from pathlib import Path
+from typing import BinaryIO, Tuple
+import hashlib
+from fastapi import UploadFile, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+# Multipart boundary ve form header'ları için pay
+MULTIPART_OVERHEAD = 64 * 1024
+
+def _too_large_detail(max_size: int) -> str:
+    return f"Dosya çok büyük. Maksimum: {max_size / (1024*1024):.1f} MB"
+
+class FileTooLarge(Exception):
+    pass
+
+def _copy_with_limit(source: BinaryIO, destination: Path, max_size: int) -> Tuple[int, str]:
+    """Kopyala, byte say, hash'le - tek geçişte. Limit aşılınca hemen dur."""
+    hasher = hashlib.sha256()
+    size = 0
+
+    try:
+        with destination.open("wb") as buffer:
+            while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise FileTooLarge()
+                hasher.update(chunk)
+                buffer.write(chunk)
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+
+    return size, hasher.hexdigest()
+
+async def save_upload_file(file: UploadFile, destination: Path, max_size: int = None) -> Tuple[int, str]:
+    """
+    Upload'ı diske yaz ve (boyut, sha256) döndür.
+    Disk I/O ve hash threadpool'da çalışır, event loop bloklanmaz.
+    """
+    if max_size is None:
+        max_size = settings.MAX_FILE_SIZE
+
+    try:
+        return await run_in_threadpool(_copy_with_limit, file.file, destination, max_size)
+    except FileTooLarge:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=_too_large_detail(max_size)
+        )
+
+class UploadSizeLimitMiddleware:
+    """
+    Upload isteklerinin gövdesini gelirken sayar.
+    Content-Length limitten büyükse gövde hiç okunmadan, chunked
+    isteklerde ise limit aşıldığı anda 413 döner.
+    """
+
+    def __init__(self, app: ASGIApp, path_prefix: str, max_body_size: int = None):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.max_body_size = max_body_size or settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_body_size:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=_too_large_detail(settings.MAX_FILE_SIZE)
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={"detail": _too_large_detail(settings.MAX_FILE_SIZE)}
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,193 @@
+"""
+Ingestion worker entry point.
+
+    python -m app.worker [--processes N]
+
+Jobs are claimed from the `ingestion_jobs` table with
+SELECT ... FOR UPDATE SKIP LOCKED, so any number of worker processes
+(on one or many hosts) can run side by side. SIGTERM/SIGINT stop the
+claim loop; the job in progress is finished before the process exits.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.services.background_tasks import process_document_task
+from app.services.document_processor import document_processor
+from app.services.garbage_collector import GarbageCollector
+from app.services.schema_migrations import upgrade_schema
+from app.services.job_queue import (
+    claim_next_job,
+    complete_job,
+    fail_job,
+    PermanentJobError,
+    recover_stale_jobs,
+    renew_job_lock
+)
+
+logger = logging.getLogger(__name__)
+
+class IngestionWorker:
+    """Claims ingestion jobs and processes them until stopped"""
+
+    def __init__(self, worker_id: str = None, poll_interval: float = None, heartbeat_interval: float = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_interval = poll_interval or settings.WORKER_POLL_INTERVAL_SECONDS
+        self.heartbeat_interval = heartbeat_interval or settings.JOB_HEARTBEAT_SECONDS
+        self._stopping = threading.Event()
+
+    def stop(self, *_):
+        if not self._stopping.is_set():
+            logger.info(f"Worker {self.worker_id} draining: current job will finish, no new jobs")
+        self._stopping.set()
+
+    def recover(self) -> None:
+        db = SessionLocal()
+        try:
+            recovered = recover_stale_jobs(db)
+            if recovered:
+                logger.warning(f"Recovered {recovered} stale jobs")
+        finally:
+            db.close()
+
+    def _heartbeat(self, job_id: int, done: threading.Event) -> None:
+        # Job işlendiği sürece locked_at yenilenir; stale recovery sadece ölü worker'ların job'larını alır
+        while not done.wait(self.heartbeat_interval):
+            db = SessionLocal()
+            try:
+                if not renew_job_lock(db, job_id, self.worker_id):
+                    logger.warning(f"Job {job_id} is no longer locked by worker {self.worker_id}")
+                    return
+            except Exception as e:
+                logger.error(f"Job {job_id} heartbeat failed: {e}")
+            finally:
+                db.close()
+
+    def run_once(self) -> bool:
+        """Process a single job. Returns False if the queue was empty."""
+        db = SessionLocal()
+        try:
+            job = claim_next_job(db, self.worker_id)
+            if not job:
+                return False
+
+            logger.info(f"Worker {self.worker_id} claimed job {job.id} (document {job.document_id}, attempt {job.attempts})")
+
+            done = threading.Event()
+            heartbeat = threading.Thread(
+                target=self._heartbeat,
+                args=(job.id, done),
+                name=f"job-heartbeat-{job.id}",
+                daemon=True
+            )
+            heartbeat.start()
+            error = None
+            retry = True
+            try:
+                process_document_task(job.document_id)
+            except Exception as e:
+                error = str(e)
+                # Yetersiz text vb. tekrar denemekle düzelmez
+                retry = not isinstance(e, PermanentJobError)
+            finally:
+                # Sonuç yazılmadan önce heartbeat durur (locked_at temizlenirken yarışmasın)
+                done.set()
+                heartbeat.join()
+
+            if error is None:
+                complete_job(db, job)
+            else:
+                fail_job(db, job, error, retry=retry)
+
+            return True
+        finally:
+            db.close()
+
+    def run(self) -> None:
+        logger.info(f"Worker {self.worker_id} started")
+        self.recover()
+
+        while not self._stopping.is_set():
+            try:
+                had_job = self.run_once()
+            except Exception as e:
+                # DB bağlantı hatası vb. - biraz bekle ve tekrar dene
+                logger.error(f"Worker loop hatası: {e}", exc_info=True)
+                had_job = False
+
+            if not had_job:
+                self._stopping.wait(self.poll_interval)
+
+        logger.info(f"Worker {self.worker_id} stopped")
+
+def _run_worker_process(run_gc: bool = True) -> None:
+    # Fork edilen process parent'ın connection pool'unu paylaşmamalı
+    engine.dispose(close=False)
+
+    worker = IngestionWorker()
+    collector = GarbageCollector() if run_gc and settings.GC_ENABLED else None
+
+    def stop(*args):
+        worker.stop(*args)
+        if collector:
+            collector.stop()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    gc_thread = None
+    if collector:
+        gc_thread = threading.Thread(target=collector.run, name="garbage-collector", daemon=True)
+        gc_thread.start()
+
+    try:
+        worker.run()
+    finally:
+        document_processor.shutdown()
+
+    if gc_thread:
+        gc_thread.join()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Document ingestion worker")
+    parser.add_argument("--processes", type=int, default=settings.WORKER_PROCESSES)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=settings.LOG_LEVEL,
+        format="%(asctime)s %(processName)s %(name)s %(levelname)s %(message)s"
+    )
+
+    # Worker API'den önce başlayabilir: kuyruk tabloları/kolonları hazır olsun
+    upgrade_schema(engine)
+
+    if args.processes <= 1:
+        _run_worker_process()
+        return
+
+    processes = [
+        # GC tek process'te yeterli (SKIP LOCKED sayesinde birden fazlası da güvenli)
+        multiprocessing.Process(target=_run_worker_process, args=(i == 0,), name=f"worker-{i}")
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    def forward_signal(signum, _frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    signal.signal(signal.SIGTERM, forward_signal)
+    signal.signal(signal.SIGINT, forward_signal)
+
+    for process in processes:
+        process.join()
+
+if __name__ == "__main__":
+    main()
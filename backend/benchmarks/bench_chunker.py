@@ -0,0 +1,121 @@
+"""
+Benchmark: LangChain RecursiveCharacterTextSplitter vs TokenChunker.
+
+    cd backend
+    python -m benchmarks.bench_chunker [path/to/document.txt] [--size-mb 8] [--repeat 3]
+
+Without a path a synthetic multi-page document (PDF-style page markers,
+paragraphs, sentences) is generated. Reports throughput and chunk
+statistics for:
+
+* langchain: RecursiveCharacterTextSplitter(1000, 200), the previous splitter,
+             plus the per-chunk token count the embedding batcher then needed
+* native:    TokenChunker over the whole text
+* streaming: TokenChunker.iter_spans over 64KB pieces (what the worker does)
+
+langchain-text-splitters is only needed for this comparison (see the root
+requirements.txt).
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.services.chunker import TokenChunker
+
+WORDS = (
+    "document search vector embedding contract clause payment invoice report "
+    "quarter revenue customer policy section article shall party agreement "
+    "the of and to in is that for on with as by this be are"
+).split()
+
+
+def synthetic_document(size_bytes: int, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    pages = []
+    total = 0
+    page = 1
+    while total < size_bytes:
+        paragraphs = []
+        for _ in range(rng.randint(3, 8)):
+            sentences = [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 24))).capitalize() + "."
+                for _ in range(rng.randint(2, 7))
+            ]
+            paragraphs.append(" ".join(sentences))
+        text = f"\n--- Sayfa {page} ---\n" + "\n\n".join(paragraphs)
+        pages.append(text)
+        total += len(text)
+        page += 1
+    return "".join(pages)
+
+
+def best_of(repeat: int, fn):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def report(name: str, elapsed: float, size_mb: float, chunks, token_counts) -> None:
+    lengths = [len(chunk) for chunk in chunks]
+    print(
+        f"{name:<10} {elapsed:.2f}s  {size_mb / elapsed:6.2f} MB/s  {len(chunks):>7} chunks  "
+        f"chars avg {statistics.mean(lengths):.0f} max {max(lengths)}  "
+        f"tokens avg {statistics.mean(token_counts):.0f} max {max(token_counts)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", nargs="?")
+    parser.add_argument("--size-mb", type=float, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.path:
+        with open(args.path, encoding="utf-8") as file:
+            text = file.read()
+    else:
+        text = synthetic_document(int(args.size_mb * 1024 * 1024))
+
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+    chunker = TokenChunker()
+    encoding = chunker.encoding
+    print(f"document: {size_mb:.1f} MB, {len(text)} chars")
+
+    try:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+    except ImportError:
+        print("langchain      skipped (pip install langchain-text-splitters)")
+    else:
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=200,
+            length_function=len,
+            separators=["\n\n", "\n", " ", ""]
+        )
+
+        def split_and_count():
+            chunks = splitter.split_text(text)
+            return chunks, [len(tokens) for tokens in encoding.encode_ordinary_batch(chunks)]
+
+        elapsed, (chunks, token_counts) = best_of(args.repeat, split_and_count)
+        report("langchain", elapsed, size_mb, chunks, token_counts)
+
+    elapsed, spans = best_of(args.repeat, lambda: chunker.split(text))
+    report("native", elapsed, size_mb, [s.text for s in spans], [s.token_count for s in spans])
+
+    pieces = [text[i:i + 64 * 1024] for i in range(0, len(text), 64 * 1024)]
+    elapsed, spans = best_of(args.repeat, lambda: list(chunker.iter_spans(pieces)))
+    report("streaming", elapsed, size_mb, [s.text for s in spans], [s.token_count for s in spans])
+
+    paged = sum(1 for span in spans if span.page is not None)
+    print(f"streaming spans with a page number: {paged}/{len(spans)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark: List[List[float]] vs float32 NumPy embeddings through ingestion.
+
+    cd backend
+    python -m benchmarks.bench_embeddings [--chunks 5000] [--dims 1536]
+
+Simulates the embedding path of a document with N chunks, without
+network calls:
+
+* decode:  API response -> embeddings. legacy parses the JSON float
+           lists; numpy decodes base64 (encoding_format="base64") with
+           np.frombuffer; "retained" is what the document's embeddings
+           keep in memory
+* cache:   pack to / unpack from the float32 blobs of EmbeddingCache
+* upsert:  build the Pinecone payload (the only place numpy converts
+           back to lists)
+
+Memory is measured with tracemalloc (peak while building, then retained)
+in a separate, untimed run.
+"""
+import argparse
+import base64
+import json
+import time
+import tracemalloc
+from array import array
+
+import numpy as np
+
+from app.services.embedding_batcher import decode_embedding
+from app.services.embedding_cache import pack_vector, unpack_vector
+
+
+def measure(fn):
+    # Süre ve bellek ayrı çalıştırmalarda ölçülür (tracemalloc süreyi şişirir)
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = fn()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, retained, peak
+
+
+def legacy_pack(values) -> bytes:
+    return array("f", values).tobytes()
+
+
+def legacy_unpack(blob: bytes):
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+def row(stage: str, name: str, elapsed: float, retained: int = None, peak: int = None) -> None:
+    memory = ""
+    if retained is not None:
+        memory = f"  retained {retained / 2**20:7.1f} MB  peak {peak / 2**20:7.1f} MB"
+    print(f"{stage:<7} {name:<7} {elapsed * 1000:8.1f} ms{memory}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--dims", type=int, default=1536)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((args.chunks, args.dims), dtype=np.float32)
+    float_body = json.dumps({"data": [{"index": i, "embedding": v.tolist()} for i, v in enumerate(matrix)]})
+    base64_body = json.dumps({"data": [
+        {"index": i, "embedding": base64.b64encode(v.tobytes()).decode()} for i, v in enumerate(matrix)
+    ]})
+    print(f"{args.chunks} chunks x {args.dims} dims, response body: "
+          f"float JSON {len(float_body) / 2**20:.1f} MB, base64 JSON {len(base64_body) / 2**20:.1f} MB")
+
+    # 1. API yanıtı -> embedding'ler (yanıtın kendisi ölçüme dahil değil)
+    legacy, elapsed, retained, peak = measure(
+        lambda: [item["embedding"] for item in json.loads(float_body)["data"]]
+    )
+    row("decode", "legacy", elapsed, retained, peak)
+
+    vectors, elapsed, retained, peak = measure(
+        lambda: np.stack([decode_embedding(item["embedding"]) for item in json.loads(base64_body)["data"]])
+    )
+    row("decode", "numpy", elapsed, retained, peak)
+    assert np.allclose(vectors, np.asarray(legacy, dtype=np.float32))
+
+    # 2. Cache blob'ları
+    start = time.perf_counter()
+    blobs = [legacy_pack(v) for v in legacy]
+    [legacy_unpack(blob) for blob in blobs]
+    row("cache", "legacy", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    blobs = [pack_vector(v) for v in vectors]
+    np.stack([unpack_vector(blob) for blob in blobs])
+    row("cache", "numpy", time.perf_counter() - start)
+
+    # 3. Pinecone payload'u (gönderim sınırında listeye çevrilir)
+    start = time.perf_counter()
+    [{"id": f"doc_1_chunk_{i}", "values": v} for i, v in enumerate(legacy)]
+    row("upsert", "legacy", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    [{"id": f"doc_1_chunk_{i}", "values": v.tolist()} for i, v in enumerate(vectors)]
+    row("upsert", "numpy", time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
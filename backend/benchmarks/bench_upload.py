@@ -0,0 +1,130 @@
+"""
+Benchmark: concurrent upload saves and event-loop responsiveness.
+
+    cd backend
+    python -m benchmarks.bench_upload [--uploads 32] [--size-mb 8]
+
+Starlette hands the route an UploadFile backed by a SpooledTemporaryFile.
+This benchmark isolates what the route does with it, for N concurrent
+uploads:
+
+* legacy:    read/hash/write loop inside `async def` (the previous upload path)
+* streaming: save_upload_file (chunked threadpool write + sha256 + size limit)
+
+A ticker task measures how late the event loop wakes up while the saves
+run; a blocked loop shows up as high max lag (every other request waits
+that long). An oversized request is also sent through
+UploadSizeLimitMiddleware to show it is rejected before the body is read.
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI, File, UploadFile
+
+from app.utils.uploads import UploadSizeLimitMiddleware, save_upload_file
+
+
+def make_upload(payload: bytes) -> UploadFile:
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spooled.write(payload)
+    spooled.seek(0)
+    return UploadFile(file=spooled, filename="bench.bin")
+
+
+async def legacy_save(file: UploadFile, destination: Path) -> None:
+    hasher = hashlib.sha256()
+    with destination.open("wb") as buffer:
+        while chunk := file.file.read(1024 * 1024):
+            hasher.update(chunk)
+            buffer.write(chunk)
+
+
+async def streaming_save(file: UploadFile, destination: Path) -> None:
+    await save_upload_file(file, destination, max_size=1 << 40)
+
+
+async def measure_lag(stop: asyncio.Event, samples: list, interval: float = 0.005) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(loop.time() - start - interval)
+
+
+async def run(save, payload: bytes, uploads: int, upload_dir: Path) -> dict:
+    files = [make_upload(payload) for _ in range(uploads)]
+
+    stop = asyncio.Event()
+    lag: list = []
+    ticker = asyncio.create_task(measure_lag(stop, lag))
+    await asyncio.sleep(0.01)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        save(file, upload_dir / f"{save.__name__}_{i}") for i, file in enumerate(files)
+    ])
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    for file in files:
+        file.file.close()
+    for path in upload_dir.iterdir():
+        path.unlink()
+
+    return {
+        "elapsed": elapsed,
+        "mb_per_s": uploads * len(payload) / (1024 * 1024) / elapsed,
+        "lag_p50_ms": statistics.median(lag) * 1000 if lag else 0.0,
+        "lag_max_ms": max(lag) * 1000 if lag else 0.0,
+    }
+
+
+async def oversized_rejection(payload: bytes) -> None:
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware, path_prefix="/upload", max_body_size=1024)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"ok": True}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        response = await client.post("/upload", files={"file": ("big.bin", payload)})
+        print(f"oversized  {response.status_code} in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+
+async def main_async(args) -> None:
+    payload = os.urandom(args.size_mb * 1024 * 1024)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Threadpool'u ısıt
+        await run(streaming_save, payload[:1024], args.uploads, Path(tmp))
+
+        for save in (legacy_save, streaming_save):
+            result = await run(save, payload, args.uploads, Path(tmp))
+            print(
+                f"{save.__name__:<15} {result['elapsed']:.2f}s  {result['mb_per_s']:.0f} MB/s  "
+                f"loop lag p50 {result['lag_p50_ms']:.1f}ms max {result['lag_max_ms']:.1f}ms"
+            )
+
+    await oversized_rejection(payload)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--uploads", type=int, default=32)
+    parser.add_argument("--size-mb", type=int, default=8)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
-from app.database import Base, engine
-from app.models import User, Room, Document, Message
+from app.database import engine
+from app.services.schema_migrations import upgrade_schema
 
-# Tablolar oluştur
-Base.metadata.create_all(bind=engine)
+# Tablolar oluştur, eski kurulumlarda eksik kolonları ekle
+upgrade_schema(engine)
 print("✅ Tablolar oluşturuldu!")
@@ -0,0 +1,135 @@
+"""
+Tests for the per-room chat answer cache.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.answer_cache import AnswerCache
+from app.services.chat_service import ChatService
+from app.services.vector_cache import RoomVectorVersion
+
+
+def answer(text):
+    return {"answer": text, "tokens_used": 120, "prompt_tokens": 100, "sources": [{"document_id": 1, "score": 0.9}]}
+
+
+def test_exact_match_until_documents_change():
+    cache = AnswerCache(max_entries=10, similarity_threshold=0)
+    cache.put("room_a", (1, 10, None), "What is the SLA?", None, answer("99.9%"))
+
+    assert cache.get("room_a", (1, 10, None), "  what is the sla? ")["answer"] == "99.9%"
+    assert cache.get("room_b", (1, 10, None), "What is the SLA?") is None
+    # Yeni batch yüklendi: odanın bütün cevapları düşer
+    assert cache.get("room_a", (1, 20, None), "What is the SLA?") is None
+    assert cache.get("room_a", (1, 10, None), "What is the SLA?") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_returned_answers_are_copies():
+    cache = AnswerCache(max_entries=10, similarity_threshold=0)
+    cache.put("room_a", 1, "q", None, answer("a"))
+
+    cache.get("room_a", 1, "q")["sources"].clear()
+
+    assert cache.get("room_a", 1, "q")["sources"] != []
+
+
+def test_near_duplicate_match_above_threshold():
+    cache = AnswerCache(max_entries=10, similarity_threshold=0.95)
+    cache.put("room_a", 1, "How do I reset my password?", np.array([1.0, 0.0, 0.0]), answer("reset"))
+    cache.put("room_a", 1, "Who is the CEO?", np.array([0.0, 1.0, 0.0]), answer("ceo"))
+
+    assert cache.match("room_a", 1, np.array([0.99, 0.05, 0.0]))["answer"] == "reset"
+    assert cache.match("room_a", 1, np.array([0.7, 0.7, 0.0])) is None
+    assert cache.match("room_a", 2, np.array([1.0, 0.0, 0.0])) is None
+
+    stats = cache.stats()
+    assert (stats["near_hits"], stats["misses"]) == (1, 2)
+
+
+def test_invalidate_and_lru_bound():
+    cache = AnswerCache(max_entries=3, similarity_threshold=0)
+    for i in range(3):
+        cache.put("room_a", 1, f"q{i}", None, answer(str(i)))
+    cache.put("room_b", 1, "q", None, answer("b"))
+
+    assert cache.get("room_a", 1, "q0") is None
+    assert cache.get("room_a", 1, "q1") is not None
+    assert cache.stats()["entries"] == 3
+
+    cache.invalidate("room_a")
+    assert cache.get("room_a", 1, "q1") is None
+    stats = cache.stats()
+    assert (stats["rooms"], stats["entries"]) == (1, 1)
+
+
+def test_chat_reuses_answer_until_room_version_changes():
+    service = ChatService()
+    service.answer_cache = AnswerCache(max_entries=10, similarity_threshold=0)
+    calls = {"embed": 0, "generate": 0}
+
+    async def fake_embed(question, model=None, dimensions=None):
+        calls["embed"] += 1
+        return np.ones(3, dtype=np.float32)
+
+    async def fake_search(query_embedding, namespace, **kwargs):
+        return [{"text": "t", "score": 0.9, "document_id": 1, "filename": "a.txt", "page_number": None}]
+
+    async def fake_generate(question, chunks):
+        calls["generate"] += 1
+        return answer(f"answer {calls['generate']}")
+
+    service.create_query_embedding = fake_embed
+    service.search_relevant_chunks = fake_search
+    service.generate_answer = fake_generate
+
+    async def ask():
+        return [
+            await service.chat("What is X?", "room_a", version=(1, 3, None)),
+            await service.chat("what is x?", "room_a", version=(1, 3, None)),
+            await service.chat("What is X?", "room_a", version=(2, 5, None))
+        ]
+
+    first, cached, after_upload = asyncio.run(ask())
+
+    assert first["answer"] == cached["answer"] == "answer 1"
+    assert (first["tokens_used"], cached["tokens_used"]) == (120, 0)
+    assert after_upload["answer"] == "answer 2"
+    assert calls == {"embed": 2, "generate": 2}
+
+
+def test_answers_are_not_cached_inside_the_consistency_window():
+    service = ChatService()
+    service.answer_cache = AnswerCache(max_entries=10, similarity_threshold=0)
+    service.vector_store = SimpleNamespace(consistency_window=30)
+    calls = {"generate": 0}
+
+    async def fake_embed(question, model=None, dimensions=None):
+        return np.ones(3, dtype=np.float32)
+
+    async def fake_search(query_embedding, namespace, **kwargs):
+        return [{"text": "t", "score": 0.9, "document_id": 1, "filename": "a.txt", "page_number": None}]
+
+    async def fake_generate(question, chunks):
+        calls["generate"] += 1
+        return answer(f"answer {calls['generate']}")
+
+    service.create_query_embedding = fake_embed
+    service.search_relevant_chunks = fake_search
+    service.generate_answer = fake_generate
+    # Son batch az önce yüklendi: arama henüz onu görmüyor olabilir
+    fresh = RoomVectorVersion(1, 3, datetime.now(timezone.utc))
+    settled = RoomVectorVersion(1, 3, datetime.now(timezone.utc) - timedelta(minutes=5))
+
+    async def ask():
+        await service.chat("What is X?", "room_a", version=fresh)
+        await service.chat("What is X?", "room_a", version=fresh)
+        await service.chat("What is X?", "room_a", version=settled)
+        await service.chat("What is X?", "room_a", version=settled)
+
+    asyncio.run(ask())
+
+    assert calls["generate"] == 3
@@ -0,0 +1,83 @@
+"""
+Tests for the bounded executor used for vector store queries.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from app.config import settings
+from app.services.bounded_executor import BoundedExecutor, ExecutorBusy
+
+
+@pytest.fixture
+def gate():
+    gate = threading.Event()
+    yield gate
+    gate.set()
+
+
+def test_runs_calls_and_records_metrics():
+    executor = BoundedExecutor("test", max_workers=2, max_queue=4, timeout=5)
+
+    async def run():
+        return await asyncio.gather(*(executor.run(lambda i=i: i * i) for i in range(4)))
+
+    assert asyncio.run(run()) == [0, 1, 4, 9]
+    stats = executor.stats()
+    assert (stats["completed"], stats["queued"], stats["active"]) == (4, 0, 0)
+    assert stats["run_time"]["count"] == 4
+    assert stats["queue_wait"]["count"] == 4
+
+
+def test_full_queue_is_rejected(gate):
+    executor = BoundedExecutor("test", max_workers=1, max_queue=1, timeout=5)
+
+    async def run():
+        running = asyncio.ensure_future(executor.run(gate.wait))
+        while executor.active == 0:
+            await asyncio.sleep(0.01)
+        waiting = asyncio.ensure_future(executor.run(lambda: "queued"))
+        await asyncio.sleep(0)
+        with pytest.raises(ExecutorBusy):
+            await executor.run(lambda: "rejected")
+        assert executor.stats()["queued"] == 1
+        gate.set()
+        return await running, await waiting
+
+    assert asyncio.run(run()) == (True, "queued")
+    stats = executor.stats()
+    assert (stats["rejected"], stats["max_queued"], stats["completed"]) == (1, 1, 2)
+
+
+def test_timeout_cancels_a_waiting_call(gate):
+    executor = BoundedExecutor("test", max_workers=1, max_queue=4, timeout=0.05)
+    ran = []
+
+    async def run():
+        blocked = asyncio.ensure_future(executor.run(gate.wait, timeout=5))
+        while executor.active == 0:
+            await asyncio.sleep(0.01)
+        with pytest.raises(asyncio.TimeoutError):
+            await executor.run(lambda: ran.append(True))
+        # Bekleyen çağrı kuyruktan düştü, hiç çalışmayacak
+        assert executor.stats()["queued"] == 0
+        gate.set()
+        await blocked
+
+    asyncio.run(run())
+    assert ran == []
+    assert executor.stats()["timeouts"] == 1
+
+
+def test_metrics_require_the_metrics_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "")
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "ops-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"X-Metrics-Token": "wrong"}).status_code == 401
+
+    response = client.get("/metrics", headers={"X-Metrics-Token": "ops-secret"})
+    assert response.status_code == 200
+    assert "max_workers" in response.json()["vector_query_executor"]
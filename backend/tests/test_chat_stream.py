@@ -0,0 +1,212 @@
+"""
+Tests for streaming chat answers over Server-Sent Events.
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.limiter import limiter
+from app.main import app
+from app.models import Message, Room, User
+from app.routes import chat as chat_routes
+from app.services.answer_cache import AnswerCache
+from app.services.chat_service import ChatService
+from app.services.vector_cache import room_vector_version
+from app.utils import get_current_user_id
+
+
+class FakeStream:
+    def __init__(self, parts, total_tokens):
+        self.parts = parts
+        self.total_tokens = total_tokens
+        self.closed = False
+
+    async def __aiter__(self):
+        for part in self.parts:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))], usage=None)
+        yield SimpleNamespace(choices=[], usage=SimpleNamespace(total_tokens=self.total_tokens, prompt_tokens=30))
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeCompletions:
+    def __init__(self, parts, total_tokens=42):
+        self.parts = parts
+        self.total_tokens = total_tokens
+        self.streams = []
+
+    async def create(self, stream=False, **kwargs):
+        assert stream and kwargs["stream_options"] == {"include_usage": True}
+        self.streams.append(FakeStream(self.parts, self.total_tokens))
+        return self.streams[-1]
+
+
+@pytest.fixture
+def service():
+    service = ChatService()
+    service.answer_cache = AnswerCache(max_entries=10, similarity_threshold=0)
+    service.completions = FakeCompletions(["The SLA ", "is ", "99.9%."])
+    service.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=service.completions))
+
+    async def fake_embed(question, model=None, dimensions=None):
+        return np.ones(3, dtype=np.float32)
+
+    async def fake_search(query_embedding, namespace, **kwargs):
+        return [{"text": "SLA: 99.9%", "score": 0.9, "document_id": 1, "filename": "sla.txt", "page_number": 2}]
+
+    service.create_query_embedding = fake_embed
+    service.search_relevant_chunks = fake_search
+    return service
+
+
+def collect(stream):
+    async def run():
+        return [event async for event in stream]
+    return asyncio.run(run())
+
+
+def test_sources_first_then_tokens_then_done(service):
+    events = collect(service.chat_stream("What is the SLA?", "room_a", version=1))
+
+    assert [event["event"] for event in events] == ["sources", "token", "token", "token", "done"]
+    assert events[0]["data"][0]["filename"] == "sla.txt"
+    assert "".join(event["data"] for event in events[1:4]) == "The SLA is 99.9%."
+    assert events[-1]["data"]["tokens_used"] == 42
+    assert events[-1]["data"]["prompt_tokens"] == 30
+    assert events[-1]["data"]["ttft_ms"] >= 0
+    assert service.time_to_first_token.stats()["count"] == 1
+
+    # Tamamlanan cevap cache'lendi: ikinci istek tek parça, token harcamadan
+    repeated = collect(service.chat_stream("what is the sla?", "room_a", version=1))
+    assert [event["event"] for event in repeated] == ["sources", "token", "done"]
+    assert repeated[1]["data"] == "The SLA is 99.9%."
+    assert repeated[-1]["data"]["tokens_used"] == 0
+    assert len(service.completions.streams) == 1
+
+
+def test_cancelled_stream_is_closed_and_not_cached(service):
+    async def read_first_token():
+        stream = service.chat_stream("What is the SLA?", "room_a", version=1)
+        async for event in stream:
+            if event["event"] == "token":
+                break
+        await stream.aclose()
+
+    asyncio.run(read_first_token())
+
+    assert service.completions.streams[0].closed
+    assert service.answer_cache.get("room_a", 1, "What is the SLA?") is None
+
+
+def test_stream_endpoint_persists_messages(client, db, monkeypatch):
+    user = User(email="stream@example.com", name="Stream User", password_hash="x")
+    db.add(user)
+    db.flush()
+    room = Room(user_id=user.id, name="Room", pinecone_namespace="room_stream")
+    db.add(room)
+    db.commit()
+
+    async def fake_chat_stream(question, **kwargs):
+        yield {"event": "sources", "data": [{"document_id": 1, "filename": "a.txt", "page_number": None, "score": 0.9, "chunk_text": "t"}]}
+        yield {"event": "token", "data": "Hello\n"}
+        yield {"event": "token", "data": "world"}
+        yield {"event": "done", "data": {"tokens_used": 7, "ttft_ms": 12.5}}
+
+    monkeypatch.setattr(chat_routes.chat_service, "chat_stream", fake_chat_stream)
+    app.dependency_overrides[get_current_user_id] = lambda: user.id
+
+    response = client.post(f"/api/v1/chat/{room.id}/stream", json={"question": "Hi?"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        (block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+        for block in response.text.strip().split("\n\n")
+    ]
+    assert [name for name, _ in events] == ["sources", "token", "token", "done"]
+    assert events[-1][1]["tokens_used"] == 7
+
+    db.expire_all()
+    messages = db.query(Message).filter(Message.room_id == room.id).order_by(Message.id).all()
+    assert [(m.message_type, m.content) for m in messages] == [("user", "Hi?"), ("ai", "Hello\nworld")]
+    assert messages[1].tokens_used == 7
+    assert events[-1][1]["message_id"] == messages[1].id
+
+
+@pytest.fixture
+def fresh_limits():
+    limiter.reset()
+    yield
+    limiter.reset()
+
+
+def test_chat_endpoints_share_one_daily_limit(client, db, monkeypatch, fresh_limits):
+    user = User(email="limit@example.com", name="Limit User", password_hash="x")
+    db.add(user)
+    db.flush()
+    room = Room(user_id=user.id, name="Room", pinecone_namespace="room_limit")
+    db.add(room)
+    db.commit()
+
+    async def fake_chat(question, **kwargs):
+        return {"answer": "a", "tokens_used": 1, "prompt_tokens": 1, "sources": []}
+
+    async def fake_chat_stream(question, **kwargs):
+        yield {"event": "sources", "data": []}
+        yield {"event": "done", "data": {"tokens_used": 1, "ttft_ms": None}}
+
+    monkeypatch.setattr(chat_routes.chat_service, "chat", fake_chat)
+    monkeypatch.setattr(chat_routes.chat_service, "chat_stream", fake_chat_stream)
+    app.dependency_overrides[get_current_user_id] = lambda: user.id
+
+    statuses = [client.post(f"/api/v1/chat/{room.id}", json={"question": "Hi?"}).status_code for _ in range(3)]
+    statuses += [client.post(f"/api/v1/chat/{room.id}/stream", json={"question": "Hi?"}).status_code for _ in range(2)]
+
+    assert statuses == [200] * 5
+    # Kota iki endpoint arasında paylaşılır: ikisi de artık reddedilir
+    assert client.post(f"/api/v1/chat/{room.id}/stream", json={"question": "Hi?"}).status_code == 429
+    assert client.post(f"/api/v1/chat/{room.id}", json={"question": "Hi?"}).status_code == 429
+
+
+def test_chat_endpoint_saves_an_empty_answer(client, db, monkeypatch, fresh_limits):
+    user = User(email="filtered@example.com", name="Filtered User", password_hash="x")
+    db.add(user)
+    db.flush()
+    room = Room(user_id=user.id, name="Room", pinecone_namespace="room_filtered")
+    db.add(room)
+    db.commit()
+
+    async def create(**kwargs):
+        # content filter ile kesilen cevap: content None
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=None), finish_reason="content_filter")],
+            usage=SimpleNamespace(total_tokens=12, prompt_tokens=12)
+        )
+
+    async def fake_embed(question, model=None, dimensions=None):
+        return np.ones(3, dtype=np.float32)
+
+    async def fake_search(query_embedding, namespace, **kwargs):
+        return [{"text": "SLA: 99.9%", "score": 0.9, "document_id": 1, "filename": "sla.txt", "page_number": 2}]
+
+    answer_cache = AnswerCache(max_entries=10, similarity_threshold=0)
+    monkeypatch.setattr(chat_routes.chat_service, "answer_cache", answer_cache)
+    monkeypatch.setattr(chat_routes.chat_service, "openai_client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+    monkeypatch.setattr(chat_routes.chat_service, "create_query_embedding", fake_embed)
+    monkeypatch.setattr(chat_routes.chat_service, "search_relevant_chunks", fake_search)
+    app.dependency_overrides[get_current_user_id] = lambda: user.id
+
+    response = client.post(f"/api/v1/chat/{room.id}", json={"question": "Hi?"})
+
+    assert response.status_code == 200
+    assert response.json()["answer"] == ""
+    db.expire_all()
+    messages = db.query(Message).filter(Message.room_id == room.id).order_by(Message.id).all()
+    assert [(m.message_type, m.content) for m in messages] == [("user", "Hi?"), ("ai", "")]
+    assert response.json()["message_id"] == messages[1].id
+    # Boş cevap cache'lenmez
+    assert answer_cache.get("room_filtered", room_vector_version(db, room.id), "Hi?") is None
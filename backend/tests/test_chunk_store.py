@@ -0,0 +1,95 @@
+"""
+Tests for the Postgres chunk store and chat-time hydration.
+"""
+import pytest
+
+from app.models import User, Room, Document, Chunk
+from app.services.chat_service import ChatService
+from app.services.chunk_store import copy_chunks, delete_chunks, load_chunks, save_chunks
+from app.services.chunker import ChunkSpan
+from app.services.vector_store import VectorMatch
+
+
+@pytest.fixture
+def documents(db):
+    user = User(email="chunks@example.com", name="Chunk User", password_hash="x")
+    db.add(user)
+    db.flush()
+    room = Room(user_id=user.id, name="Chunk Room", pinecone_namespace="room_chunks")
+    db.add(room)
+    db.flush()
+    first = Document(room_id=room.id, filename="a.pdf", file_path="/tmp/a.pdf")
+    second = Document(room_id=room.id, filename="b.pdf", file_path="/tmp/b.pdf")
+    db.add_all([first, second])
+    db.commit()
+    return first, second
+
+
+def spans(count, page=2):
+    return [ChunkSpan(i * 10, i * 10 + 8, page, 3, f"chunk {i}") for i in range(count)]
+
+
+def test_save_and_load_in_one_query(db, documents):
+    first, _ = documents
+    save_chunks(db, first.id, 0, spans(3))
+    save_chunks(db, first.id, 3, spans(2, page=None))
+    db.commit()
+
+    rows = load_chunks(db, [(first.id, 4), (first.id, 1), (first.id, 99)])
+
+    assert set(rows) == {(first.id, 4), (first.id, 1)}
+    chunk, filename = rows[(first.id, 1)]
+    assert (chunk.text, chunk.start_offset, chunk.end_offset, chunk.page_number, chunk.token_count) == (
+        "chunk 1", 10, 18, 2, 3
+    )
+    assert filename == "a.pdf"
+    assert rows[(first.id, 4)][0].page_number is None
+
+
+def test_copy_and_delete(db, documents):
+    first, second = documents
+    save_chunks(db, first.id, 0, spans(3))
+    db.commit()
+
+    assert copy_chunks(db, first.id, second.id) == 3
+    delete_chunks(db, first.id)
+    db.commit()
+
+    assert db.query(Chunk).filter(Chunk.document_id == first.id).count() == 0
+    rows = load_chunks(db, [(second.id, i) for i in range(3)])
+    assert [rows[(second.id, i)][0].text for i in range(3)] == ["chunk 0", "chunk 1", "chunk 2"]
+    assert rows[(second.id, 0)][1] == "b.pdf"
+
+
+def test_chunks_are_removed_with_their_document(db, documents):
+    first, _ = documents
+    save_chunks(db, first.id, 0, spans(2))
+    db.commit()
+
+    db.delete(first)
+    db.commit()
+
+    assert db.query(Chunk).count() == 0
+
+
+def test_hydrate_reads_text_from_chunks_table(db, documents):
+    first, _ = documents
+    save_chunks(db, first.id, 0, spans(2))
+    db.commit()
+    service = ChatService()
+
+    chunks = service.hydrate_chunks(db, [
+        # Pinecone sayısal metadata'yı float döndürür
+        VectorMatch(f"doc_{first.id}_chunk_1", 0.9, {"document_id": float(first.id), "chunk_index": 1.0}),
+        # Eski vektör: text metadata'da
+        VectorMatch("doc_99_chunk_0", 0.8, {"document_id": 99, "chunk_index": 0, "text": "legacy", "filename": "old.txt"}),
+        # Dökümanı silinmiş
+        VectorMatch("doc_98_chunk_0", 0.7, {"document_id": 98, "chunk_index": 0}),
+    ])
+
+    assert chunks == [
+        {"text": "chunk 1", "score": 0.9, "document_id": first.id, "chunk_index": 1, "filename": "a.pdf", "page_number": 2,
+         "start_offset": 10, "end_offset": 18},
+        {"text": "legacy", "score": 0.8, "document_id": 99, "chunk_index": 0, "filename": "old.txt", "page_number": None,
+         "start_offset": None, "end_offset": None},
+    ]
@@ -0,0 +1,105 @@
+"""
+Tests for the token-budgeted, offset-aware chunker.
+"""
+import pytest
+
+from app.services import chunker
+from app.services.chunker import TokenChunker
+
+
+def make_chunker(chunk_tokens=20, overlap_tokens=5):
+    return TokenChunker(chunk_tokens, overlap_tokens)
+
+
+def sample_text(sentences=60):
+    return " ".join(
+        f"Sentence {i} talks about topic {i % 7} in some detail." for i in range(sentences)
+    )
+
+
+def test_chunks_respect_token_budget():
+    text = sample_text()
+    spans = make_chunker().split(text)
+
+    assert len(spans) > 1
+    assert all(span.token_count <= 20 for span in spans)
+
+
+def test_spans_map_back_to_text():
+    text = "  " + sample_text() + "\n\n"
+    spans = make_chunker().split(text)
+
+    for span in spans:
+        assert text[span.start:span.end] == span.text
+        assert span.text == span.text.strip()
+
+
+def test_consecutive_chunks_overlap_and_cover_text():
+    text = sample_text()
+    spans = make_chunker().split(text)
+
+    assert spans[0].start == 0
+    assert spans[-1].end == len(text)
+    for previous, current in zip(spans, spans[1:]):
+        assert current.start < previous.end
+        assert current.start > previous.start
+
+
+def test_prefers_sentence_boundaries():
+    text = sample_text()
+    spans = make_chunker().split(text)
+
+    assert all(span.text.endswith(".") for span in spans)
+
+
+def test_page_numbers_from_markers():
+    pieces = [
+        "\n--- Sayfa 1 ---\n" + sample_text(10),
+        "\n--- Sayfa 3 ---\n" + sample_text(10),
+    ]
+    text = "".join(pieces)
+    spans = list(make_chunker().iter_spans(pieces))
+
+    assert {span.page for span in spans} == {1, 3}
+    for span in spans:
+        assert "Sayfa" not in span.text
+        assert text[span.start:span.end] == span.text
+
+
+def test_text_without_markers_has_no_page():
+    spans = list(make_chunker().iter_spans([sample_text(10)]))
+
+    assert spans
+    assert all(span.page is None for span in spans)
+
+
+def test_streaming_matches_single_pass(monkeypatch):
+    monkeypatch.setattr(chunker, "STREAM_WINDOW_CHARS", 500)
+    text = "\n\n".join(sample_text(15) for _ in range(8))
+    pieces = [text[i:i + 97] for i in range(0, len(text), 97)]
+
+    streamed = list(make_chunker().iter_spans(pieces))
+    whole = list(make_chunker().iter_spans([text]))
+
+    assert [span.text for span in streamed] == [span.text for span in whole]
+    for span in streamed:
+        assert text[span.start:span.end] == span.text
+
+
+def test_multibyte_text_offsets():
+    text = "Çalışma sözleşmesi şartları: ödeme 30 gün içinde yapılır. " * 40 + "漢字テキスト🙂 " * 30
+    spans = make_chunker().split(text)
+
+    assert len(spans) > 1
+    for span in spans:
+        assert text[span.start:span.end] == span.text
+        assert "\ufffd" not in span.text
+
+
+def test_whitespace_only_text_has_no_chunks():
+    assert list(make_chunker().iter_spans(["   ", "\n\n", "\t"])) == []
+
+
+def test_overlap_must_be_smaller_than_chunk():
+    with pytest.raises(ValueError):
+        TokenChunker(10, 10)
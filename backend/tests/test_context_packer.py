@@ -0,0 +1,134 @@
+"""
+Tests for merging retrieved chunks and packing them into a token budget.
+"""
+import re
+
+from app.services.chunker import ChunkSpan
+from app.services.context_packer import BLOCK_SEPARATOR, merge_chunks, pack_context
+
+
+class WordEncoding:
+    """One token per whitespace-separated word."""
+
+    def encode_ordinary(self, text):
+        return text.split()
+
+    def encode_ordinary_batch(self, texts):
+        return [self.encode_ordinary(text) for text in texts]
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+ENCODING = WordEncoding()
+
+DOCUMENT = " ".join(f"Sentence number {i} talks about topic {i % 7}." for i in range(200))
+
+
+def retrieved(spans, indexes, scores, document_id=1, filename="doc.txt"):
+    """Retrieval'dan dönen (hydrate edilmiş) chunk'lar"""
+    return [
+        {
+            "text": spans[i].text,
+            "score": score,
+            "document_id": document_id,
+            "chunk_index": i,
+            "filename": filename,
+            "page_number": spans[i].page,
+            "start_offset": spans[i].start,
+            "end_offset": spans[i].end
+        }
+        for i, score in zip(indexes, scores)
+    ]
+
+
+def spans(chunk_words=20, overlap_words=8):
+    """DOCUMENT'i chunker gibi örtüşen kelime pencerelerine böl"""
+    words = list(re.finditer(r"\S+", DOCUMENT))
+    step = chunk_words - overlap_words
+    return [
+        ChunkSpan(
+            start=window[0].start(),
+            end=window[-1].end(),
+            page=None,
+            token_count=len(window),
+            text=DOCUMENT[window[0].start():window[-1].end()]
+        )
+        for window in (words[i:i + chunk_words] for i in range(0, len(words), step))
+    ]
+
+
+def test_overlapping_chunks_are_merged_without_repeated_text():
+    chunks = spans()
+    assert chunks[1].start < chunks[0].end  # chunker örtüşmesi
+
+    [block] = merge_chunks(retrieved(chunks, [1, 0, 2], [0.9, 0.8, 0.7]))
+
+    assert block.text == DOCUMENT[chunks[0].start:chunks[2].end]
+    assert block.score == 0.9
+    assert [chunk["chunk_index"] for chunk in block.chunks] == [0, 1, 2]
+
+
+def test_distant_chunks_and_documents_stay_separate():
+    chunks = spans()
+    blocks = merge_chunks(
+        retrieved(chunks, [0, 5], [0.6, 0.8])
+        + retrieved(chunks, [1], [0.7], document_id=2, filename="other.txt")
+    )
+
+    assert [(block.filename, block.score) for block in blocks] == [("doc.txt", 0.8), ("other.txt", 0.7), ("doc.txt", 0.6)]
+
+
+def test_chunk_inside_the_block_does_not_repeat_text():
+    def chunk(start, end, index, score):
+        return {"text": DOCUMENT[start:end], "score": score, "document_id": 1, "chunk_index": index, "start_offset": start, "end_offset": end}
+
+    # Farklı chunk boyutuyla yeniden işlenmiş döküman: ikinci chunk ilkinin içinde
+    outer, inner, after = chunk(0, 200, 0, 0.4), chunk(50, 120, 1, 0.9), chunk(180, 300, 2, 0.5)
+
+    [block] = merge_chunks([outer, inner, after])
+
+    assert block.text == DOCUMENT[0:300]
+    assert block.score == 0.9
+    assert block.chunks == [outer, inner, after]
+
+
+def test_legacy_chunks_without_offsets_drop_the_overlap():
+    left = {"text": "The quick brown fox jumps over the lazy dog near the river", "score": 0.9, "document_id": 1, "chunk_index": 3}
+    right = {"text": "over the lazy dog near the river bank at dawn", "score": 0.5, "document_id": 1, "chunk_index": 4}
+
+    [block] = merge_chunks([left, right])
+
+    assert block.text == "The quick brown fox jumps over the lazy dog near the river bank at dawn"
+
+
+def test_budget_is_filled_in_score_order():
+    chunks = spans()
+    candidates = retrieved(chunks, [0, 1, 8, 15], [0.5, 0.6, 0.9, 0.7])
+    merged = merge_chunks(candidates)
+    block_tokens = [len(ENCODING.encode_ordinary(block.render())) for block in merged]
+    separator = len(ENCODING.encode_ordinary(BLOCK_SEPARATOR))
+
+    # İlk iki blok sığar, üçüncü (0+1 birleşik) sığmaz
+    budget = block_tokens[0] + separator + block_tokens[1] + 5
+    packed = pack_context(candidates, max_tokens=budget, encoding=ENCODING)
+
+    assert packed.tokens <= budget
+    assert packed.tokens == len(ENCODING.encode_ordinary(packed.text))
+    assert [chunk["chunk_index"] for chunk in packed.chunks] == [8, 15]
+    assert packed.text.startswith(merged[0].render())
+
+
+def test_oversized_best_block_is_truncated_to_budget():
+    chunks = spans()
+    packed = pack_context(retrieved(chunks, [0, 1, 2], [0.9, 0.8, 0.7]), max_tokens=40, encoding=ENCODING)
+
+    assert 0 < packed.tokens <= 40
+    assert packed.text.startswith("Source File: doc.txt\nContent: " + DOCUMENT[:20])
+
+
+def test_zero_budget_means_unlimited():
+    chunks = spans()
+    packed = pack_context(retrieved(chunks, [0, 9], [0.9, 0.8]), max_tokens=0, encoding=ENCODING)
+
+    assert len(packed.chunks) == 2
@@ -0,0 +1,104 @@
+"""
+Tests for token-aware embedding batching.
+"""
+import base64
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+import openai
+import pytest
+
+from app.services import embedding_batcher
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+class WordEncoding:
+    """One token per whitespace-separated word."""
+
+    def encode_ordinary(self, text):
+        return text.split()
+
+    def encode_ordinary_batch(self, texts):
+        return [self.encode_ordinary(text) for text in texts]
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+def encode(values):
+    return base64.b64encode(np.asarray(values, dtype=np.float32).tobytes()).decode()
+
+
+class FakeEmbeddingsClient:
+    def __init__(self, failures=0):
+        self.calls = []
+        self.failures = failures
+        self.embeddings = self
+
+    def with_options(self, **kwargs):
+        return self
+
+    def create(self, input, model, encoding_format=None):
+        assert encoding_format == "base64"
+        self.calls.append(list(input))
+        if self.failures:
+            self.failures -= 1
+            request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+            raise openai.RateLimitError(
+                "rate limited", response=httpx.Response(429, request=request), body=None
+            )
+        # Shuffle response order to check index-based reordering
+        data = [
+            SimpleNamespace(index=i, embedding=encode([float(len(text.split()))]))
+            for i, text in enumerate(input)
+        ]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(embedding_batcher.time, "sleep", lambda seconds: None)
+
+
+def make_batcher(client, **kwargs):
+    return EmbeddingBatcher(client, model="test-model", encoding=WordEncoding(), **kwargs)
+
+
+def test_plan_batches_respects_token_and_input_limits():
+    """Batches should never exceed the token or input budget."""
+    batcher = make_batcher(FakeEmbeddingsClient(), max_batch_tokens=10, max_batch_inputs=3)
+    batches = batcher.plan_batches([4, 4, 4, 1, 1, 1, 1, 12])
+    assert batches == [[0, 1], [2, 3, 4], [5, 6], [7]]
+
+
+def test_embed_preserves_input_order():
+    """Results should line up with inputs even across concurrent batches."""
+    client = FakeEmbeddingsClient()
+    batcher = make_batcher(client, max_batch_tokens=5, max_concurrency=3)
+    texts = ["a " * n for n in [1, 2, 3, 4, 5, 1, 2]]
+
+    embeddings = batcher.embed(texts)
+
+    assert embeddings.dtype == np.float32
+    assert embeddings.tolist() == [[float(n)] for n in [1, 2, 3, 4, 5, 1, 2]]
+    assert len(client.calls) > 1
+
+
+def test_embed_retries_rate_limits():
+    """429 responses should be retried until the call succeeds."""
+    client = FakeEmbeddingsClient(failures=2)
+    batcher = make_batcher(client, max_retries=3)
+
+    assert batcher.embed(["one two"]).tolist() == [[2.0]]
+    assert len(client.calls) == 3
+
+
+def test_embed_gives_up_after_max_retries():
+    """Retries should be bounded."""
+    client = FakeEmbeddingsClient(failures=5)
+    batcher = make_batcher(client, max_retries=1)
+
+    with pytest.raises(openai.RateLimitError):
+        batcher.embed(["one"])
+    assert len(client.calls) == 2
@@ -0,0 +1,63 @@
+"""
+Tests for the on-disk embedding cache.
+"""
+import numpy as np
+import pytest
+
+from app.services.embedding_cache import EmbeddingCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(path=str(tmp_path / "embeddings.sqlite3"), max_bytes=10_000)
+
+
+def test_roundtrip_as_float32(cache):
+    """Stored vectors should come back (float32 precision) for the same model."""
+    cache.put_many("model-a", ["hello"], [[0.1, 0.2, 0.3]])
+
+    [vector] = cache.get_many("model-a", ["hello"])
+    assert vector.dtype == np.float32
+    assert vector.tolist() == pytest.approx([0.1, 0.2, 0.3], rel=1e-6)
+
+    # Different model, different key
+    assert cache.get_many("model-b", ["hello"]) == [None]
+
+
+def test_hit_rate_stats(cache):
+    """Hits and misses should be counted per looked-up text."""
+    cache.put_many("m", ["a"], [[1.0]])
+    cache.get_many("m", ["a", "b", "a"])
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == pytest.approx(2 / 3, abs=1e-3)
+    assert stats["entries"] == 1
+
+
+def test_lru_eviction(cache):
+    """Least recently used vectors should be evicted past max_bytes."""
+    vector = [0.0] * 500  # 2000 bytes as float32
+    for i in range(4):
+        cache.put_many("m", [f"text-{i}"], [vector])
+
+    # Touch text-0 so text-1 becomes the oldest
+    cache.get_many("m", ["text-0"])
+    cache.put_many("m", ["text-4", "text-5"], [vector, vector])
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 10_000
+    assert stats["evictions"] > 0
+    assert cache.get_many("m", ["text-1"]) == [None]
+    assert cache.get_many("m", ["text-0"])[0] is not None
+    assert cache.get_many("m", ["text-5"])[0] is not None
+
+
+def test_shared_between_instances(tmp_path):
+    """Two cache objects on the same file (e.g. two workers) see each other's writes."""
+    path = str(tmp_path / "shared.sqlite3")
+    EmbeddingCache(path=path).put_many("m", ["shared"], [[0.5]])
+
+    [vector] = EmbeddingCache(path=path).get_many("m", ["shared"])
+    assert vector.tolist() == [0.5]
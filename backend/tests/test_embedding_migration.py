@@ -0,0 +1,202 @@
+"""
+Tests for blue/green embedding model / dimension migration.
+"""
+import numpy as np
+import pytest
+from sqlalchemy.sql import func
+
+from app.models import User, Room, Document, EmbeddingMigration
+from app.services.chunk_store import save_chunks
+from app.services.chunker import ChunkSpan
+from app.services.document_processor import document_processor
+from app.services.embedding_migration import (
+    TokenThrottle,
+    copy_room,
+    finalize_migration,
+    rollback_migration,
+    start_migration,
+    switch_room
+)
+from app.services.garbage_collector import purge_deleted_documents
+from app.services.local_vector_store import LocalVectorStore
+from app.services.vector_store import vector_id
+
+OLD_DIM = 16
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalVectorStore(path=str(tmp_path / "vectors"))
+
+
+@pytest.fixture
+def embed_calls(monkeypatch):
+    calls = []
+
+    def fake_create_embeddings(texts, token_counts=None, model=None, dimensions=None):
+        calls.append((model, dimensions, list(texts)))
+        return np.ones((len(texts), dimensions or OLD_DIM), dtype=np.float32)
+
+    monkeypatch.setattr(document_processor, "create_embeddings", fake_create_embeddings)
+    return calls
+
+
+@pytest.fixture
+def room(db):
+    user = User(email="migrate@example.com", name="Migrate User", password_hash="x")
+    db.add(user)
+    db.flush()
+    room = Room(
+        user_id=user.id, name="Room", pinecone_namespace="room_old",
+        embedding_model="text-embedding-3-small", embedding_dimensions=0
+    )
+    db.add(room)
+    db.commit()
+    return room
+
+
+def add_document(db, store, room, chunks, legacy=False, status="completed"):
+    document = Document(
+        room_id=room.id, filename="a.txt", file_path="/tmp/a.txt",
+        status=status, chunk_count=chunks, chunks_done=chunks
+    )
+    db.add(document)
+    db.flush()
+    if not legacy:
+        save_chunks(db, document.id, 0, [ChunkSpan(0, 5, None, 2, f"doc {document.id} chunk {i}") for i in range(chunks)])
+    db.commit()
+    metadata = [
+        {"document_id": document.id, "chunk_index": i, **({"text": f"legacy {i}"} if legacy else {})}
+        for i in range(chunks)
+    ]
+    store.upsert(
+        room.pinecone_namespace,
+        [vector_id(document.id, i) for i in range(chunks)],
+        np.ones((chunks, OLD_DIM), dtype=np.float32),
+        metadata
+    )
+    return document
+
+
+def test_copy_switch_and_finalize(db, store, room, embed_calls):
+    first = add_document(db, store, room, 5)
+    legacy = add_document(db, store, room, 2, legacy=True)
+
+    migration = start_migration(db, room, "text-embedding-3-small", 8)
+    assert copy_room(db, migration, store=store, batch_chunks=2)
+    assert switch_room(db, migration)
+
+    db.refresh(room)
+    assert (room.pinecone_namespace, room.embedding_model, room.embedding_dimensions) == (
+        migration.target_namespace, "text-embedding-3-small", 8
+    )
+    # Text chunks tablosundan, eski dökümanda vektör metadata'sından
+    texts = [text for _, _, batch in embed_calls for text in batch]
+    assert texts == [f"doc {first.id} chunk {i}" for i in range(5)] + ["legacy 0", "legacy 1"]
+    assert all((model, dims) == ("text-embedding-3-small", 8) for model, dims, _ in embed_calls)
+
+    target = store.fetch(migration.target_namespace, [vector_id(first.id, 0), vector_id(legacy.id, 1)])
+    assert target[vector_id(first.id, 0)].values.shape == (8,)
+    assert target[vector_id(legacy.id, 1)].metadata["text"] == "legacy 1"
+    # Eski namespace doğrulanana kadar duruyor
+    assert store.stats()["namespaces"] == {"room_old": 7, migration.target_namespace: 7}
+
+    finalize_migration(db, migration, store=store)
+    assert store.stats()["namespaces"] == {migration.target_namespace: 7}
+    assert migration.status == "finalized"
+
+
+def test_copy_resumes_from_checkpoint(db, store, room, embed_calls, monkeypatch):
+    document = add_document(db, store, room, 6)
+    migration = start_migration(db, room, "text-embedding-3-large", 256)
+    upsert = store.upsert
+    failures = iter([False, True])
+
+    def flaky_upsert(*args):
+        if next(failures, False):
+            raise RuntimeError("vector store down")
+        return upsert(*args)
+
+    monkeypatch.setattr(store, "upsert", flaky_upsert)
+    with pytest.raises(RuntimeError):
+        copy_room(db, migration, store=store, batch_chunks=2)
+    db.rollback()
+
+    assert (migration.copied_document_id, migration.copied_chunks) == (0, 2)
+    # Aynı hedefe yeniden başlatma yarım kalan migration'ı döndürür
+    assert start_migration(db, room, "text-embedding-3-large", 256).id == migration.id
+
+    embed_calls.clear()
+    assert copy_room(db, migration, store=store, batch_chunks=2)
+    assert [text for _, _, batch in embed_calls for text in batch] == [f"doc {document.id} chunk {i}" for i in range(2, 6)]
+    assert migration.chunks_total == 6
+
+
+def test_switch_waits_for_documents_being_processed(db, store, room, embed_calls):
+    add_document(db, store, room, 2)
+    busy = add_document(db, store, room, 1, status="processing")
+    migration = start_migration(db, room, "text-embedding-3-small", 8)
+
+    assert not copy_room(db, migration, store=store)
+    assert not switch_room(db, migration)
+    assert room.pinecone_namespace == "room_old"
+
+    busy.status = "completed"
+    db.commit()
+    assert copy_room(db, migration, store=store)
+    assert switch_room(db, migration)
+
+
+def test_pending_documents_do_not_block_the_switch(db, store, room, embed_calls):
+    add_document(db, store, room, 2)
+    add_document(db, store, room, 0, status="pending")
+    migration = start_migration(db, room, "text-embedding-3-small", 8)
+
+    # Henüz işlenmemiş döküman değişimden sonra yeni namespace'e işlenir
+    assert not copy_room(db, migration, store=store)
+    assert switch_room(db, migration)
+
+
+def test_rollback_restores_the_old_namespace(db, store, room, embed_calls):
+    add_document(db, store, room, 3)
+    migration = start_migration(db, room, "text-embedding-3-small", 8)
+    copy_room(db, migration, store=store)
+    switch_room(db, migration)
+
+    rollback_migration(db, migration, store=store)
+
+    db.refresh(room)
+    assert (room.pinecone_namespace, room.embedding_model, room.embedding_dimensions) == (
+        "room_old", "text-embedding-3-small", 0
+    )
+    assert store.stats()["namespaces"] == {"room_old": 3}
+    assert db.query(EmbeddingMigration).one().status == "rolled_back"
+
+
+def test_deleted_document_is_purged_from_the_shadow_namespace(db, store, room, embed_calls):
+    document = add_document(db, store, room, 3)
+    migration = start_migration(db, room, "text-embedding-3-small", 8)
+    copy_room(db, migration, store=store)
+
+    document.deleted_at = func.now()
+    db.commit()
+    purge_deleted_documents(db, store)
+
+    assert store.stats()["namespaces"] == {}
+
+
+def test_throttle_paces_tokens_per_minute():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    throttle = TokenThrottle(tokens_per_minute=600, sleep=sleep, clock=lambda: now[0])
+    throttle.wait(100)
+    throttle.wait(100)
+    throttle.wait(50)
+
+    # 100 token = 10 saniyelik bütçe
+    assert sleeps == [pytest.approx(10.0), pytest.approx(10.0)]
@@ -0,0 +1,194 @@
+"""
+Tests for the deferred cleanup of soft-deleted rooms and documents.
+"""
+import os
+import time
+
+import numpy as np
+import pytest
+from sqlalchemy.sql import func
+
+from app.config import settings
+from app.models import User, Room, Document, Chunk, IngestionJob, Message
+from app.services.chunk_store import load_chunks, save_chunks
+from app.services.chunker import ChunkSpan
+from app.services.garbage_collector import (
+    GarbageCollector,
+    purge_deleted_documents,
+    purge_deleted_rooms,
+    purge_failed_documents,
+    purge_orphan_files,
+    reconcile
+)
+from app.services.local_vector_store import LocalVectorStore
+from app.services.text_sidecar import sidecar_path
+from app.services.vector_cache import room_vector_version
+from app.services.vector_store import vector_id
+
+DIM = 8
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalVectorStore(path=str(tmp_path / "vectors"))
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    path = tmp_path / "uploads"
+    path.mkdir()
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def room(db):
+    user = User(email="gc@example.com", name="GC User", password_hash="x")
+    db.add(user)
+    db.flush()
+    room = Room(user_id=user.id, name="GC Room", pinecone_namespace="room_gc")
+    db.add(room)
+    db.commit()
+    return room
+
+
+def add_document(db, store, room, upload_dir, name, chunks=3):
+    path = upload_dir / f"user_{room.user_id}" / f"room_{room.id}" / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("content")
+    sidecar_path(str(path)).write_text("text")
+    document = Document(room_id=room.id, filename=name, file_path=str(path), chunks_done=chunks, chunk_count=chunks)
+    db.add(document)
+    db.flush()
+    save_chunks(db, document.id, 0, [ChunkSpan(0, 5, None, 1, f"chunk {i}") for i in range(chunks)])
+    db.commit()
+    store.upsert(
+        room.pinecone_namespace,
+        [vector_id(document.id, i) for i in range(chunks)],
+        np.random.default_rng(document.id).standard_normal((chunks, DIM)).astype(np.float32),
+        [{"document_id": document.id, "chunk_index": i} for i in range(chunks)]
+    )
+    return document
+
+
+def test_soft_deleted_document_is_hidden_then_purged(db, store, room, upload_dir):
+    kept = add_document(db, store, room, upload_dir, "kept.txt")
+    deleted = add_document(db, store, room, upload_dir, "deleted.txt")
+    version = room_vector_version(db, room.id)
+    path = deleted.file_path
+
+    deleted.deleted_at = func.now()
+    db.commit()
+
+    # Silme anında: parmak izi değişir, chunk'lar hydration'a girmez
+    assert room_vector_version(db, room.id) != version
+    assert load_chunks(db, [(deleted.id, 0)]) == {}
+
+    assert purge_deleted_documents(db, store) == 1
+
+    assert db.query(Document).all() == [kept]
+    assert db.query(Chunk).filter(Chunk.document_id == deleted.id).count() == 0
+    assert not os.path.exists(path) and not sidecar_path(path).exists()
+    assert os.path.exists(kept.file_path)
+    assert store.stats()["namespaces"] == {"room_gc": 3}
+    assert store.fetch("room_gc", [vector_id(kept.id, 0)])
+
+
+def test_document_with_running_job_waits(db, store, room, upload_dir):
+    document = add_document(db, store, room, upload_dir, "busy.txt")
+    job = IngestionJob(document_id=document.id, status="processing")
+    db.add(job)
+    document.deleted_at = func.now()
+    db.commit()
+
+    assert purge_deleted_documents(db, store) == 0
+
+    job.status = "completed"
+    db.commit()
+    assert purge_deleted_documents(db, store) == 1
+    assert db.query(IngestionJob).count() == 0
+
+
+def test_failed_document_partial_upload_is_hidden_then_purged(db, store, room, upload_dir):
+    kept = add_document(db, store, room, upload_dir, "kept.txt")
+    failed = add_document(db, store, room, upload_dir, "failed.txt")
+    failed.status = "failed"
+    failed.chunks_total = None
+    db.commit()
+
+    # Başarısız dökümanın yüklenmiş batch'leri cevaplara girmez
+    assert set(load_chunks(db, [(kept.id, 0), (failed.id, 0)])) == {(kept.id, 0)}
+
+    assert purge_failed_documents(db, store) == 1
+    assert purge_failed_documents(db, store) == 0
+
+    db.expire_all()
+    assert (failed.status, failed.chunks_done) == ("failed", 0)
+    assert os.path.exists(failed.file_path)
+    assert db.query(Chunk).filter(Chunk.document_id == failed.id).count() == 0
+    assert store.stats()["namespaces"] == {"room_gc": 3}
+    assert store.fetch("room_gc", [vector_id(failed.id, 0)]) == {}
+
+
+def test_collector_compacts_vectors_after_purging(db, store, room, upload_dir, monkeypatch):
+    monkeypatch.setattr(settings, "LOCAL_VECTOR_COMPACT_DEAD_FRACTION", 0.5)
+    kept = add_document(db, store, room, upload_dir, "kept.txt", chunks=2)
+    deleted = add_document(db, store, room, upload_dir, "deleted.txt", chunks=4)
+    deleted.deleted_at = func.now()
+    db.commit()
+
+    result = GarbageCollector(store=store).run_once()
+
+    assert (result["documents"], result["compacted_vectors"]) == (1, 4)
+    assert store._namespace("room_gc").dead_rows() == (0, 2)
+    assert set(store.fetch("room_gc", [vector_id(kept.id, i) for i in range(2)])) == {vector_id(kept.id, i) for i in range(2)}
+
+
+def test_room_is_purged_after_its_documents(db, store, room, upload_dir):
+    document = add_document(db, store, room, upload_dir, "a.txt")
+    db.add(Message(room_id=room.id, user_id=room.user_id, message_type="user", content="hi"))
+    room.deleted_at = func.now()
+    document.deleted_at = func.now()
+    db.commit()
+
+    # Dökümanları duran oda beklemede
+    assert purge_deleted_rooms(db, store) == 0
+
+    assert purge_deleted_documents(db, store) == 1
+    assert purge_deleted_rooms(db, store) == 1
+
+    assert db.query(Room).count() == 0
+    assert db.query(Message).count() == 0
+    assert store.stats()["namespaces"] == {}
+    assert not (upload_dir / f"user_{room.user_id}" / f"room_{room.id}").exists()
+
+
+def test_orphan_files_older_than_grace_are_removed(db, store, room, upload_dir):
+    document = add_document(db, store, room, upload_dir, "live.txt")
+    orphan = upload_dir / "orphan.txt"
+    orphan.write_text("x")
+    fresh = upload_dir / "uploading.txt"
+    fresh.write_text("x")
+    old = time.time() - 7200
+    for path in (orphan, sidecar_path(document.file_path)):
+        os.utime(path, (old, old))
+
+    assert purge_orphan_files(db, grace_seconds=3600) == 1
+
+    assert not orphan.exists()
+    assert fresh.exists()
+    assert os.path.exists(document.file_path) and sidecar_path(document.file_path).exists()
+
+
+def test_reconcile_only_reports(db, store, room, upload_dir):
+    document = add_document(db, store, room, upload_dir, "a.txt", chunks=3)
+    document.status = "completed"
+    store.upsert("room_unknown", ["x"], np.ones((1, DIM), dtype=np.float32), [{}])
+    # Kaybolmuş bir batch: veritabanı 3, index 2 vektör
+    store.delete("room_gc", [vector_id(document.id, 2)])
+    db.commit()
+
+    report = reconcile(db, store)
+
+    assert report == {"unknown": ["room_unknown"], "drift": ["room_gc"]}
+    assert store.stats()["namespaces"] == {"room_gc": 2, "room_unknown": 1}
@@ -0,0 +1,180 @@
+"""
+Tests for the pipelined process_document (extract -> embed -> upsert).
+"""
+import threading
+import time
+
+import numpy as np
+import PyPDF2
+import pytest
+
+from app.config import settings
+from app.services.document_processor import DocumentProcessor, InsufficientTextError
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_BATCH_CHUNKS", 3)
+    monkeypatch.setattr(settings, "INGEST_QUEUE_DEPTH", 1)
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_ENABLED", False)
+
+    processor = DocumentProcessor()
+    processor.upserted = []
+
+    def fake_embed(texts, token_counts=None):
+        return np.array([[float(len(text))] for text in texts], dtype=np.float32)
+
+    def fake_upsert(namespace, chunks, embeddings, document_id, start_index=0, store=None):
+        time.sleep(0.01 * (start_index % 2))  # batch'ler sırasız bitsin
+        ids = [f"doc_{document_id}_chunk_{i}" for i in range(start_index, start_index + len(chunks))]
+        processor.upserted.extend(zip(ids, (chunk.text for chunk in chunks)))
+        return ids
+
+    monkeypatch.setattr(processor.embedding_batcher, "embed", fake_embed)
+    monkeypatch.setattr(processor, "upsert_vectors", fake_upsert)
+    return processor
+
+
+@pytest.fixture
+def text_file(tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_text(
+        "\n\n".join(f"Paragraph {i}. " + "Some searchable words here. " * 40 for i in range(20)),
+        encoding="utf-8"
+    )
+    return path
+
+
+def test_pipeline_upserts_all_chunks_in_order(processor, text_file):
+    expected = processor.chunk_text(text_file.read_text(encoding="utf-8"))
+
+    result = processor.process_document(str(text_file), 7, "doc.txt", "ns")
+
+    assert result["chunk_count"] == len(expected)
+    assert result["vector_ids"] == [f"doc_7_chunk_{i}" for i in range(len(expected))]
+    upserted = dict(processor.upserted)
+    assert [upserted[vector_id] for vector_id in result["vector_ids"]] == expected
+
+
+def test_pipeline_reports_progress(processor, text_file):
+    progress = []
+    threads = set()
+
+    def on_progress(done, total):
+        threads.add(threading.current_thread().name)
+        progress.append((done, total))
+
+    result = processor.process_document(str(text_file), 7, "doc.txt", "ns", on_progress=on_progress)
+
+    # Progress callback çağıran thread'de, tamamlanan ön ek sırasıyla çalışır
+    assert threads == {threading.current_thread().name}
+    done = [d for d, _ in progress]
+    assert done == sorted(done)
+    assert len(progress) > 1
+    assert progress[-1] == (result["chunk_count"], result["chunk_count"])
+
+
+def test_pipeline_propagates_stage_errors(processor, text_file, monkeypatch):
+    def failing_embed(texts, token_counts=None):
+        raise RuntimeError("embedding down")
+
+    monkeypatch.setattr(processor.embedding_batcher, "embed", failing_embed)
+
+    with pytest.raises(RuntimeError, match="embedding down"):
+        processor.process_document(str(text_file), 7, "doc.txt", "ns")
+
+    assert processor.upserted == []
+    assert not [t for t in threading.enumerate() if t.name.startswith("ingest-")]
+
+
+def test_pipeline_keeps_several_embedding_batches_in_flight(processor, text_file, monkeypatch):
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+
+    def slow_embed(texts, token_counts=None):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return np.array([[float(len(text))] for text in texts], dtype=np.float32)
+
+    monkeypatch.setattr(processor.embedding_batcher, "embed", slow_embed)
+    expected = processor.chunk_text(text_file.read_text(encoding="utf-8"))
+
+    result = processor.process_document(str(text_file), 7, "doc.txt", "ns")
+
+    assert peak[0] > 1
+    assert result["vector_ids"] == [f"doc_7_chunk_{i}" for i in range(len(expected))]
+    upserted = dict(processor.upserted)
+    assert [upserted[vector_id] for vector_id in result["vector_ids"]] == expected
+
+
+def test_pipeline_rejects_short_documents(processor, tmp_path):
+    path = tmp_path / "short.txt"
+    path.write_text("too short", encoding="utf-8")
+
+    with pytest.raises(InsufficientTextError, match="Yetersiz text"):
+        processor.process_document(str(path), 7, "short.txt", "ns")
+
+
+def test_short_document_check_does_not_depend_on_batch_size(processor, tmp_path, monkeypatch):
+    # Tek chunk'lık batch'ler: chunk kuyruğa girdikten sonra da kontrol edilir
+    monkeypatch.setattr(settings, "INGEST_BATCH_CHUNKS", 1)
+    path = tmp_path / "short.txt"
+    path.write_text("too short", encoding="utf-8")
+
+    with pytest.raises(InsufficientTextError):
+        processor.process_document(str(path), 7, "short.txt", "ns")
+
+
+def test_pipeline_stores_chunks_before_upserting(processor, text_file):
+    stored = []
+    upserted_before = []
+
+    def on_chunks(start_index, chunks):
+        # Batch'in vektörleri henüz gönderilmemiş olmalı
+        upserted_before.append(any(
+            vector_id == f"doc_7_chunk_{start_index}" for vector_id, _ in processor.upserted
+        ))
+        stored.extend(enumerate((chunk.text for chunk in chunks), start=start_index))
+
+    result = processor.process_document(str(text_file), 7, "doc.txt", "ns", on_chunks=on_chunks)
+
+    assert [i for i, _ in stored] == list(range(result["chunk_count"]))
+    assert not any(upserted_before)
+    assert dict(stored) == {int(vector_id.rsplit("_", 1)[1]): text for vector_id, text in processor.upserted}
+
+
+def test_pdf_pages_are_embedded_while_later_pages_are_read(processor, tmp_path, monkeypatch):
+    events = []
+
+    class FakePage:
+        def __init__(self, number):
+            self.number = number
+
+        def extract_text(self):
+            events.append(("extract", self.number))
+            return f"Page {self.number}. " + "Some searchable words here. " * 150
+
+    class FakeReader:
+        def __init__(self, file):
+            self.pages = [FakePage(i) for i in range(20)]
+
+    def fake_embed(texts, token_counts=None):
+        events.append(("embed", len(texts)))
+        return np.ones((len(texts), 1), dtype=np.float32)
+
+    monkeypatch.setattr(PyPDF2, "PdfReader", FakeReader)
+    monkeypatch.setattr(processor.embedding_batcher, "embed", fake_embed)
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"%PDF-1.4 fake")
+
+    processor.process_document(str(path), 7, "doc.pdf", "ns")
+
+    # Sayfalar akış halinde gelir: ilk batch son sayfa okunmadan embed edilir
+    first_embed = next(i for i, (kind, _) in enumerate(events) if kind == "embed")
+    assert first_embed < events.index(("extract", 19))
+    assert [n for kind, n in events if kind == "extract"] == list(range(20))
@@ -0,0 +1,171 @@
+"""
+Tests for the Postgres-backed ingestion job queue.
+"""
+from datetime import datetime, timedelta, timezone
+import time
+
+import pytest
+
+from app.models import User, Room, Document, IngestionJob
+from app.services.job_queue import (
+    enqueue_document,
+    claim_next_job,
+    complete_job,
+    fail_job,
+    recover_stale_jobs,
+    renew_job_lock,
+)
+from app import worker as worker_module
+from app.services.document_processor import InsufficientTextError
+from app.worker import IngestionWorker
+
+
+@pytest.fixture
+def document(db):
+    """Create a user, room and unprocessed document."""
+    user = User(email="queue@example.com", name="Queue User", password_hash="x")
+    db.add(user)
+    db.flush()
+    room = Room(user_id=user.id, name="Queue Room", pinecone_namespace="room_queue")
+    db.add(room)
+    db.flush()
+    doc = Document(room_id=room.id, filename="a.txt", file_path="/tmp/a.txt", status="pending")
+    db.add(doc)
+    db.commit()
+    return doc
+
+
+def test_claim_marks_job_processing(db, document):
+    """Claiming a job should lock it and flag the document as processing."""
+    enqueue_document(db, document.id)
+    db.commit()
+
+    job = claim_next_job(db, "worker-1")
+    assert job is not None
+    assert job.status == "processing"
+    assert job.attempts == 1
+    assert job.locked_by == "worker-1"
+
+    db.refresh(document)
+    assert document.status == "processing"
+
+    # Nothing else is runnable
+    assert claim_next_job(db, "worker-2") is None
+
+
+def test_complete_job(db, document):
+    """Completed jobs should not be claimed again."""
+    enqueue_document(db, document.id)
+    db.commit()
+
+    job = claim_next_job(db, "worker-1")
+    complete_job(db, job)
+
+    assert job.status == "completed"
+    assert claim_next_job(db, "worker-1") is None
+
+
+def test_fail_job_schedules_retry_with_backoff(db, document):
+    """A failed attempt should go back to pending with a future run_after."""
+    enqueue_document(db, document.id)
+    db.commit()
+
+    job = claim_next_job(db, "worker-1")
+    fail_job(db, job, "boom")
+
+    assert job.status == "pending"
+    assert job.last_error == "boom"
+    assert job.run_after > datetime.now(timezone.utc)
+    # Backoff not elapsed yet
+    assert claim_next_job(db, "worker-1") is None
+
+
+def test_fail_job_exhausts_attempts(db, document):
+    """After max_attempts the job and document should be failed."""
+    job = enqueue_document(db, document.id)
+    job.max_attempts = 1
+    db.commit()
+
+    job = claim_next_job(db, "worker-1")
+    fail_job(db, job, "boom")
+
+    assert job.status == "failed"
+    db.refresh(document)
+    assert document.status == "failed"
+
+
+def test_permanent_error_fails_without_retry(db, document, monkeypatch):
+    """A PermanentJobError fails the job on its first attempt."""
+    enqueue_document(db, document.id)
+    db.commit()
+
+    def short_document(document_id):
+        raise InsufficientTextError(9)
+
+    monkeypatch.setattr(worker_module, "process_document_task", short_document)
+
+    assert IngestionWorker(worker_id="worker-1").run_once() is True
+
+    job = db.query(IngestionJob).one()
+    db.refresh(job)
+    assert (job.status, job.attempts) == ("failed", 1)
+    assert job.last_error.startswith("Yetersiz text")
+    db.refresh(document)
+    assert document.status == "failed"
+
+
+def test_recover_stale_jobs(db, document):
+    """Jobs abandoned in processing should be put back in the queue."""
+    enqueue_document(db, document.id)
+    db.commit()
+
+    job = claim_next_job(db, "dead-worker")
+    job.locked_at = datetime.now(timezone.utc) - timedelta(hours=2)
+    db.commit()
+
+    assert recover_stale_jobs(db, stale_after_seconds=60) == 1
+
+    job = db.query(IngestionJob).filter(IngestionJob.id == job.id).first()
+    assert job.status == "pending"
+    assert job.locked_by is None
+
+
+def test_heartbeat_keeps_long_jobs_from_going_stale(db, document):
+    """A renewed lock should survive stale recovery; another worker cannot renew it."""
+    enqueue_document(db, document.id)
+    db.commit()
+
+    job = claim_next_job(db, "worker-1")
+    job.locked_at = datetime.now(timezone.utc) - timedelta(hours=2)
+    db.commit()
+
+    assert renew_job_lock(db, job.id, "worker-2") is False
+    assert renew_job_lock(db, job.id, "worker-1") is True
+    assert recover_stale_jobs(db, stale_after_seconds=60) == 0
+
+    db.refresh(job)
+    assert job.status == "processing"
+
+
+def test_worker_renews_lock_while_processing(db, document, monkeypatch):
+    """The worker heartbeats from its own thread while the task runs."""
+    enqueue_document(db, document.id)
+    db.commit()
+    renewals = []
+
+    def slow_task(document_id):
+        time.sleep(0.3)
+
+    def counting_renew(session, job_id, worker_id):
+        renewals.append(job_id)
+        return renew_job_lock(session, job_id, worker_id)
+
+    monkeypatch.setattr(worker_module, "process_document_task", slow_task)
+    monkeypatch.setattr(worker_module, "renew_job_lock", counting_renew)
+
+    assert IngestionWorker(worker_id="worker-1", heartbeat_interval=0.05).run_once() is True
+
+    assert len(renewals) >= 2
+    job = db.query(IngestionJob).one()
+    db.refresh(job)
+    assert (job.status, job.locked_at) == ("completed", None)
@@ -0,0 +1,206 @@
+"""
+Tests for the local memory-mapped vector store backend.
+"""
+import numpy as np
+import pytest
+
+from app.services.local_vector_store import LocalVectorStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalVectorStore(path=str(tmp_path / "vectors"))
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_query_returns_top_k_by_cosine(store):
+    vectors = np.stack([unit(1, 0, 0), unit(0, 1, 0), unit(1, 1, 0), unit(0, 0, 1)])
+    store.upsert("ns", ["a", "b", "ab", "c"], vectors, [{"n": i} for i in range(4)])
+
+    matches = store.query("ns", unit(1, 0.1, 0), top_k=2)
+
+    assert [m.id for m in matches] == ["a", "ab"]
+    assert matches[0].score == pytest.approx(float(unit(1, 0, 0) @ unit(1, 0.1, 0)), rel=1e-5)
+    assert matches[0].metadata == {"n": 0}
+
+
+def test_upsert_overwrites_existing_ids(store):
+    store.upsert("ns", ["a"], np.stack([unit(1, 0)]), [{"v": 1}])
+    store.upsert("ns", ["a"], np.stack([unit(0, 1)]), [{"v": 2}])
+
+    [match] = store.query("ns", unit(0, 1), top_k=5)
+    assert match.id == "a"
+    assert match.score == pytest.approx(1.0)
+    assert match.metadata == {"v": 2}
+    assert store.stats()["namespaces"] == {"ns": 1}
+
+
+def test_delete_and_fetch(store):
+    vectors = np.stack([unit(1, 0), unit(0, 1), unit(1, 1)])
+    store.upsert("ns", ["a", "b", "c"], vectors, [{}, {}, {}])
+
+    store.delete("ns", ["b"])
+
+    assert {m.id for m in store.query("ns", unit(0, 1), top_k=10)} == {"a", "c"}
+    fetched = store.fetch("ns", ["a", "b"])
+    assert set(fetched) == {"a"}
+    np.testing.assert_allclose(fetched["a"].values, unit(1, 0))
+
+
+def test_namespaces_are_isolated_and_deletable(store):
+    store.upsert("room_1", ["a"], np.stack([unit(1, 0)]), [{}])
+    store.upsert("room_2", ["b"], np.stack([unit(1, 0)]), [{}])
+
+    store.delete_namespace("room_1")
+
+    assert store.query("room_1", unit(1, 0), top_k=5) == []
+    assert [m.id for m in store.query("room_2", unit(1, 0), top_k=5)] == ["b"]
+    stats = store.stats()
+    assert stats["namespaces"] == {"room_2": 1}
+    assert stats["dimension"] == 2
+
+    # Silinen namespace tekrar kullanılabilir (farklı boyutla bile)
+    store.upsert("room_1", ["x"], np.stack([unit(1, 0, 0)]), [{}])
+    assert [m.id for m in store.query("room_1", unit(1, 0, 0), top_k=5)] == ["x"]
+
+
+def test_grows_past_initial_capacity(store):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((3000, 8)).astype(np.float32)
+    ids = [f"v{i}" for i in range(3000)]
+    for start in range(0, 3000, 700):
+        store.upsert("ns", ids[start:start + 700], vectors[start:start + 700], [{}] * len(ids[start:start + 700]))
+
+    assert store.stats()["total_vector_count"] == 3000
+    [match] = store.query("ns", vectors[2999], top_k=1)
+    assert match.id == "v2999"
+    assert sum(len(batch) for batch in store.iter_vectors("ns", batch_size=500)) == 3000
+
+
+def test_reader_sees_writes_from_another_instance(tmp_path):
+    """API ve worker ayrı process'lerde aynı dosyaları kullanır."""
+    path = str(tmp_path / "shared")
+    reader = LocalVectorStore(path=path)
+    writer = LocalVectorStore(path=path)
+
+    writer.upsert("ns", ["a"], np.stack([unit(1, 0)]), [{}])
+    assert [m.id for m in reader.query("ns", unit(1, 0), top_k=1)] == ["a"]
+
+    writer.upsert("ns", ["b"], np.stack([unit(0, 1)]), [{}])
+    writer.delete("ns", ["a"])
+    assert [m.id for m in reader.query("ns", unit(1, 0), top_k=5)] == ["b"]
+
+
+def test_dimension_mismatch_is_rejected(store):
+    store.upsert("ns", ["a"], np.stack([unit(1, 0)]), [{}])
+
+    with pytest.raises(ValueError):
+        store.upsert("ns", ["b"], np.stack([unit(1, 0, 0)]), [{}])
+
+
+def clustered(rng, count, dim, clusters=20):
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, count)
+    return centers[labels] + 0.5 * rng.standard_normal((count, dim)).astype(np.float32)
+
+
+@pytest.mark.parametrize("quantization, min_recall", [("int8", 0.95), ("binary", 0.8)])
+def test_quantized_search_rescores_with_exact_cosine(tmp_path, quantization, min_recall):
+    rng = np.random.default_rng(1)
+    vectors = clustered(rng, 2000, 256)
+    ids = [f"v{i}" for i in range(2000)]
+    exact_store = LocalVectorStore(path=str(tmp_path), quantization="none")
+    exact_store.upsert("ns", ids, vectors, [{}] * 2000)
+    store = LocalVectorStore(path=str(tmp_path), quantization=quantization, rescore_factor=10)
+
+    hits = 0
+    for query in vectors[:20] + 0.1 * rng.standard_normal((20, 256)).astype(np.float32):
+        expected = exact_store.query("ns", query, top_k=5)
+        matches = store.query("ns", query, top_k=5)
+        hits += len({m.id for m in matches} & {m.id for m in expected})
+        # Dönen skorlar gerçek cosine (yaklaşık değil)
+        for match in matches:
+            vector = vectors[int(match.id[1:])]
+            assert match.score == pytest.approx(float(unit(*vector) @ unit(*query)), abs=1e-5)
+
+    assert hits / 100 >= min_recall
+
+
+def test_quantized_query_skips_deleted_rows(tmp_path):
+    store = LocalVectorStore(path=str(tmp_path), quantization="binary")
+    store.upsert("ns", ["a", "b"], np.stack([unit(1, 0.1), unit(1, 0)]), [{}, {}])
+    store.delete("ns", ["b"])
+
+    assert [m.id for m in store.query("ns", unit(1, 0), top_k=2)] == ["a"]
+
+
+def test_codes_are_built_for_namespaces_without_them(tmp_path):
+    store = LocalVectorStore(path=str(tmp_path), quantization="int8")
+    store.upsert("ns", ["a", "b"], np.stack([unit(1, 0), unit(0, 1)]), [{}, {}])
+    # Kodlar olmadan yazılmış bir nesli taklit et
+    namespace = store._namespace("ns")
+    namespace._write(lambda conn, info: info.update(codes=0))
+    assert namespace.snapshot().int8 is None
+
+    assert [m.id for m in store.query("ns", unit(0, 1), top_k=1)] == ["b"]
+    assert namespace.snapshot().int8 is not None
+
+
+def test_unknown_quantization_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        LocalVectorStore(path=str(tmp_path), quantization="pq")
+
+
+def test_delete_prefix_only_matches_that_document(store):
+    ids = [f"doc_1_chunk_{i}" for i in range(3)] + ["doc_11_chunk_0", "doc_2_chunk_0"]
+    store.upsert("ns", ids, np.stack([unit(1, i) for i in range(5)]), [{}] * 5)
+
+    store.delete_prefix("ns", "doc_1_chunk_")
+
+    assert set(store.fetch("ns", ids)) == {"doc_11_chunk_0", "doc_2_chunk_0"}
+
+
+def test_compaction_rewrites_files_without_dead_rows(tmp_path):
+    store = LocalVectorStore(path=str(tmp_path), quantization="int8")
+    ids = [f"doc_{i}_chunk_0" for i in range(10)]
+    vectors = np.stack([unit(1, i, i % 3) for i in range(10)])
+    store.upsert("ns", ids, vectors, [{"i": i} for i in range(10)])
+    namespace = store._namespace("ns")
+    old_generation = namespace.snapshot().generation
+
+    store.delete("ns", ids[:2])
+    assert store.compact(min_dead_fraction=0.5) == {}
+
+    reader = LocalVectorStore(path=str(tmp_path), quantization="int8")
+    stale = reader._namespace("ns").snapshot()
+    store.delete("ns", ids[2:6])
+    assert store.compact(min_dead_fraction=0.5) == {"ns": 6}
+
+    assert namespace.dead_rows() == (0, 4)
+    assert not list(tmp_path.glob(f"ns/vectors.{old_generation}.*"))
+    fetched = store.fetch("ns", ids)
+    assert set(fetched) == set(ids[6:])
+    np.testing.assert_allclose(fetched[ids[8]].values, vectors[8], rtol=1e-6)
+    assert [m.id for m in store.query("ns", vectors[7], top_k=1)] == [ids[7]]
+    # Eski nesli okuyan başka bir instance yanlış ID eşlemez, yeni nesle geçer
+    assert reader._namespace("ns")._read(stale, lambda conn: "rows") is None
+    assert [(m.id, m.metadata) for m in reader.query("ns", vectors[9], top_k=1)] == [(ids[9], {"i": 9})]
+    assert sorted(r.id for batch in reader.iter_vectors("ns", batch_size=3) for r in batch) == ids[6:]
+
+    # Yeni yazmalar sıkıştırılmış nesle eklenir
+    store.upsert("ns", ["new"], np.stack([unit(0, 0, 1)]), [{}])
+    assert [m.id for m in store.query("ns", unit(0, 0, 1), top_k=1)] == ["new"]
+
+
+def test_compaction_of_an_emptied_namespace(store):
+    store.upsert("ns", ["a", "b"], np.stack([unit(1, 0), unit(0, 1)]), [{}, {}])
+    store.delete("ns", ["a", "b"])
+
+    assert store.compact(min_dead_fraction=0.3) == {"ns": 2}
+    assert store.query("ns", unit(1, 0), top_k=1) == []
+    store.upsert("ns", ["c"], np.stack([unit(1, 0, 0)]), [{}])
+    assert [m.id for m in store.query("ns", unit(1, 0, 0), top_k=1)] == ["c"]
@@ -0,0 +1,132 @@
+"""
+Tests for the shared Pinecone index handle (batching, bounded concurrency, retry).
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from pinecone.core.openapi.shared.exceptions import PineconeApiException
+
+from app.services import pinecone_index as pinecone_index_module
+from app.services.pinecone_index import PineconeIndexPool
+from app.services.vector_store import PineconeVectorStore, document_vector_prefix, vector_id
+
+
+class FakeIndex:
+    def __init__(self, failures=0, status=503, ids=(), list_status=None):
+        self.failures = failures
+        self.status = status
+        self.ids = sorted(ids)
+        self.list_status = list_status
+        self.upserts = []
+        self.deletes = []
+        self.filter_deletes = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def upsert(self, vectors, namespace, show_progress=False):
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+                raise PineconeApiException(status=self.status, reason="unavailable")
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.01)
+        with self.lock:
+            self.in_flight -= 1
+            self.upserts.append([vector["id"] for vector in vectors])
+
+    def delete(self, ids=None, namespace=None, filter=None):
+        if filter is not None:
+            self.filter_deletes.append(filter)
+        else:
+            self.deletes.append(list(ids))
+
+    def list_paginated(self, namespace, prefix=None, limit=100, pagination_token=None):
+        if self.list_status:
+            raise PineconeApiException(status=self.list_status, reason="not supported")
+        matching = [i for i in self.ids if i.startswith(prefix or "")]
+        start = int(pagination_token or 0)
+        page = matching[start:start + limit]
+        more = start + limit < len(matching)
+        return SimpleNamespace(
+            vectors=[SimpleNamespace(id=i) for i in page],
+            pagination=SimpleNamespace(next=str(start + limit)) if more else None
+        )
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(pinecone_index_module.time, "sleep", lambda seconds: None)
+
+
+def make_pool(index, **kwargs):
+    pool = PineconeIndexPool(api_key="test", index_name="test", host="", **kwargs)
+    pool._index = index
+    return pool
+
+
+def vectors(count):
+    return [{"id": f"v{i}", "values": [0.0]} for i in range(count)]
+
+
+def test_upsert_splits_batches_with_bounded_concurrency():
+    index = FakeIndex()
+    pool = make_pool(index, max_concurrency=3)
+
+    assert pool.upsert(vectors(1000), namespace="ns", batch_size=50) == 1000
+
+    assert len(index.upserts) == 20
+    assert sorted(i for batch in index.upserts for i in batch) == sorted(f"v{i}" for i in range(1000))
+    assert index.max_in_flight <= 3
+
+
+def test_upsert_retries_transient_errors():
+    index = FakeIndex(failures=2, status=429)
+    pool = make_pool(index, max_retries=3)
+
+    pool.upsert(vectors(10), namespace="ns")
+
+    assert index.upserts == [[f"v{i}" for i in range(10)]]
+
+
+def test_upsert_does_not_retry_client_errors():
+    index = FakeIndex(failures=1, status=400)
+    pool = make_pool(index, max_retries=3)
+
+    with pytest.raises(PineconeApiException):
+        pool.upsert(vectors(10), namespace="ns")
+
+
+def test_delete_in_batches():
+    index = FakeIndex()
+    pool = make_pool(index)
+
+    pool.delete([f"v{i}" for i in range(2500)], namespace="ns")
+
+    assert [len(batch) for batch in index.deletes] == [1000, 1000, 500]
+
+
+def test_delete_prefix_lists_and_deletes_in_batches():
+    ids = [vector_id(1, i) for i in range(2500)] + [vector_id(11, i) for i in range(5)]
+    index = FakeIndex(ids=ids)
+    store = PineconeVectorStore(index=make_pool(index))
+
+    store.delete_prefix("ns", document_vector_prefix(1), {"document_id": 1})
+
+    deleted = [i for batch in index.deletes for i in batch]
+    assert [len(batch) for batch in index.deletes] == [1000, 1000, 500]
+    assert sorted(deleted) == sorted(ids[:2500])
+    assert index.filter_deletes == []
+
+
+def test_delete_prefix_falls_back_to_metadata_filter():
+    # Pod tabanlı index: list desteklenmiyor
+    index = FakeIndex(list_status=400)
+    store = PineconeVectorStore(index=make_pool(index))
+
+    store.delete_prefix("ns", document_vector_prefix(1), {"document_id": 1})
+
+    assert index.filter_deletes == [{"document_id": 1}]
@@ -0,0 +1,159 @@
+"""
+Tests for the question embedding cache in front of the embeddings API.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.bounded_executor import BoundedExecutor
+from app.services.chat_service import ChatService
+from app.services.embedding_cache import EmbeddingCache
+from app.services.query_embedding_cache import QueryEmbeddingCache
+
+DIM = 4  # 16 bytes per float32 vector
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeAsyncEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, input, **kwargs):
+        self.calls.append((input, kwargs))
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(self.calls))] * DIM)])
+
+
+def vector(value):
+    return np.full(DIM, value, dtype=np.float32)
+
+
+def test_normalized_questions_share_an_entry():
+    """Whitespace and case differences should hit the same entry, other models should not."""
+    cache = QueryEmbeddingCache(max_bytes=1000, ttl_seconds=60)
+    cache.put("model-a", "What is  the refund policy?", vector(1.0))
+
+    hit = cache.lookup("model-a", "  what is the REFUND policy? ")
+    assert hit.dtype == np.float32
+    assert hit.tolist() == [1.0] * DIM
+    assert cache.lookup("model-a@512", "what is the refund policy?") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = QueryEmbeddingCache(max_bytes=1000, ttl_seconds=10, clock=clock)
+    cache.put("m", "q", vector(1.0))
+
+    clock.now = 9.9
+    assert cache.lookup("m", "q") is not None
+    clock.now = 10.0
+    assert cache.lookup("m", "q") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_lru_eviction_by_bytes():
+    """Least recently used questions are dropped once max_bytes is exceeded."""
+    cache = QueryEmbeddingCache(max_bytes=3 * DIM * 4, ttl_seconds=60)
+    for i in range(3):
+        cache.put("m", f"q{i}", vector(i))
+
+    cache.lookup("m", "q0")
+    cache.put("m", "q3", vector(3))
+
+    assert cache.lookup("m", "q1") is None
+    assert cache.lookup("m", "q0") is not None
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["bytes"] <= stats["max_bytes"]
+    assert stats["evictions"] == 1
+
+
+def test_disk_tier_is_shared_between_processes(tmp_path):
+    """A vector persisted by one process should be loaded by another."""
+    path = str(tmp_path / "embeddings.sqlite3")
+    first = QueryEmbeddingCache(max_bytes=1000, ttl_seconds=60, disk=EmbeddingCache(path=path))
+    second = QueryEmbeddingCache(max_bytes=1000, ttl_seconds=60, disk=EmbeddingCache(path=path))
+    first.persist("m", "Question", vector(2.0))
+
+    assert second.lookup("m", "question") is None
+    assert second.load("m", "question").tolist() == [2.0] * DIM
+    # Belleğe alındı, tekrar diske gidilmez
+    assert second.lookup("m", "question") is not None
+    assert (second.stats()["hits"], second.stats()["disk_hits"], second.stats()["misses"]) == (1, 1, 0)
+
+    # Aynı text'li döküman chunk'ı ile karışmaz
+    assert EmbeddingCache(path=path).get_many("m", ["question"]) == [None]
+
+
+def test_chat_service_embeds_a_repeated_question_once():
+    service = ChatService()
+    embeddings = FakeAsyncEmbeddings()
+    service.openai_client = SimpleNamespace(embeddings=embeddings)
+    service.query_cache = QueryEmbeddingCache(max_bytes=1000, ttl_seconds=60)
+
+    async def ask():
+        return [
+            await service.create_query_embedding("How do I reset my password?", "model-a", 0),
+            await service.create_query_embedding("how do i reset my password?", "model-a", 0),
+            await service.create_query_embedding("How do I reset my password?", "model-b", 0)
+        ]
+
+    first, repeated, other_model = asyncio.run(ask())
+
+    assert len(embeddings.calls) == 2
+    assert embeddings.calls[1][1]["model"] == "model-b"
+    assert repeated.tolist() == first.tolist()
+    assert other_model.tolist() != first.tolist()
+
+
+def test_disk_tier_runs_on_its_own_executor(tmp_path):
+    service = ChatService()
+    service.openai_client = SimpleNamespace(embeddings=FakeAsyncEmbeddings())
+    service.query_cache = QueryEmbeddingCache(max_bytes=1000, ttl_seconds=60, disk=EmbeddingCache(path=str(tmp_path / "q.sqlite3")))
+    service.query_cache_executor = BoundedExecutor("test-disk", max_workers=1, max_queue=4, timeout=5)
+
+    async def ask():
+        await service.create_query_embedding("What is the SLA?", "model-a", 0)
+        # Yazma arka planda; referansı tutulur, bitince bırakılır
+        assert len(service._pending_persists) == 1
+        await asyncio.gather(*service._pending_persists)
+        await asyncio.sleep(0)
+
+    asyncio.run(ask())
+
+    assert service._pending_persists == set()
+    # Okuma ve yazma ayrılmış havuzda çalıştı
+    assert service.query_cache_executor.stats()["completed"] == 2
+    assert service.query_cache.disk.get_many("query:model-a", ["what is the sla?"])[0] is not None
+
+
+def test_busy_disk_tier_falls_back_to_the_api_and_logs_dropped_writes(tmp_path, caplog):
+    service = ChatService()
+    embeddings = FakeAsyncEmbeddings()
+    service.openai_client = SimpleNamespace(embeddings=embeddings)
+    service.query_cache = QueryEmbeddingCache(max_bytes=1000, ttl_seconds=60, disk=EmbeddingCache(path=str(tmp_path / "q.sqlite3")))
+    service.query_cache_executor = BoundedExecutor("test-disk", max_workers=1, max_queue=0, timeout=5)
+
+    async def ask():
+        embedding = await service.create_query_embedding("What is the SLA?", "model-a", 0)
+        await asyncio.gather(*service._pending_persists, return_exceptions=True)
+        await asyncio.sleep(0)
+        return embedding
+
+    assert asyncio.run(ask()) is not None
+
+    assert len(embeddings.calls) == 1
+    assert service._pending_persists == set()
+    assert "diske yazılamadı" in caplog.text
+    assert service.query_cache_executor.stats()["rejected"] == 2
@@ -0,0 +1,72 @@
+"""
+Tests for upgrading a database created by the original schema.
+"""
+from sqlalchemy import inspect, text
+
+from app.config import settings
+from app.models import Document, Room, User
+from app.services.schema_migrations import ADDED_COLUMNS, upgrade_schema
+from app.services.vector_store import vector_shards
+from app.database import engine
+
+
+def make_legacy_schema():
+    """Yeni tabloları ve kolonları düşür, eski akışın satırlarını ekle"""
+    with engine.begin() as connection:
+        for table in ("chunks", "ingestion_jobs", "embedding_migrations"):
+            connection.execute(text(f"DROP TABLE {table}"))
+        for table, columns in ADDED_COLUMNS.items():
+            for column in columns:
+                connection.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+
+        user_id = connection.execute(text(
+            "INSERT INTO users (email, name, password_hash) VALUES ('legacy@example.com', 'Legacy', 'x') RETURNING id"
+        )).scalar()
+        room_id = connection.execute(text(
+            "INSERT INTO rooms (user_id, name, pinecone_namespace) VALUES (:user_id, 'Old', 'room_old') RETURNING id"
+        ), {"user_id": user_id}).scalar()
+        connection.execute(text(
+            "INSERT INTO documents (room_id, filename, file_path, processed, chunk_count) VALUES "
+            "(:room_id, 'done.pdf', '/tmp/done.pdf', true, 12), "
+            "(:room_id, 'lost.pdf', '/tmp/lost.pdf', false, 0)"
+        ), {"room_id": room_id})
+
+
+def test_upgrade_adds_columns_tables_and_backfills(db):
+    make_legacy_schema()
+
+    upgrade_schema(engine)
+    upgrade_schema(engine)  # ikinci çalıştırma no-op
+
+    inspector = inspect(engine)
+    assert {"chunks", "ingestion_jobs", "embedding_migrations"} <= set(inspector.get_table_names())
+    for table, columns in ADDED_COLUMNS.items():
+        assert set(columns) <= {column["name"] for column in inspector.get_columns(table)}
+    assert "ix_documents_content_hash" in {index["name"] for index in inspector.get_indexes("documents")}
+
+    documents = {document.filename: document for document in db.query(Document).all()}
+    assert (documents["done.pdf"].status, documents["done.pdf"].chunks_done, documents["done.pdf"].chunks_total) == ("completed", 12, 12)
+    assert documents["lost.pdf"].status == "failed"
+    assert documents["done.pdf"].deleted_at is None
+
+    room = db.query(Room).one()
+    assert room.vector_shard == vector_shards.default
+    assert (room.embedding_model, room.embedding_dimensions) == (settings.OPENAI_EMBEDDING_MODEL, 0)
+
+
+def test_upgrade_leaves_current_rows_alone(db):
+    user = User(email="current@example.com", name="Current", password_hash="x")
+    db.add(user)
+    db.flush()
+    room = Room(user_id=user.id, name="New", pinecone_namespace="room_new", vector_shard="other", embedding_model="m", embedding_dimensions=256)
+    db.add(room)
+    db.flush()
+    document = Document(room_id=room.id, filename="a.txt", file_path="/tmp/a.txt", status="processing", chunks_done=3)
+    db.add(document)
+    db.commit()
+
+    upgrade_schema(engine)
+
+    db.expire_all()
+    assert (room.vector_shard, room.embedding_model, room.embedding_dimensions) == ("other", "m", 256)
+    assert (document.status, document.chunks_done, document.chunks_total) == ("processing", 3, None)
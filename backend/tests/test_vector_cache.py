@@ -0,0 +1,159 @@
+"""
+Tests for the in-process namespace vector cache.
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.services import vector_cache as vector_cache_module
+from app.services.local_vector_store import LocalVectorStore
+from app.services.vector_cache import NamespaceVectorCache, RoomVectorVersion
+
+DIM = 16
+
+
+class CountingStore(LocalVectorStore):
+    """Local store that records how often the cache falls through to it"""
+
+    def __init__(self, path):
+        super().__init__(path=path, quantization="none")
+        self.loads = 0
+        self.queries = 0
+
+    def iter_vectors(self, namespace, batch_size=100):
+        self.loads += 1
+        yield from super().iter_vectors(namespace, batch_size)
+
+    def query(self, namespace, vector, top_k):
+        self.queries += 1
+        return super().query(namespace, vector, top_k)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CountingStore(str(tmp_path))
+
+
+def fill(store, namespace, count, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+    ids = [f"doc_1_chunk_{i}" for i in range(count)]
+    store.upsert(namespace, ids, vectors, [{"text": f"chunk {i}"} for i in range(count)])
+    return vectors
+
+
+def test_cached_results_match_the_store(store):
+    vectors = fill(store, "room_a", 300)
+    cache = NamespaceVectorCache(store=store, max_bytes=10 * 2**20)
+
+    for query in vectors[:10]:
+        cached = cache.query("room_a", query, 5, version=1)
+        direct = store.query("room_a", query, 5)
+        assert [m.id for m in cached] == [m.id for m in direct]
+        assert [m.score for m in cached] == pytest.approx([m.score for m in direct], abs=1e-5)
+        assert cached[0].metadata == direct[0].metadata
+
+    # Tek yükleme, sonrası hep cache'ten
+    assert store.loads == 1
+    assert cache.stats()["namespaces"] == 1
+
+
+def test_version_change_reloads(store):
+    fill(store, "room_a", 10)
+    cache = NamespaceVectorCache(store=store, max_bytes=10 * 2**20)
+    cache.prewarm("room_a", (1, 10))
+    assert cache.lookup("room_a", (1, 10)) is not None
+
+    # Worker yeni bir batch yükledi: versiyon değişti
+    store.upsert("room_a", ["doc_2_chunk_0"], np.ones((1, DIM), dtype=np.float32), [{"text": "new"}])
+    assert cache.lookup("room_a", (2, 11)) is None
+
+    [match] = cache.query("room_a", np.ones(DIM, dtype=np.float32), 1, version=(2, 11))
+    assert match.id == "doc_2_chunk_0"
+    assert store.loads == 2
+
+
+def test_invalidate_drops_entry(store):
+    fill(store, "room_a", 10)
+    cache = NamespaceVectorCache(store=store, max_bytes=10 * 2**20)
+    cache.prewarm("room_a", 1)
+
+    store.delete("room_a", [f"doc_1_chunk_{i}" for i in range(10)])
+    cache.invalidate("room_a")
+
+    assert cache.query("room_a", np.ones(DIM, dtype=np.float32), 5, version=1) == []
+    assert cache.stats()["bytes"] == 0
+
+
+def test_lru_eviction_under_budget(store):
+    for i, namespace in enumerate(["room_a", "room_b", "room_c"]):
+        fill(store, namespace, 100, seed=i)
+    cache = NamespaceVectorCache(store=store)
+    cache.prewarm("room_a", 1)
+    entry_bytes = cache.stats()["bytes"]
+    cache.max_bytes = entry_bytes * 2
+
+    cache.prewarm("room_b", 1)
+    cache.lookup("room_a", 1)  # room_a en son kullanılan
+    cache.prewarm("room_c", 1)
+
+    assert cache.lookup("room_a", 1) is not None
+    assert cache.lookup("room_b", 1) is None
+    assert cache.lookup("room_c", 1) is not None
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_namespace_over_budget_falls_back_to_store(store):
+    vectors = fill(store, "room_a", 200)
+    cache = NamespaceVectorCache(store=store, max_bytes=1024)
+
+    matches = cache.query("room_a", vectors[3], 1, version=1)
+    cache.query("room_a", vectors[3], 1, version=1)
+
+    assert matches[0].id == "doc_1_chunk_3"
+    assert store.queries == 2
+    # Aynı versiyon için tekrar yüklemeye çalışılmaz
+    assert store.loads == 1
+    assert cache.stats()["namespaces"] == 0
+
+
+def test_unversioned_queries_bypass_cache(store):
+    vectors = fill(store, "room_a", 10)
+    cache = NamespaceVectorCache(store=store, max_bytes=10 * 2**20)
+
+    cache.query("room_a", vectors[0], 1)
+
+    assert store.loads == 0
+    assert store.queries == 1
+
+
+def test_snapshot_inside_consistency_window_expires(store, monkeypatch):
+    store.consistency_window = 30
+    fill(store, "room_a", 10)
+    cache = NamespaceVectorCache(store=store, max_bytes=10 * 2**20)
+    changed = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    version = RoomVectorVersion(1, 10, changed)
+    clock = [changed.timestamp() + 5]
+    monkeypatch.setattr(vector_cache_module.time, "time", lambda: clock[0])
+
+    # Son yazmadan 5s sonra yüklenen snapshot eksik olabilir: pencere bitene kadar kullanılır
+    cache.query("room_a", np.ones(DIM, dtype=np.float32), 1, version=version)
+    assert cache.lookup("room_a", version) is not None
+    clock[0] += 30
+    assert cache.lookup("room_a", version) is None
+
+    # Pencere dışında yüklenen snapshot versiyon değişene kadar kalır
+    cache.query("room_a", np.ones(DIM, dtype=np.float32), 1, version=version)
+    clock[0] += 3600
+    assert cache.lookup("room_a", version) is not None
+    assert store.loads == 2
+
+
+def test_consistent_store_caches_young_versions(store):
+    fill(store, "room_a", 10)
+    cache = NamespaceVectorCache(store=store, max_bytes=10 * 2**20)
+    version = RoomVectorVersion(1, 10, datetime.now(timezone.utc))
+
+    cache.prewarm("room_a", version)
+
+    assert cache.lookup("room_a", version).expires_at is None
@@ -0,0 +1,118 @@
+"""
+Tests for the consistent-hash shard map and namespace rebalancing,
+using local stores as stand-ins for separate indexes.
+"""
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.models import User, Room, Document
+from app.services.garbage_collector import reconcile
+from app.services.local_vector_store import LocalVectorStore
+from app.services.shard_rebalancer import move_room, plan_rebalance, rebalance
+from app.services.vector_store import ShardMap, create_shard_map
+
+DIM = 8
+NAMESPACES = [f"room_{i:08x}" for i in range(2000)]
+
+
+@pytest.fixture
+def stores(tmp_path):
+    return {name: LocalVectorStore(path=str(tmp_path / name)) for name in ("a", "b", "c")}
+
+
+def test_ring_spreads_namespaces_and_moves_few_on_growth(stores):
+    two = ShardMap(stores, "a", ["a", "b"])
+    three = ShardMap(stores, "a", ["a", "b", "c"])
+
+    before = [two.assign(namespace) for namespace in NAMESPACES]
+    after = [three.assign(namespace) for namespace in NAMESPACES]
+
+    counts = {name: after.count(name) for name in "abc"}
+    assert all(400 < count < 900 for count in counts.values())
+    moved = [(old, new) for old, new in zip(before, after) if old != new]
+    # Sadece yeni shard'a giden ~1/3 taşınır, a <-> b arası taşıma olmaz
+    assert 450 < len(moved) < 900
+    assert {new for _, new in moved} == {"c"}
+
+
+def test_unset_shard_resolves_to_default(stores):
+    shard_map = ShardMap(stores, "a", ["b", "c"])
+
+    assert shard_map.store(None) is stores["a"]
+    assert shard_map.store("c") is stores["c"]
+    assert shard_map.assign("room_x") in {"b", "c"}
+    with pytest.raises(ValueError):
+        shard_map.store("missing")
+
+
+def test_local_shards_live_in_subdirectories(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LOCAL_VECTOR_STORE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "VECTOR_INDEX_SHARDS", "default,east")
+
+    shard_map = create_shard_map("local")
+
+    assert shard_map.names == ["default", "east"]
+    assert shard_map.ring_shards == ["default", "east"]
+    assert shard_map.store("east").path == tmp_path / "shards" / "east"
+    # Shard klasörleri varsayılan shard'da namespace sayılmaz
+    shard_map.store("east").upsert("room_1", ["v"], np.ones((1, DIM), dtype=np.float32), [{}])
+    assert shard_map.store().stats()["namespaces"] == {}
+
+
+@pytest.fixture
+def room(db, stores):
+    user = User(email="shards@example.com", name="Shard User", password_hash="x")
+    db.add(user)
+    db.flush()
+    room = Room(user_id=user.id, name="Room", pinecone_namespace="room_move", vector_shard="a")
+    db.add(room)
+    db.flush()
+    db.add(Document(room_id=room.id, filename="a.txt", file_path="/tmp/a.txt", status="completed", chunks_done=3))
+    db.commit()
+    vectors = np.random.default_rng(0).standard_normal((3, DIM)).astype(np.float32)
+    stores["a"].upsert("room_move", [f"doc_1_chunk_{i}" for i in range(3)], vectors, [{"chunk_index": i} for i in range(3)])
+    return room
+
+
+def test_move_room_copies_switches_and_deletes(db, stores, room):
+    shard_map = ShardMap(stores, "a", ["a", "b"])
+    expected = stores["a"].query("room_move", np.ones(DIM, dtype=np.float32), 3)
+
+    assert move_room(db, room, "b", shard_map)
+
+    db.refresh(room)
+    assert room.vector_shard == "b"
+    assert stores["a"].stats()["namespaces"] == {}
+    moved = shard_map.store(room.vector_shard).query("room_move", np.ones(DIM, dtype=np.float32), 3)
+    assert [(m.id, m.metadata) for m in moved] == [(m.id, m.metadata) for m in expected]
+
+
+def test_move_waits_for_documents_being_processed(db, stores, room):
+    db.add(Document(room_id=room.id, filename="b.txt", file_path="/tmp/b.txt", status="processing"))
+    db.commit()
+
+    assert not move_room(db, room, "b", ShardMap(stores, "a", ["a", "b"]))
+
+    db.refresh(room)
+    assert room.vector_shard == "a"
+    assert stores["b"].stats()["namespaces"] == {}
+
+
+def test_rebalance_follows_the_ring(db, stores, room):
+    # Ring sadece b: oda a'dan b'ye taşınmalı
+    shard_map = ShardMap(stores, "a", ["b"])
+    assert [(r.id, target) for r, target in plan_rebalance(db, shard_map)] == [(room.id, "b")]
+
+    assert rebalance(db, shard_map) == (1, 0)
+    assert plan_rebalance(db, shard_map) == []
+    assert stores["b"].stats()["namespaces"] == {"room_move": 3}
+
+
+def test_reconcile_checks_each_shard(db, stores, room, monkeypatch):
+    from app.services import garbage_collector
+    monkeypatch.setattr(garbage_collector, "vector_shards", ShardMap(stores, "a", ["a", "b"]))
+    # Taşıma sonrası silinemeyen eski kopya
+    stores["b"].upsert("room_move", ["x"], np.ones((1, DIM), dtype=np.float32), [{}])
+
+    assert reconcile(db) == {"unknown": ["room_move"], "drift": []}